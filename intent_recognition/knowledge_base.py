@@ -199,6 +199,32 @@ KNOWLEDGE_BASE = {
         }
 
 
+# 关系抽取模型输出的英文关系编码 -> 图谱中的中文关系类型
+RELATION_CODES = {
+    "rely": "依赖",
+    "b-rely": "被依赖",
+    "belg": "包含",
+    "b-belg": "被包含",
+    "syno": "同义",
+    "relative": "相对",
+    "attr": "拥有",
+    "b-attr": "属性",
+    "none": "无"
+}
+
+# 互逆关系：A 包含 B 等价于 B 被包含 A
+INVERSE_RELATIONS = {
+    "依赖": "被依赖",
+    "被依赖": "依赖",
+    "包含": "被包含",
+    "被包含": "包含",
+    "拥有": "属性",
+    "属性": "拥有",
+    "同义": "同义",
+    "相对": "相对"
+}
+
+
 # 为了兼容性，也可以直接导出
 entities = KNOWLEDGE_BASE["entities"]
 relations = KNOWLEDGE_BASE["relations"]
\ No newline at end of file
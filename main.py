@@ -15,7 +15,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from modules.config_manager import get_config_manager
 from modules.intent_recognition import IntentRecognizer
+from modules.entity_linker import EntityLinker
 from modules.knowledge_graph_query import KnowledgeGraphQuery
+from modules.knowledge_graph_visualizer import KnowledgeGraphVisualizer
 from modules.run_serve import RunServe
 from modules.backend_api import APIHandler, create_flask_app
 from modules.doubao_llm import DoubaoLLM
@@ -47,10 +49,6 @@ class KnowledgeGraphApp:
         
         
 
-        # 初始化意图识别器
-        model_path = self.config.get('model.nlu_model_path')
-        self.intent_recognizer = IntentRecognizer(model_path, KNOWLEDGE_BASE)
-        
         # 初始化知识图谱查询器
         db_config = self.config.get_database_config()
         self.kg_query = KnowledgeGraphQuery(
@@ -58,6 +56,14 @@ class KnowledgeGraphApp:
             db_config['user_name'], 
             db_config['password']
         )
+        embedding_config = self.config.get_embedding_config()
+        self.kg_query.set_embedding_index(embedding_config['index_path'], embedding_config['model_path'])
+        self.kg_query.set_sentence_index(self.config.get_retrieval_config()['sentence_index_path'])
+        
+        # 初始化意图识别器（图谱版本变化时实体链接索引自动重建）
+        model_path = self.config.get('model.nlu_model_path')
+        entity_linker = EntityLinker.from_graph(self.kg_query, KNOWLEDGE_BASE.get('entities', {}))
+        self.intent_recognizer = IntentRecognizer(model_path, KNOWLEDGE_BASE, entity_linker)
         
         # 初始化LLM客户端
         try:
@@ -76,8 +82,19 @@ class KnowledgeGraphApp:
             print("将使用默认的空LLM客户端")
             llm_client = None
         
+        # 初始化可视化器
+        graph_config = self.config.get_graph_config()
+        visualizer = KnowledgeGraphVisualizer(
+            self.kg_query,
+            max_nodes=graph_config['max_nodes'],
+            max_edges=graph_config['max_edges'],
+            min_confidence=graph_config['min_confidence'],
+            lod_threshold=graph_config['lod_threshold']
+        )
+        
         # 初始化API处理器
-        self.api_handler = APIHandler(self.intent_recognizer, self.kg_query, llm_client)
+        self.api_handler = APIHandler(self.intent_recognizer, self.kg_query, llm_client, visualizer,
+                                      evidence_top_k=self.config.get_retrieval_config()['evidence_top_k'])
         
         # 测试API
         #result=self.api_handler.process_query("你好")
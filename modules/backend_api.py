@@ -4,12 +4,14 @@
 提供简化的REST接口，适配Vue3前端
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import json
 import logging
 from typing import Dict, Any, Optional
 
+from .graph_export import GraphExporter, gzip_stream
+
 
 
 class APIHandler:
@@ -18,7 +20,8 @@ class APIHandler:
     负责处理用户请求，提供基本的聊天功能
     """
     
-    def __init__(self, intent_recognizer=None, kg_query=None, llm_client=None):
+    def __init__(self, intent_recognizer=None, kg_query=None, llm_client=None, visualizer=None,
+                 evidence_top_k: int = 3):
         """
         初始化API处理器
         
@@ -26,11 +29,15 @@ class APIHandler:
             intent_recognizer: 意图识别器实例（可选）
             kg_query: 知识图谱查询器实例（可选）
             llm_client: LLM客户端实例（可选）
+            visualizer: 知识图谱可视化器实例（可选），用于生成证据子图
+            evidence_top_k: 没有链接到实体时检索的溯源证据句数量
         """
         self.api_url = "http://localhost:5000"
         self.intent_recognizer = intent_recognizer
         self.kg_query = kg_query
         self.llm_client = llm_client
+        self.visualizer = visualizer
+        self.evidence_top_k = evidence_top_k
         
         logging.info("API处理器初始化完成")
     
@@ -74,11 +81,40 @@ class APIHandler:
                 entities=nlu_result.get('entities', [])
             )
         
+        # 没有链接到实体时，从关系溯源句中检索证据
+        evidence = []
+        if self.kg_query and not nlu_result.get('entities'):
+            evidence = self.kg_query.search_evidence(user_input, self.evidence_top_k)
+        
         # 生成回复
-        response_text = self._generate_response(nlu_result, knowledge_data, user_input)
-        return {"success": True, "message": response_text}
+        response_text = self._generate_response(nlu_result, knowledge_data, user_input, evidence)
+        
+        # 生成证据子图
+        graph = {}
+        if self.visualizer:
+            graph = self.visualizer.build_graph_payload(knowledge_data)
+        
+        return {"success": True, "message": response_text, "graph": graph}
+    
+    def build_graph_view(self, entities: Optional[list] = None) -> Dict[str, Any]:
+        """
+        生成图谱页面展示的子图（坐标由服务端布局给出）
+        
+        Args:
+            entities: 起点实体，缺省时取中心性最高的实体
+        
+        Returns:
+            Dict[str, Any]: ECharts格式的子图，无结果时返回空字典
+        """
+        if not self.kg_query or not self.visualizer:
+            return {}
+        entities = entities or self.kg_query.get_central_entities()
+        if not entities:
+            return {}
+        return self.visualizer.build_graph_payload(self.kg_query.find_neighborhood(entities))
     
-    def _generate_response(self, nlu_result: Dict[str, Any], knowledge_data: Dict[str, Any], user_input: str) -> str:
+    def _generate_response(self, nlu_result: Dict[str, Any], knowledge_data: Dict[str, Any], user_input: str,
+                           evidence: Optional[list] = None) -> str:
         """
         生成回复
         
@@ -86,6 +122,7 @@ class APIHandler:
             nlu_result: 意图识别结果
             knowledge_data: 知识图谱数据
             user_input: 用户输入
+            evidence: 检索到的溯源证据句
             
         Returns:
             str: 生成的回复
@@ -100,6 +137,8 @@ class APIHandler:
                     context += f"实体：{', '.join(nlu_result.get('entities', []))}\n"
             if knowledge_data and knowledge_data.get('answer'):
                 context += f"知识图谱信息：{knowledge_data.get('answer')}\n"
+            if evidence:
+                context += "相关资料：\n" + ''.join(f"- {hit['sentence']}\n" for hit in evidence)
             
             response = self.llm_client.generate_response(context)
             if response and response.content and response.content.strip():
@@ -178,8 +217,8 @@ def create_flask_app(api_handler=None) -> Flask:
         result = api_handler.process_query(message)
         #result = {"message": "测回复"}
 
-        #图的字典
-        graph_dict={}
+        #图的字典（ECharts nodes/links 格式）
+        graph_dict = result.get("graph", {})
         # 返回前端期望的格式
         return jsonify({"message": result["message"],"graph":graph_dict})
     
@@ -244,6 +283,86 @@ def create_flask_app(api_handler=None) -> Flask:
         api_handler.llm_client.history_messages=converted
         return data
 
+    @app.route("/graph/export", methods=["GET"])
+    def export_graph():
+        """
+        流式导出全图
+        
+        查询参数: format=ndjson|json, type, relation（可重复）, min_confidence, page_size
+        支持 If-None-Match 条件请求和 gzip 压缩
+        """
+        if not api_handler.kg_query:
+            return jsonify({"error": "知识图谱未连接"}), 503
+        
+        exporter = GraphExporter(api_handler.kg_query)
+        types = request.args.getlist("type") or None
+        relations = request.args.getlist("relation") or None
+        try:
+            min_confidence = float(request.args.get("min_confidence", 0.0))
+            page_size = int(request.args.get("page_size", GraphExporter.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "min_confidence 或 page_size 参数格式错误"}), 400
+        
+        # request.if_none_match 中的ETag不带引号
+        etag = exporter.compute_etag(types, relations, min_confidence)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
+        if request.args.get("format", "ndjson") == "json":
+            chunks = exporter.stream_json(types, relations, min_confidence, page_size)
+            mimetype = "application/json"
+        else:
+            chunks = exporter.stream_ndjson(types, relations, min_confidence, page_size)
+            mimetype = "application/x-ndjson"
+        
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            body = gzip_stream(chunks)
+        else:
+            body = (chunk.encode("utf-8") for chunk in chunks)
+        
+        response = Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+        response.set_etag(etag)
+        return response
+    
+    @app.route("/graph/view", methods=["GET"])
+    def graph_view():
+        """
+        图谱页面的子图（节点带服务端计算的 x/y 坐标）
+        
+        查询参数: entity（可重复，缺省时取中心性最高的实体）
+        """
+        if not api_handler.kg_query:
+            return jsonify({"error": "知识图谱未连接"}), 503
+        
+        return jsonify(api_handler.build_graph_view(request.args.getlist("entity") or None))
+    
+    @app.route("/relations", methods=["GET"])
+    def entity_relations():
+        """
+        键集分页查询实体的关系
+        
+        查询参数: entity, min_confidence, page_size, page_token（上一页返回的 next_page_token）
+        """
+        if not api_handler.kg_query:
+            return jsonify({"error": "知识图谱未连接"}), 503
+        
+        entity = request.args.get("entity", "").strip()
+        if not entity:
+            return jsonify({"error": "缺少entity参数"}), 400
+        try:
+            min_confidence = float(request.args.get("min_confidence", api_handler.kg_query.DEFAULT_CONFIDENCE_THRESHOLD))
+            page_size = int(request.args.get("page_size", api_handler.kg_query.DEFAULT_PAGE_SIZE))
+            page = api_handler.kg_query.find_entity_relations_page(
+                entity, min_confidence, request.args.get("page_token") or None, page_size)
+        except ValueError as e:
+            return jsonify({"error": f"参数格式错误: {e}"}), 400
+        
+        return jsonify(page)
+    
     # 健康检查接口
     @app.route("/health", methods=["GET"])
     def health_check():
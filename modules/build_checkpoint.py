@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+图谱构建检查点模块
+记录一次构建的输入哈希、当前阶段和每类写入已提交的批次区间，
+构建中断（数据库抖动、坏数据）后用 --resume 跳过已提交的批次继续，
+不必清空数据库从头再来；批次写入都是 MERGE，重复执行也是幂等的
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# 构建阶段（按顺序）
+PHASES = ['clean', 'indexes', 'nodes', 'relationships', 'finalize', 'verify', 'promote', 'done']
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_ranges(indexes: List[int]) -> List[List[int]]:
+    """[0, 1, 2, 5, 6] -> [[0, 2], [5, 6]]（闭区间）"""
+    ranges: List[List[int]] = []
+    for index in sorted(indexes):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ranges
+
+
+class BuildCheckpoint:
+    """构建检查点（JSON 文件，每次提交批次后原子替换）"""
+
+    def __init__(self, path: str, input_hash: str, params: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.input_hash = input_hash
+        self.params = dict(params or {})
+        self.phase = PHASES[0]
+        self.batches: Dict[str, set] = {}
+        # 写入预备版本的图谱版本号；切换事务提交后、检查点落盘前中断时据此判断切换已完成
+        self.staging_version: Any = None
+        self.started_at = time.time()
+        self.updated_at = self.started_at
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> Optional['BuildCheckpoint']:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        checkpoint = cls(path, data['input_hash'], data.get('params'))
+        checkpoint.phase = data.get('phase', PHASES[0])
+        checkpoint.batches = {
+            key: {i for start, end in ranges for i in range(start, end + 1)}
+            for key, ranges in data.get('batches', {}).items()
+        }
+        checkpoint.staging_version = data.get('staging_version')
+        checkpoint.started_at = data.get('started_at', checkpoint.started_at)
+        checkpoint.updated_at = data.get('updated_at', checkpoint.updated_at)
+        return checkpoint
+
+    def matches(self, input_hash: str, params: Dict[str, Any]) -> bool:
+        """输入和影响分批的参数都相同时才能续跑"""
+        return self.input_hash == input_hash and self.params == params
+
+    def save(self):
+        with self.lock:
+            self.updated_at = time.time()
+            data = {
+                'input_hash': self.input_hash,
+                'params': self.params,
+                'phase': self.phase,
+                'batches': {key: _to_ranges(list(done)) for key, done in sorted(self.batches.items())},
+                'staging_version': self.staging_version,
+                'started_at': self.started_at,
+                'updated_at': self.updated_at,
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    # ------------------------------------------------------------------
+    # 阶段
+    # ------------------------------------------------------------------
+
+    def pending(self, phase: str) -> bool:
+        """phase 是否尚未完成（self.phase 为正在进行、尚未完成的阶段）"""
+        return PHASES.index(self.phase) <= PHASES.index(phase)
+
+    def advance(self, phase: str):
+        """phase 已完成，进入下一阶段并立即落盘"""
+        following = PHASES[min(PHASES.index(phase) + 1, len(PHASES) - 1)]
+        if PHASES.index(following) > PHASES.index(self.phase):
+            self.phase = following
+        self.save()
+
+    def reset_batches(self):
+        """清空批次记录并回到节点阶段（校验失败后续跑时全部批次重新 MERGE）"""
+        with self.lock:
+            self.batches = {}
+        self.phase = 'nodes'
+        self.save()
+
+    # ------------------------------------------------------------------
+    # 批次（BulkLoader 调用）
+    # ------------------------------------------------------------------
+
+    def is_done(self, key: str, index: int) -> bool:
+        with self.lock:
+            return index in self.batches.get(key, ())
+
+    def mark_done(self, key: str, index: int):
+        with self.lock:
+            self.batches.setdefault(key, set()).add(index)
+        self.save()
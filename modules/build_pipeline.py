@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+并行图谱构建流水线
+    读取（主线程）-> 解析/标准化（进程池）-> 去重（主线程，按输入顺序）-> 写入（多个写入线程）
+各阶段之间用有界队列连接：写入跟不上时去重阶段阻塞，去重阻塞时不再向进程池提交新块，内存有界。
+
+写入线程按 (无序实体对, 关系) 分区，同一关系的写入和删除总是由同一线程按顺序执行，
+节点在对应关系入队前同步写入，因此结果与串行构建相同。
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from .bulk_loader import BulkLoader
+from .entity_normalizer import EntityNormalizer
+from .stream_ingest import CHUNK_LINES, RollingDeduplicator, iter_line_chunks, parse_jsonl_lines, prepare_chunk
+
+
+class StageCounter:
+    """单个阶段的吞吐计数（线程安全）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.chunks = 0
+        self.rows = 0
+        self.busy = 0.0     # 阶段内实际工作时间（多个工作者时为总和）
+        self.blocked = 0.0  # 等待下游队列的时间
+
+    def add(self, rows: int, seconds: float, blocked: float = 0.0):
+        with self.lock:
+            self.chunks += 1
+            self.rows += rows
+            self.busy += seconds
+            self.blocked += blocked
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'stage': self.name,
+            'chunks': self.chunks,
+            'rows': self.rows,
+            'busy_seconds': round(self.busy, 3),
+            'blocked_seconds': round(self.blocked, 3),
+            'rows_per_second': round(self.rows / self.busy, 1) if self.busy > 0 else 0.0,
+        }
+
+
+class PreparedChunk(NamedTuple):
+    index: int
+    frame: pd.DataFrame
+    rows_in: int
+    new_entries: Dict[str, Optional[str]]
+    errors: List[Tuple[int, str]]
+    seconds: float
+
+
+# ----------------------------------------------------------------------
+# 进程池中的解析 / 标准化
+# ----------------------------------------------------------------------
+
+_worker_normalizer: Optional[EntityNormalizer] = None
+
+
+def _init_worker(dictionary_path: Optional[str]):
+    global _worker_normalizer
+    _worker_normalizer = EntityNormalizer(dictionary_path)
+
+
+def prepare_payload(payload: Tuple[int, str, int, Any]) -> PreparedChunk:
+    """解析并标准化一块；返回本块新增的标准化词典条目，由主进程合并"""
+    index, kind, first_line, data = payload
+    start = time.perf_counter()
+    errors: List[Tuple[int, str]] = []
+    frame = parse_jsonl_lines(data, first_line, errors) if kind == 'json' else data
+    before = len(_worker_normalizer)
+    prepared = prepare_chunk(frame, _worker_normalizer)
+    new_entries = dict(itertools.islice(_worker_normalizer.mapping.items(), before, None))
+    return PreparedChunk(index, prepared, len(frame), new_entries, errors, time.perf_counter() - start)
+
+
+def iter_payloads(path: str, kind: str, chunk_lines: int) -> Iterator[Tuple[int, str, int, Any]]:
+    """按块产出待解析的数据：JSONL 为原始行，CSV 为 DataFrame 块"""
+    if kind == 'json':
+        chunks = ((first_line, lines) for first_line, lines in iter_line_chunks(path, chunk_lines))
+    else:
+        chunks = ((i * chunk_lines + 2, frame) for i, frame in enumerate(pd.read_csv(path, chunksize=chunk_lines)))
+    for index, (first_line, data) in enumerate(chunks):
+        yield index, kind, first_line, data
+
+
+class GraphBuildPipeline:
+    """并行构建流水线（builder 为 Neo4jKnowledgeGraph，提供连接、实体类型和关系映射）"""
+
+    QUEUE_CHUNKS = 4  # 每个有界队列 / 每个解析进程最多积压的块数
+
+    def __init__(self, builder, workers: int = 1, writers: int = None, chunk_lines: int = CHUNK_LINES):
+        """
+        Args:
+            builder: Neo4jKnowledgeGraph
+            workers: 解析/标准化进程数，1 表示在主进程中执行
+            writers: 写入线程数
+            chunk_lines: 每块的行数
+        """
+        self.builder = builder
+        self.workers = max(1, int(workers))
+        self.loader = BulkLoader(builder.graph, builder.batch_size, writers or builder.writers, label=builder.label)
+        self.chunk_lines = chunk_lines
+        self.counters = {name: StageCounter(name) for name in ('parse', 'dedup', 'nodes', 'write')}
+        self.dedup = RollingDeduplicator(builder.confidence)
+        self.nodes: Dict[str, Dict[str, str]] = {}
+        self.errors: List[Tuple[int, str]] = []
+        self.writer_error: Optional[BaseException] = None
+
+    # ------------------------------------------------------------------
+    # 写入阶段
+    # ------------------------------------------------------------------
+
+    def _writer_loop(self, jobs: queue.Queue):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            if self.writer_error is not None:
+                continue  # 出错后只清空队列，避免上游阻塞
+            deletes, upserts = job
+            start = time.perf_counter()
+            try:
+                count = sum(self.loader.delete_relationships(t, rows) for t, rows in deletes.items())
+                count += sum(self.loader.write_relationships(t, rows) for t, rows in upserts.items())
+                self.counters['write'].add(count, time.perf_counter() - start)
+            except BaseException as e:
+                logging.error(f"写入线程出错: {e}")
+                self.writer_error = e
+
+    # ------------------------------------------------------------------
+    # 去重阶段（主线程，按块的输入顺序）
+    # ------------------------------------------------------------------
+
+    def _handle(self, chunk: PreparedChunk, writer_queues: List[queue.Queue]):
+        self.counters['parse'].add(chunk.rows_in, chunk.seconds)
+        self.errors.extend(chunk.errors)
+        normalizer = self.builder.normalizer
+        if chunk.new_entries:
+            with normalizer.lock:
+                normalizer.mapping.update(chunk.new_entries)
+                normalizer.dirty = True
+
+        # 新实体先同步写入，之后入队的关系才能匹配到节点
+        start = time.perf_counter()
+        frame = chunk.frame
+        names = (set(frame['head_clean']) | set(frame['tail_clean'])) - self.nodes.keys()
+        new_nodes = [{'name': name, 'type': self.builder.get_entity_type(name)} for name in sorted(names)]
+        self.loader.load_nodes(new_nodes)
+        self.nodes.update((row['name'], row) for row in new_nodes)
+        self.counters['nodes'].add(len(new_nodes), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        changes = self.dedup.update(frame)
+        relation_dict = self.builder.relation_dict
+        jobs = [({}, {}) for _ in writer_queues]
+        for c in changes['deletes']:
+            partition = hash((min(c.head, c.tail), max(c.head, c.tail), c.relation)) % len(jobs)
+            jobs[partition][0].setdefault(relation_dict.get(c.relation, c.relation), []).append(
+                {'head': c.head, 'tail': c.tail})
+        for c in changes['upserts']:
+            partition = hash((min(c.head, c.tail), max(c.head, c.tail), c.relation)) % len(jobs)
+            jobs[partition][1].setdefault(relation_dict.get(c.relation, c.relation), []).append(
+                {'head': c.head, 'tail': c.tail, 'confidence': c.confidence, 'sentence': c.sentence})
+        busy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for job, jobs_queue in zip(jobs, writer_queues):
+            if job[0] or job[1]:
+                jobs_queue.put(job)  # 队列满时阻塞（反压）
+        self.counters['dedup'].add(len(frame), busy, time.perf_counter() - start)
+        if self.writer_error is not None:
+            raise RuntimeError(f"写入线程出错: {self.writer_error}") from self.writer_error
+
+    # ------------------------------------------------------------------
+    # 运行
+    # ------------------------------------------------------------------
+
+    def run(self, path: str, kind: str = 'json') -> Dict[str, Any]:
+        """
+        运行流水线
+
+        Args:
+            path: 数据文件
+            kind: 'json'（JSONL）或 'csv'
+
+        Returns:
+            Dict: wall_seconds、stages（各阶段计数）
+        """
+        start_time = time.time()
+        writer_queues = [queue.Queue(maxsize=self.QUEUE_CHUNKS) for _ in range(self.loader.writers)]
+        threads = [threading.Thread(target=self._writer_loop, args=(q,), name=f"graph-writer-{i}", daemon=True)
+                   for i, q in enumerate(writer_queues)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            payloads = iter_payloads(path, kind, self.chunk_lines)
+            if self.workers == 1:
+                global _worker_normalizer
+                _worker_normalizer = self.builder.normalizer
+                for payload in payloads:
+                    chunk = prepare_payload(payload)
+                    # 主进程内标准化直接写入共享词典，无需再合并
+                    self._handle(chunk._replace(new_entries={}), writer_queues)
+            else:
+                with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                         initargs=(self.builder.normalizer.path,)) as executor:
+                    pending = deque()
+                    for payload in payloads:
+                        if len(pending) >= self.workers * self.QUEUE_CHUNKS:
+                            self._handle(pending.popleft().result(), writer_queues)
+                        pending.append(executor.submit(prepare_payload, payload))
+                    while pending:
+                        self._handle(pending.popleft().result(), writer_queues)
+        finally:
+            for jobs_queue in writer_queues:
+                jobs_queue.put(None)
+            for thread in threads:
+                thread.join()
+        if self.writer_error is not None:
+            raise RuntimeError(f"写入线程出错: {self.writer_error}") from self.writer_error
+
+        return {
+            'wall_seconds': round(time.time() - start_time, 3),
+            'stages': [counter.to_dict() for counter in self.counters.values()],
+        }
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+图谱构建报告模块
+记录一次构建各阶段的耗时、行数和吞吐，常驻内存（RSS）峰值，以及每个写入批次（事务）的延迟，
+构建结束时写成 JSON 报告，用来判断时间花在 pandas 处理、实体标准化还是 Neo4j 写入上。
+另提供给定规模的合成预测数据（product.py --benchmark）。
+
+报告结构:
+    {"build", "status", "error", "params", "counts", "wall_seconds",
+     "phases": [{"phase", "seconds", "rows", "rows_per_second", "peak_rss_mb", "rss_after_mb"}],
+     "writes": {"batches", "rows", "rows_per_second", "p50_ms", "p90_ms", "p99_ms", "max_ms"},
+     "memory": {"peak_rss_mb", "process_peak_rss_mb", "sampler"}}
+阶段名按嵌套关系用 / 连接，例如 relationships/dedup 包含在 relationships 之内。
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # psutil 不可用时只能由 getrusage 得到整个进程的峰值
+    psutil = None
+
+SAMPLE_INTERVAL = 0.05  # RSS 采样间隔（秒）
+MB = 1 << 20
+
+
+def current_rss() -> Optional[int]:
+    """当前进程及其子进程（解析进程池）的常驻内存字节数，psutil 不可用时返回None"""
+    if psutil is None:
+        return None
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            rss += child.memory_info().rss
+        except psutil.Error:
+            pass  # 子进程已退出
+    return rss
+
+
+def process_peak_rss() -> Optional[int]:
+    """getrusage 记录的本进程自启动以来的峰值常驻内存字节数"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux 单位为 KB
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / MB, 1) if value is not None else None
+
+
+class Phase:
+    """一个阶段的计时记录；rows 在阶段内得知处理行数后设置"""
+
+    def __init__(self, name: str, seconds: float = 0.0, rows: Optional[int] = None):
+        self.name = name
+        self.seconds = seconds
+        self.rows = rows
+        self.peak_rss: Optional[int] = None
+        self.rss_after: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'phase': self.name,
+            'seconds': round(self.seconds, 3),
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / self.seconds, 1) if self.rows and self.seconds > 0 else None,
+            'peak_rss_mb': _mb(self.peak_rss),
+            'rss_after_mb': _mb(self.rss_after),
+        }
+
+
+class BuildReport:
+    """一次构建的报告（阶段计时、RSS 采样、写入延迟），写入延迟可由多个写入线程同时记录"""
+
+    def __init__(self, name: str = 'build', params: Optional[Dict[str, Any]] = None,
+                 sample_interval: float = SAMPLE_INTERVAL):
+        self.name = name
+        self.params = dict(params or {})
+        self.sample_interval = sample_interval
+        self.counts: Dict[str, Any] = {}
+        self.phases: List[Phase] = []
+        self.active: List[Phase] = []
+        self.write_latencies: List[float] = []
+        self.write_rows = 0
+        self.peak_rss: Optional[int] = None
+        self.status = 'running'
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.wall_seconds = 0.0
+        self.lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # RSS 采样
+    # ------------------------------------------------------------------
+
+    def start(self) -> 'BuildReport':
+        """开始计时和后台 RSS 采样"""
+        self._start = time.perf_counter()
+        if psutil is not None:
+            self._sample()
+            self._sampler = threading.Thread(target=self._sample_loop, name='build-report-rss', daemon=True)
+            self._sampler.start()
+        return self
+
+    def _sample(self) -> Optional[int]:
+        rss = current_rss()
+        if rss is None:
+            return None
+        with self.lock:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+            for phase in self.active:
+                phase.peak_rss = max(phase.peak_rss or 0, rss)
+        return rss
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        """计时一个阶段，阶段内可设置 phase.rows；嵌套阶段的名称带上外层阶段前缀"""
+        with self.lock:
+            phase = Phase(f"{self.active[-1].name}/{name}" if self.active else name)
+            self.active.append(phase)
+            self.phases.append(phase)
+        self._sample()
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - start
+            phase.rss_after = self._sample()
+            with self.lock:
+                self.active.remove(phase)
+
+    def record_phase(self, name: str, seconds: float, rows: Optional[int] = None):
+        """记录在循环中累计计时、无法用 phase() 包住的子阶段（如逐行标准化）"""
+        with self.lock:
+            self.phases.append(Phase(f"{self.active[-1].name}/{name}" if self.active else name, seconds, rows))
+
+    def record_write(self, rows: int, seconds: float):
+        """记录一个已提交的写入批次"""
+        with self.lock:
+            self.write_latencies.append(seconds)
+            self.write_rows += rows
+
+    def finish(self, error: Optional[BaseException] = None):
+        """停止采样并记录结果"""
+        self.wall_seconds = time.perf_counter() - self._start
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._sample()
+        self.status = 'failed' if error is not None else 'ok'
+        self.error = f"{type(error).__name__}: {error}" if error is not None else None
+
+    # ------------------------------------------------------------------
+    # 输出
+    # ------------------------------------------------------------------
+
+    def writes_summary(self) -> Dict[str, Any]:
+        """写入批次的延迟分位数（毫秒）和吞吐"""
+        with self.lock:
+            latencies = np.asarray(self.write_latencies, dtype=np.float64) * 1000
+            rows = self.write_rows
+        summary = {'batches': len(latencies), 'rows': rows}
+        if not len(latencies):
+            return summary
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        summary.update({
+            # 写入可能由多个会话并行提交，吞吐按批次延迟之和计算的是单会话吞吐
+            'rows_per_second': round(rows / (latencies.sum() / 1000), 1) if latencies.sum() > 0 else None,
+            'p50_ms': round(float(p50), 2),
+            'p90_ms': round(float(p90), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(latencies.max()), 2),
+        })
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'build': self.name,
+            'status': self.status,
+            'error': self.error,
+            'started_at': self.started_at,
+            'params': self.params,
+            'counts': self.counts,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'phases': [phase.to_dict() for phase in self.phases],
+            'writes': self.writes_summary(),
+            'memory': {
+                'peak_rss_mb': _mb(self.peak_rss),
+                'process_peak_rss_mb': _mb(process_peak_rss()),
+                'sampler': 'psutil' if psutil is not None else None,
+            },
+        }
+
+    def save(self, path: str) -> Dict[str, Any]:
+        """写出 JSON 报告（先写临时文件再替换）"""
+        data = self.to_dict()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        return data
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """格式化报告中的阶段表、写入延迟和内存峰值"""
+    header = f"{'phase':<28}{'seconds':>10}{'rows':>12}{'rows/sec':>12}{'peak_rss_mb':>13}"
+    lines = [header, '-' * len(header)]
+    for phase in report['phases']:
+        lines.append(f"{phase['phase']:<28}{phase['seconds']:>10.3f}{str(phase['rows'] or '-'):>12}"
+                     f"{str(phase['rows_per_second'] or '-'):>12}{str(phase['peak_rss_mb'] or '-'):>13}")
+    writes = report['writes']
+    if writes['batches']:
+        lines.append(f"writes: {writes['batches']} 批 {writes['rows']} 行，p50 {writes['p50_ms']}ms "
+                     f"p90 {writes['p90_ms']}ms p99 {writes['p99_ms']}ms max {writes['max_ms']}ms")
+    memory = report['memory']
+    lines.append(f"wall: {report['wall_seconds']}s，peak RSS {memory['peak_rss_mb'] or '-'} MB "
+                 f"(process peak {memory['process_peak_rss_mb'] or '-'} MB)")
+    return '\n'.join(lines)
+
+
+# ----------------------------------------------------------------------
+# 合成预测数据
+# ----------------------------------------------------------------------
+
+# 附加在实体名上的描述性片段，使合成数据也经过标准化规则
+_DESCRIPTIONS = ['', '', '', '是一种线性的结构', '通过指针实现', '指存储方式', '利用递归']
+
+
+def write_synthetic_predictions(path: str, rows: int, relations: List[str], entities: Optional[int] = None,
+                                seed: int = 0) -> int:
+    """
+    生成 relation_extend 输出格式（JSONL，每句若干 relationMentions）的合成预测
+
+    实体按 Zipf 分布抽取（少数高频实体、长尾低频实体），约 10% 的关系为 none，
+    置信度取两位小数以制造并列；同一实体对会重复出现，去重阶段有实际工作量。
+
+    Args:
+        path: 输出文件
+        rows: 关系提及总数
+        relations: 关系编码（不含 none）
+        entities: 实体数，默认约为 rows 的 1/20
+        seed: 随机种子
+
+    Returns:
+        int: 写入的句子（行）数
+    """
+    rng = np.random.default_rng(seed)
+    entities = entities or max(10, rows // 20)
+    names = np.array([f"实体{i}" for i in range(entities)], dtype=object)
+    head = names[np.minimum(rng.zipf(1.3, rows), entities) - 1]
+    tail = names[rng.integers(0, entities, rows)]
+    descriptions = np.array(_DESCRIPTIONS, dtype=object)
+    head = head + descriptions[rng.integers(0, len(descriptions), rows)]
+    labels = np.where(rng.random(rows) < 0.1, 'none', rng.choice(relations, rows))
+    confidence = np.round(rng.uniform(0.6, 1.0, rows), 2)
+    mentions_per_line = rng.integers(1, 4, rows)
+
+    lines = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        start = 0
+        while start < rows:
+            end = min(rows, start + int(mentions_per_line[start]))
+            mentions = [{'em1Text': head[i], 'em2Text': tail[i], 'label': str(labels[i]),
+                         'confidence': float(confidence[i])} for i in range(start, end)]
+            f.write(json.dumps({'sentText': f"句子{lines}", 'relationMentions': mentions}, ensure_ascii=False) + '\n')
+            lines += 1
+            start = end
+    return lines
@@ -56,6 +56,26 @@ class ConfigManager:
             'llm': {
                 'max_tokens': int(os.getenv('LLM_MAX_TOKENS', '2000')),
                 'temperature': float(os.getenv('LLM_TEMPERATURE', '0.7')),
+            },
+            
+            # 图谱可视化配置
+            'graph': {
+                'max_nodes': int(os.getenv('GRAPH_MAX_NODES', '50')),
+                'max_edges': int(os.getenv('GRAPH_MAX_EDGES', '100')),
+                'min_confidence': float(os.getenv('GRAPH_MIN_CONFIDENCE', '0.0')),
+                'lod_threshold': int(os.getenv('GRAPH_LOD_THRESHOLD', '80')),
+            },
+            
+            # 语义实体检索配置
+            'embedding': {
+                'index_path': os.getenv('EMBEDDING_INDEX_PATH', 'data/entity_index'),
+                'model_path': os.getenv('EMBEDDING_MODEL_PATH', os.getenv('NLU_MODEL_PATH', '/root/KG_inde/my_intent_model')),
+            },
+            
+            # 溯源句检索配置
+            'retrieval': {
+                'sentence_index_path': os.getenv('SENTENCE_INDEX_PATH', 'data/sentence_index'),
+                'evidence_top_k': int(os.getenv('EVIDENCE_TOP_K', '3')),
             }
         }
         
@@ -118,6 +138,18 @@ class ConfigManager:
         """获取大模型配置"""
         return self._config.get('llm', {})
     
+    def get_graph_config(self) -> Dict[str, Any]:
+        """获取图谱可视化配置"""
+        return self._config.get('graph', {})
+    
+    def get_embedding_config(self) -> Dict[str, Any]:
+        """获取语义实体检索配置"""
+        return self._config.get('embedding', {})
+    
+    def get_retrieval_config(self) -> Dict[str, Any]:
+        """获取溯源句检索配置"""
+        return self._config.get('retrieval', {})
+    
 
     
 
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+实体稠密向量索引模块
+离线把每个实体名及其邻域文本编码为向量，保存为 float16 的 .npy 矩阵（服务时内存映射）
+和 ID 表；查询时用 NumPy 分块计算余弦相似度取 top-k，用于描述性提及的语义实体检索
+（如 "先进先出的结构" → 队列）
+
+用法:
+    python -m modules.embedding_index build --output data/entity_index
+    python -m modules.embedding_index query --index data/entity_index 先进先出的结构
+    python -m modules.embedding_index benchmark --entities 100000
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class TextEncoder:
+    """基于本地BERT的句向量编码器（CLS 之外的 token 做均值池化，L2 归一化）"""
+
+    def __init__(self, model_path: str, max_length: int = 64, device: Optional[str] = None):
+        """
+        Args:
+            model_path: 本地模型目录（如 my_intent_model，只使用其编码器部分）
+            max_length: 最大序列长度
+            device: 运行设备，默认有 GPU 时用 GPU
+        """
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.torch = torch
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = AutoModel.from_pretrained(model_path).to(self.device).eval()
+        self.max_length = max_length
+
+    @property
+    def dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        编码文本
+
+        Returns:
+            np.ndarray: (len(texts), dimension) 的 float32 单位向量
+        """
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            inputs = self.tokenizer(batch, return_tensors='pt', truncation=True, padding=True,
+                                    max_length=self.max_length).to(self.device)
+            with self.torch.no_grad():
+                hidden = self.model(**inputs).last_hidden_state
+            mask = inputs['attention_mask'].unsqueeze(-1).float()
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1.0)
+            outputs.append(pooled.cpu().numpy().astype(np.float32))
+        if not outputs:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return normalize(np.vstack(outputs))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """按行做 L2 归一化"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingIndex:
+    """实体向量索引
+
+    文件布局（prefix 为路径前缀）:
+        prefix.npy       float16 单位向量矩阵，每行一个实体
+        prefix.ids.json  {"ids": [...实体名], "dimension": d, "graph_version": v, "model_path": p}
+    """
+
+    DEFAULT_TOP_K = 5
+    QUERY_CHUNK_ROWS = 65536  # 分块计算，避免把整个 float16 矩阵一次性转成 float32
+    RESIDENT_MAX_BYTES = 512 * 1024 * 1024  # 不超过该大小时首次查询后常驻一份 float32 副本
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], meta: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            vectors: (n, d) 单位向量矩阵（可以是内存映射数组）
+            ids: 与矩阵行对应的实体名
+            meta: 附加元数据（graph_version、model_path 等）
+        """
+        if len(ids) != vectors.shape[0]:
+            raise ValueError(f"ID表长度 {len(ids)} 与向量行数 {vectors.shape[0]} 不一致")
+        self.vectors = vectors
+        self.ids = ids
+        self.meta = meta or {}
+        self._resident = None
+
+    @property
+    def graph_version(self):
+        return self.meta.get('graph_version')
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def save(self, prefix: str):
+        """保存为 prefix.npy 和 prefix.ids.json（先写临时文件再替换）"""
+        directory = os.path.dirname(os.path.abspath(prefix))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(suffix='.npy', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.asarray(self.vectors, dtype=np.float16))
+        os.replace(tmp_path, prefix + '.npy')
+
+        meta = dict(self.meta, ids=self.ids, dimension=int(self.vectors.shape[1]))
+        with open(prefix + '.ids.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, prefix: str, mmap: bool = True) -> 'EmbeddingIndex':
+        """加载索引，默认内存映射矩阵（只读，按需换页）"""
+        with open(prefix + '.ids.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        ids = meta.pop('ids')
+        vectors = np.load(prefix + '.npy', mmap_mode='r' if mmap else None)
+        return cls(vectors, ids, meta)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def warm_up(self) -> bool:
+        """
+        把矩阵转换为常驻的 float32 副本（NumPy 的 float16 矩阵乘法没有 BLAS 加速，
+        每次查询都转换的开销远大于乘法本身）
+
+        Returns:
+            bool: 是否已常驻；超过 RESIDENT_MAX_BYTES 时保持分块流式计算
+        """
+        if self._resident is None and self.vectors.shape[0] * self.vectors.shape[1] * 4 <= self.RESIDENT_MAX_BYTES:
+            self._resident = np.asarray(self.vectors, dtype=np.float32)
+        return self._resident is not None
+
+    def search(self, queries: np.ndarray, k: int = DEFAULT_TOP_K,
+               min_score: float = -1.0) -> List[List[Tuple[str, float]]]:
+        """
+        批量余弦 top-k
+
+        Args:
+            queries: (q, d) 查询向量（会被归一化）
+            k: 每个查询返回的数量
+            min_score: 最低相似度
+
+        Returns:
+            List[List[Tuple[str, float]]]: 每个查询的 (实体名, 相似度)，按相似度降序
+        """
+        queries = normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        n = self.vectors.shape[0]
+        if n == 0:
+            return [[] for _ in range(len(queries))]
+        k = min(k, n)
+        matrix = self._resident if self.warm_up() else self.vectors
+
+        # 每块保留候选 top-k，最后合并
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, n, self.QUERY_CHUNK_ROWS):
+            chunk = np.asarray(matrix[start:start + self.QUERY_CHUNK_ROWS], dtype=np.float32)
+            scores = queries @ chunk.T
+            chunk_k = min(k, scores.shape[1])
+            top = np.argpartition(-scores, chunk_k - 1, axis=1)[:, :chunk_k]
+            best_scores = np.hstack([best_scores, np.take_along_axis(scores, top, axis=1)])
+            best_rows = np.hstack([best_rows, top + start])
+
+        order = np.argsort(-best_scores, axis=1)[:, :k]
+        results = []
+        for qi in range(len(queries)):
+            row = []
+            for idx in order[qi]:
+                score = float(best_scores[qi, idx])
+                if score < min_score:
+                    break
+                row.append((self.ids[int(best_rows[qi, idx])], score))
+            results.append(row)
+        return results
+
+
+def entity_documents(kg_query, max_neighbors: int = 20) -> List[Tuple[str, str]]:
+    """
+    读取每个实体的名称和邻域文本（"名称：关系 邻居；..."），用于编码
+
+    Returns:
+        List[Tuple[str, str]]: (实体名, 文本)
+    """
+    rows = kg_query.run_query('embedding_documents', """
+    MATCH (n:Entity)
+    OPTIONAL MATCH (n)-[r]-(m:Entity)
+    WITH n, r, m ORDER BY COALESCE(r.confidence, 1.0) DESC
+    WITH n, collect(CASE WHEN r IS NULL THEN NULL
+                         WHEN startNode(r) = n THEN type(r) + ' ' + m.name
+                         ELSE m.name + ' ' + type(r) END)[..$max_neighbors] AS context
+    RETURN n.name AS name, context
+    ORDER BY name
+    """, max_neighbors=max_neighbors)
+    return [(row['name'], f"{row['name']}：{'；'.join(row['context'])}") for row in rows]
+
+
+def build_index(kg_query, encoder: TextEncoder, batch_size: int = 64) -> EmbeddingIndex:
+    """离线构建：编码全部实体文档"""
+    documents = entity_documents(kg_query)
+    start_time = time.time()
+    vectors = encoder.encode([text for _, text in documents], batch_size)
+    logging.info(f"编码 {len(documents)} 个实体耗时 {time.time() - start_time:.1f}s")
+    return EmbeddingIndex(vectors.astype(np.float16), [name for name, _ in documents],
+                          {'graph_version': kg_query.graph_version})
+
+
+def benchmark(entity_count: int, dimension: int = 768, queries: int = 32, k: int = 10,
+              seed: int = 42) -> Dict[str, float]:
+    """在随机向量上测量保存、加载（内存映射）和查询延迟"""
+    rng = np.random.default_rng(seed)
+    vectors = normalize(rng.standard_normal((entity_count, dimension), dtype=np.float32)).astype(np.float16)
+    ids = [f"entity_{i}" for i in range(entity_count)]
+    query_vectors = rng.standard_normal((queries, dimension), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = os.path.join(tmp_dir, 'bench')
+        start_time = time.perf_counter()
+        EmbeddingIndex(vectors, ids).save(prefix)
+        save_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        index = EmbeddingIndex.load(prefix)
+        load_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        index.warm_up()
+        warm_up_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for q in query_vectors:
+            index.search(q, k)
+        single_ms = (time.perf_counter() - start_time) / queries * 1000
+
+        start_time = time.perf_counter()
+        index.search(query_vectors, k)
+        batch_ms = (time.perf_counter() - start_time) * 1000
+
+    return {
+        'entities': entity_count,
+        'dimension': dimension,
+        'index_mb': round(vectors.nbytes / 1024 / 1024, 1),
+        'save_s': round(save_time, 3),
+        'load_ms': round(load_time * 1000, 2),
+        'warm_up_ms': round(warm_up_time * 1000, 2),
+        'single_query_ms': round(single_ms, 2),
+        f'batch_{queries}_ms': round(batch_ms, 2),
+    }
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from modules.config_manager import get_config_manager
+
+    config = get_config_manager()
+    parser = argparse.ArgumentParser(description="实体稠密向量索引")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='从图谱构建索引')
+    build_parser.add_argument('--output', default=config.get('embedding.index_path'))
+    build_parser.add_argument('--model', default=config.get('embedding.model_path'))
+    build_parser.add_argument('--batch-size', type=int, default=config.get('model.batch_size', 32))
+
+    query_parser = subparsers.add_parser('query', help='查询索引')
+    query_parser.add_argument('text')
+    query_parser.add_argument('--index', default=config.get('embedding.index_path'))
+    query_parser.add_argument('--model', default=config.get('embedding.model_path'))
+    query_parser.add_argument('-k', type=int, default=EmbeddingIndex.DEFAULT_TOP_K)
+
+    bench_parser = subparsers.add_parser('benchmark', help='随机向量基准测试')
+    bench_parser.add_argument('--entities', type=int, default=100000)
+    bench_parser.add_argument('--dimension', type=int, default=768)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from modules.knowledge_graph_query import KnowledgeGraphQuery
+        db_config = config.get_database_config()
+        kg_query = KnowledgeGraphQuery(db_config['uri'], db_config['user_name'], db_config['password'])
+        index = build_index(kg_query, TextEncoder(args.model), args.batch_size)
+        index.meta['model_path'] = args.model
+        index.save(args.output)
+        print(f"✅ 已保存 {len(index.ids)} 个实体向量到 {args.output}.npy")
+    elif args.command == 'query':
+        index = EmbeddingIndex.load(args.index)
+        encoder = TextEncoder(args.model)
+        for name, score in index.search(encoder.encode([args.text]), args.k)[0]:
+            print(f"{score:.4f}  {name}")
+    else:
+        print(json.dumps(benchmark(args.entities, args.dimension), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+实体模糊链接模块
+对图谱节点名和知识库同义词建立字符 n-gram 倒排索引与 SymSpell 式删除索引，
+在精确匹配失败时把问题中的错别字（如 "红黑数"、"迪杰斯特拉算发"）链接到图谱实体
+
+用法:
+    python -m modules.entity_linker 红黑数和AVL树有什么区别
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    带上界的编辑距离（Levenshtein，只计算对角线附近的带状区域）
+
+    Returns:
+        int: 编辑距离，超过 max_distance 时返回 max_distance + 1
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+
+    too_far = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - max_distance)
+        hi = min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= max_distance else too_far
+        for j in range(lo, hi + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+        if min(current[lo - 1:hi + 1]) > max_distance:
+            return too_far
+        previous = current
+    return min(previous[len(b)], too_far)
+
+
+class EntityLinker:
+    """实体模糊链接器
+
+    - n-gram 倒排索引：从问题文本召回共享字符二元组足够多的候选实体名，
+      再在文本中长度相近的窗口上用带上界的编辑距离校验
+    - 删除索引（SymSpell）：对单个词做最大编辑距离内的快速查找
+    """
+
+    NGRAM_SIZE = 2
+    MIN_FUZZY_LENGTH = 3  # 更短的名称只做精确匹配，避免误链
+    MAX_RESULTS = 5
+
+    def __init__(self, surfaces: Optional[Dict[str, str]] = None):
+        """
+        初始化链接器
+
+        Args:
+            surfaces: 表面形式 -> 规范实体名
+        """
+        self.lock = threading.RLock()
+        self.version = None
+        self.surfaces: Dict[str, str] = {}
+        self.ngram_index: Dict[str, List[Tuple[str, int]]] = {}
+        self.delete_index: Dict[str, Set[str]] = {}
+        if surfaces:
+            self.build(surfaces)
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def max_distance(term: str) -> int:
+        """按长度确定允许的编辑距离"""
+        if len(term) < EntityLinker.MIN_FUZZY_LENGTH:
+            return 0
+        return 1 if len(term) < 6 else 2
+
+    @classmethod
+    def _ngrams(cls, text: str) -> List[Tuple[int, str]]:
+        return [(i, text[i:i + cls.NGRAM_SIZE]) for i in range(len(text) - cls.NGRAM_SIZE + 1)]
+
+    @staticmethod
+    def _deletes(term: str, distance: int) -> Set[str]:
+        """生成 distance 次以内删除字符得到的全部变体（含自身）"""
+        results = {term}
+        frontier = {term}
+        for _ in range(distance):
+            next_frontier = set()
+            for word in frontier:
+                for i in range(len(word)):
+                    next_frontier.add(word[:i] + word[i + 1:])
+            results |= next_frontier
+            frontier = next_frontier
+        return results
+
+    def build(self, surfaces: Dict[str, str], version: Any = None):
+        """
+        重建索引
+
+        Args:
+            surfaces: 表面形式 -> 规范实体名
+            version: 对应的图谱版本
+        """
+        ngram_index: Dict[str, List[Tuple[str, int]]] = {}
+        delete_index: Dict[str, Set[str]] = {}
+        clean_surfaces: Dict[str, str] = {}
+        for surface, canonical in surfaces.items():
+            surface = (surface or '').strip().lower()
+            if not surface or not canonical:
+                continue
+            clean_surfaces[surface] = canonical
+            if self.max_distance(surface) > 0:
+                for offset, gram in self._ngrams(surface):
+                    ngram_index.setdefault(gram, []).append((surface, offset))
+            for variant in self._deletes(surface, self.max_distance(surface)):
+                delete_index.setdefault(variant, set()).add(surface)
+
+        with self.lock:
+            self.surfaces = clean_surfaces
+            self.ngram_index = ngram_index
+            self.delete_index = delete_index
+            self.version = version
+        logging.info(f"实体链接索引已构建: {len(clean_surfaces)} 个名称, {len(ngram_index)} 个二元组")
+
+    @staticmethod
+    def collect_surfaces(names: Iterable[str], entities_kb: Optional[Dict[str, List[str]]] = None) -> Dict[str, str]:
+        """合并图谱节点名和知识库同义词（同义词链接到知识库的标准名）"""
+        surfaces = {name: name for name in names if name}
+        for entity_id, synonyms in (entities_kb or {}).items():
+            surfaces.setdefault(entity_id, entity_id)
+            for synonym in synonyms:
+                surfaces.setdefault(synonym, entity_id)
+        return surfaces
+
+    @classmethod
+    def from_graph(cls, kg_query, entities_kb: Optional[Dict[str, List[str]]] = None) -> 'EntityLinker':
+        """从图谱节点名和知识库同义词构建链接器，图谱不可用时只使用知识库"""
+        linker = cls()
+        linker.kg_query = kg_query
+        linker.entities_kb = entities_kb or {}
+        linker.refresh()
+        return linker
+
+    def refresh(self, force: bool = False):
+        """图谱版本变化（重建或增量更新）后重建索引"""
+        kg_query = getattr(self, 'kg_query', None)
+        entities_kb = getattr(self, 'entities_kb', {})
+        if kg_query is None:
+            return
+        try:
+            version = kg_query.graph_version
+            if not force and self.surfaces and version == self.version:
+                return
+            rows = kg_query.run_query('entity_linker_names', "MATCH (n:Entity) RETURN n.name AS name")
+            names = [row['name'] for row in rows]
+        except Exception as e:
+            logging.warning(f"读取图谱实体名失败，实体链接仅使用知识库: {e}")
+            version, names = None, []
+        self.build(self.collect_surfaces(names, entities_kb), version)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        查找与单个词编辑距离在范围内的实体
+
+        Returns:
+            List[Tuple[str, int]]: (规范实体名, 编辑距离)，按距离升序
+        """
+        term = (term or '').strip().lower()
+        if not term:
+            return []
+        if max_distance is None:
+            max_distance = self.max_distance(term)
+
+        with self.lock:
+            surfaces, delete_index = self.surfaces, self.delete_index
+
+        best: Dict[str, int] = {}
+        candidates = set()
+        for variant in self._deletes(term, max_distance):
+            candidates |= delete_index.get(variant, set())
+        for surface in candidates:
+            distance = bounded_edit_distance(term, surface, max_distance)
+            if distance <= max_distance:
+                canonical = surfaces[surface]
+                best[canonical] = min(distance, best.get(canonical, distance))
+        return sorted(best.items(), key=lambda item: (item[1], item[0]))[:self.MAX_RESULTS]
+
+    def link(self, text: str) -> List[Dict[str, Any]]:
+        """
+        在文本中查找被错写的实体
+
+        Returns:
+            List[Dict]: 每项含 entity、mention、distance，按在文本中的位置排序
+        """
+        text = (text or '').strip().lower()
+        if not text:
+            return []
+
+        with self.lock:
+            surfaces, ngram_index = self.surfaces, self.ngram_index
+
+        # n-gram 召回：记录共享二元组数和对齐位置（文本位置 - 名称内偏移）
+        shared: Dict[str, int] = {}
+        anchors: Dict[str, Set[int]] = {}
+        for position, gram in self._ngrams(text):
+            for surface, offset in ngram_index.get(gram, ()):
+                shared[surface] = shared.get(surface, 0) + 1
+                anchors.setdefault(surface, set()).add(position - offset)
+
+        matches = []
+        for surface, count in shared.items():
+            max_distance = self.max_distance(surface)
+            # 一次编辑最多破坏 NGRAM_SIZE 个二元组（q-gram 引理）
+            required = max(1, len(surface) - self.NGRAM_SIZE + 1 - self.NGRAM_SIZE * max_distance)
+            if count < required:
+                continue
+            # 只在对齐位置附近的窗口上校验编辑距离
+            windows = {
+                (start, length)
+                for anchor in anchors[surface]
+                for start in range(max(0, anchor - max_distance), anchor + max_distance + 1)
+                for length in range(len(surface) - max_distance, len(surface) + max_distance + 1)
+                if start + length <= len(text)
+            }
+            best = None
+            for start, length in windows:
+                mention = text[start:start + length]
+                distance = bounded_edit_distance(mention, surface, max_distance)
+                key = (distance, abs(length - len(surface)), start)
+                if distance <= max_distance and (best is None or key < best[0]):
+                    best = (key, start, mention)
+            if best is not None:
+                matches.append({'entity': surfaces[surface], 'mention': best[2],
+                                'distance': best[0][0], 'start': best[1]})
+
+        # 同一实体保留距离最小的提及；重叠的提及保留距离小、名称长的
+        matches.sort(key=lambda m: (m['distance'], -len(m['mention']), m['start']))
+        selected, covered, seen = [], set(), set()
+        for match in matches:
+            span = set(range(match['start'], match['start'] + len(match['mention'])))
+            if match['entity'] in seen or span & covered:
+                continue
+            selected.append(match)
+            covered |= span
+            seen.add(match['entity'])
+        selected.sort(key=lambda m: m['start'])
+        return [{k: m[k] for k in ('entity', 'mention', 'distance')} for m in selected[:self.MAX_RESULTS]]
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from intent_recognition.knowledge_base import KNOWLEDGE_BASE
+
+    text = ' '.join(sys.argv[1:]) or '红黑数和迪杰斯特拉算发有什么关系'
+    linker = EntityLinker(EntityLinker.collect_surfaces([], KNOWLEDGE_BASE['entities']))
+    start_time = time.perf_counter()
+    repeat = 1000
+    for _ in range(repeat):
+        result = linker.link(text)
+    elapsed = (time.perf_counter() - start_time) / repeat * 1000
+    print(f"{text} -> {result}")
+    print(f"平均耗时: {elapsed:.3f} ms ({len(linker.surfaces)} 个名称)")
+
+
+if __name__ == "__main__":
+    main()
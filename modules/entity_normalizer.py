@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+实体名称标准化模块
+去掉抽取结果中的描述性片段（"是…的…"、"指…"、"通过…" 等）和特殊字符。
+十万行预测里只有几千个不同的实体串，因此先 factorize 成唯一值，
+只对未见过的唯一值用 pandas .str 向量化替换，再按编码映射回每一行；
+结果写入持久化词典，图谱构建（neo4j/product.py）和关系扩展（relation_extend）共用
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 依次应用的描述性片段（顺序有意义：前一个删除后，后一个才匹配剩余文本）
+DESCRIPTION_PATTERNS = [
+    re.compile(r'是[\u4e00-\u9fa5]+的[\u4e00-\u9fa5]+'),
+    re.compile(r'指[\u4e00-\u9fa5]+'),
+    re.compile(r'通过[\u4e00-\u9fa5]+'),
+    re.compile(r'利用[\u4e00-\u9fa5]+'),
+    re.compile(r'从[\u4e00-\u9fa5]+'),
+]
+SPECIAL_CHARS = re.compile(r'[^\w\u4e00-\u9fa5]+')
+WHITESPACE = re.compile(r'\s+')
+
+# 规则变化后旧词典自动失效
+RULES_VERSION = hashlib.sha1('\n'.join(
+    [p.pattern for p in DESCRIPTION_PATTERNS] + [SPECIAL_CHARS.pattern, WHITESPACE.pattern]
+).encode('utf-8')).hexdigest()[:12]
+
+DEFAULT_DICTIONARY_PATH = os.getenv(
+    "ENTITY_NORMALIZATION_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "entity_normalization.json"))
+
+
+def normalize_text(entity) -> Optional[str]:
+    """标准化单个实体名称，结果为空时返回None"""
+    if entity is None or entity != entity or not str(entity).strip():  # None、NaN、空串
+        return None
+    entity = str(entity)
+    for pattern in DESCRIPTION_PATTERNS:
+        entity = pattern.sub('', entity)
+    entity = WHITESPACE.sub(' ', SPECIAL_CHARS.sub(' ', entity).strip())
+    return entity or None
+
+
+class EntityNormalizer:
+    """带持久化词典的实体标准化器（原始串 -> 标准名或None）"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_DICTIONARY_PATH):
+        """
+        Args:
+            path: 词典文件路径，None 表示只在内存中缓存
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.mapping: Dict[str, Optional[str]] = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def load(self, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('rules_version') != RULES_VERSION:
+            logging.info(f"标准化规则已变化，忽略旧词典: {path}")
+            return
+        self.mapping = data.get('entries', {})
+
+    def save(self, path: Optional[str] = None):
+        """词典有新条目时写回（先写临时文件再替换）"""
+        path = path or self.path
+        if not path or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.lock:
+            data = {'rules_version': RULES_VERSION, 'entries': dict(sorted(self.mapping.items()))}
+            self.dirty = False
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logging.info(f"实体标准化词典已保存: {len(data['entries'])} 条 -> {path}")
+
+    def normalize(self, entity) -> Optional[str]:
+        """标准化单个实体（查词典，未命中时计算并记录）"""
+        if not isinstance(entity, str):
+            return normalize_text(entity)
+        try:
+            return self.mapping[entity]
+        except KeyError:
+            result = normalize_text(entity)
+            with self.lock:
+                self.mapping[entity] = result
+                self.dirty = True
+            return result
+
+    def normalize_series(self, values: pd.Series) -> pd.Series:
+        """
+        批量标准化：factorize 成唯一值，只计算词典中没有的，再映射回原来的行
+
+        Returns:
+            pd.Series: 与 values 同索引，无效实体为None
+        """
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype=object).astype(str)
+        missing = uniques[~uniques.isin(self.mapping.keys())]
+        if len(missing):
+            cleaned = missing
+            for pattern in DESCRIPTION_PATTERNS:
+                cleaned = cleaned.str.replace(pattern, '', regex=True)
+            cleaned = (cleaned.str.replace(SPECIAL_CHARS, ' ', regex=True).str.strip()
+                       .str.replace(WHITESPACE, ' ', regex=True))
+            with self.lock:
+                for raw, result in zip(missing, cleaned):
+                    self.mapping[raw] = result if raw.strip() and result else None
+                self.dirty = True
+
+        normalized = np.array([self.mapping[raw] for raw in uniques] + [None], dtype=object)
+        # 缺失值的编码为 -1，正好取到末尾的 None
+        return pd.Series(normalized[codes], index=values.index, dtype=object)
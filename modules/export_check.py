@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+图谱导出条件请求检查
+通过 Flask 测试客户端请求 /graph/export：首次请求取得 ETag，携带 If-None-Match 重复请求应返回 304，
+过滤条件不同（ETag 不同）时应返回完整结果。需要可连接的 Neo4j。
+
+用法:
+    python -m modules.export_check
+    python -m modules.export_check --min-confidence 0.8
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.backend_api import APIHandler, create_flask_app
+from modules.config_manager import get_config_manager
+from modules.knowledge_graph_query import KnowledgeGraphQuery
+
+
+def run_checks(client, min_confidence: float):
+    """
+    依次执行条件请求用例
+
+    Returns:
+        List[tuple]: (用例名, 是否通过, 说明)
+    """
+    results = []
+    url = f"/graph/export?format=json&min_confidence={min_confidence}"
+
+    first = client.get(url)
+    etag = first.headers.get('ETag')
+    first.close()
+    results.append(('首次请求返回200和ETag', first.status_code == 200 and bool(etag),
+                    f"status={first.status_code} etag={etag}"))
+    if not etag:
+        return results
+
+    repeated = client.get(url, headers={'If-None-Match': etag})
+    repeated.close()
+    results.append(('携带ETag重复请求返回304', repeated.status_code == 304 and repeated.headers.get('ETag') == etag,
+                    f"status={repeated.status_code} etag={repeated.headers.get('ETag')}"))
+
+    listed = client.get(url, headers={'If-None-Match': f'"other", {etag}'})
+    listed.close()
+    results.append(('ETag列表中包含当前ETag返回304', listed.status_code == 304, f"status={listed.status_code}"))
+
+    other = client.get(f"/graph/export?format=json&min_confidence={min_confidence + 0.01}",
+                       headers={'If-None-Match': etag})
+    other_etag = other.headers.get('ETag')
+    other.close()
+    results.append(('过滤条件不同返回200', other.status_code == 200 and other_etag != etag,
+                    f"status={other.status_code} etag={other_etag}"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图谱导出条件请求检查")
+    parser.add_argument('--min-confidence', type=float, default=0.0, help='导出的置信度下限')
+    args = parser.parse_args()
+
+    db_config = get_config_manager().get_database_config()
+    kg_query = KnowledgeGraphQuery(db_config['uri'], db_config['user_name'], db_config['password'])
+    client = create_flask_app(APIHandler(kg_query=kg_query)).test_client()
+
+    results = run_checks(client, args.min_confidence)
+    for case, passed, detail in results:
+        print(f"{'✅' if passed else '❌'} {case}（{detail}）")
+    sys.exit(0 if all(passed for _, passed, _ in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
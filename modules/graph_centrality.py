@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+图谱中心性分析模块
+构建图谱后离线计算每个实体的度数、PageRank（NumPy 向量化幂迭代，按置信度加权）
+和介数中心性近似（networkx 抽样 Brandes），写回为节点属性并建立范围索引，
+使查询可以在数据库内 ORDER BY 综合得分 LIMIT k，而不是把上千行搬到 Python 再截断
+
+用法:
+    python -m modules.graph_centrality
+"""
+
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-8
+BETWEENNESS_SAMPLES = 256  # 介数中心性抽样的源点数
+WRITE_BATCH_SIZE = 5000
+
+# 综合中心性 = 各指标归一化到 [0, 1] 后的加权和
+CENTRALITY_WEIGHTS = {'pagerank': 0.5, 'degree': 0.3, 'betweenness': 0.2}
+
+
+def pagerank(node_count: int, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray,
+             damping: float = DAMPING, max_iterations: int = MAX_ITERATIONS,
+             tolerance: float = TOLERANCE) -> np.ndarray:
+    """
+    加权PageRank（无向处理：每条边两个方向都传递得分）
+
+    Args:
+        node_count: 节点数
+        sources, targets: 边两端的节点下标
+        weights: 边权（置信度）
+
+    Returns:
+        np.ndarray: 每个节点的PageRank，和为1
+    """
+    if node_count == 0:
+        return np.zeros(0)
+    src = np.concatenate([sources, targets])
+    dst = np.concatenate([targets, sources])
+    w = np.concatenate([weights, weights]).astype(np.float64)
+
+    out_weight = np.bincount(src, weights=w, minlength=node_count)
+    dangling = out_weight == 0
+    edge_share = np.divide(w, out_weight[src], out=np.zeros_like(w), where=out_weight[src] > 0)
+
+    rank = np.full(node_count, 1.0 / node_count)
+    for _ in range(max_iterations):
+        spread = np.bincount(dst, weights=rank[src] * edge_share, minlength=node_count)
+        new_rank = (1 - damping) / node_count + damping * (spread + rank[dangling].sum() / node_count)
+        if np.abs(new_rank - rank).sum() < tolerance:
+            rank = new_rank
+            break
+        rank = new_rank
+    return rank / rank.sum()
+
+
+def betweenness(names: Sequence[str], edges: List[Tuple[str, str, float]],
+                samples: int = BETWEENNESS_SAMPLES, seed: int = 42) -> Dict[str, float]:
+    """介数中心性近似（抽样 samples 个源点，无向、不加权）"""
+    import networkx as nx
+
+    graph = nx.Graph()
+    graph.add_nodes_from(names)
+    graph.add_edges_from((head, tail) for head, tail, _ in edges)
+    k = min(samples, graph.number_of_nodes())
+    if k == 0:
+        return {}
+    return nx.betweenness_centrality(graph, k=k, normalized=True, seed=seed)
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    peak = values.max() if len(values) else 0
+    return values / peak if peak > 0 else np.zeros_like(values, dtype=np.float64)
+
+
+def compute_centrality(names: Sequence[str], edges: List[Tuple[str, str, float]],
+                       samples: int = BETWEENNESS_SAMPLES) -> List[Dict[str, float]]:
+    """
+    计算全部中心性指标
+
+    Args:
+        names: 实体名列表
+        edges: (头实体, 尾实体, 置信度)
+
+    Returns:
+        List[Dict]: 每个实体一行，含 name、degree、pagerank、betweenness、centrality
+    """
+    index = {name: i for i, name in enumerate(names)}
+    edges = [(h, t, c) for h, t, c in edges if h in index and t in index]
+    sources = np.fromiter((index[h] for h, _, _ in edges), dtype=np.int64, count=len(edges))
+    targets = np.fromiter((index[t] for _, t, _ in edges), dtype=np.int64, count=len(edges))
+    weights = np.fromiter((c for _, _, c in edges), dtype=np.float64, count=len(edges))
+
+    degree = np.bincount(np.concatenate([sources, targets]), minlength=len(names)).astype(np.float64)
+    ranks = pagerank(len(names), sources, targets, weights)
+    between_map = betweenness(names, edges, samples)
+    between = np.array([between_map.get(name, 0.0) for name in names], dtype=np.float64)
+
+    centrality = (CENTRALITY_WEIGHTS['pagerank'] * _normalize(ranks)
+                  + CENTRALITY_WEIGHTS['degree'] * _normalize(degree)
+                  + CENTRALITY_WEIGHTS['betweenness'] * _normalize(between))
+
+    return [
+        {
+            'name': name,
+            'degree': int(degree[i]),
+            'pagerank': float(ranks[i]),
+            'betweenness': float(between[i]),
+            'centrality': round(float(centrality[i]), 6),
+        }
+        for i, name in enumerate(names)
+    ]
+
+
+def run_centrality_job(graph, samples: int = BETWEENNESS_SAMPLES, label: str = 'Entity') -> int:
+    """
+    读取图谱、计算中心性并写回节点属性，创建 centrality 范围索引
+
+    Args:
+        graph: py2neo Graph
+        label: 实体标签（蓝绿构建时为预备版本的标签）
+
+    Returns:
+        int: 更新的节点数
+    """
+    start_time = time.time()
+    names = [row['name'] for row in graph.run(f"MATCH (n:`{label}`) RETURN n.name AS name").data()]
+    edges = [
+        (row['head'], row['tail'], row['confidence'])
+        for row in graph.run(f"""
+        MATCH (h:`{label}`)-[r]->(t:`{label}`)
+        RETURN h.name AS head, t.name AS tail, COALESCE(r.confidence, 1.0) AS confidence
+        """).data()
+    ]
+    rows = compute_centrality(names, edges, samples)
+    compute_time = time.time() - start_time
+
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        graph.run(f"""
+        UNWIND $rows AS row
+        MATCH (n:`{label}` {{name: row.name}})
+        SET n.degree = row.degree,
+            n.pagerank = row.pagerank,
+            n.betweenness = row.betweenness,
+            n.centrality = row.centrality
+        """, rows=rows[start:start + WRITE_BATCH_SIZE])
+    graph.run("CREATE RANGE INDEX entity_centrality_index IF NOT EXISTS FOR (e:Entity) ON (e.centrality)")
+
+    logging.info(f"中心性计算 {len(names)} 个节点、{len(edges)} 条边耗时 {compute_time:.2f}s，"
+                 f"总耗时 {time.time() - start_time:.2f}s")
+    return len(rows)
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from py2neo import Graph
+    from modules.config_manager import get_config_manager
+
+    db_config = get_config_manager().get_database_config()
+    graph = Graph(db_config['uri'], auth=(db_config['user_name'], db_config['password']))
+    count = run_centrality_job(graph)
+    print(f"✅ 已更新 {count} 个节点的中心性")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+知识图谱导出模块
+以键集分页（keyset pagination）流式导出全图节点和关系，供图谱页面加载实时数据
+"""
+
+import hashlib
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class GraphExporter:
+    """知识图谱流式导出器
+
+    按实体名键集分页读取节点和关系：实体名有唯一约束（entity_name_unique），
+    name > $after 的范围查找和按名称排序都由索引完成，每页只读取本页的行，
+    避免 SKIP 或按 elementId 排序时每页都要扫描全部节点。
+    关系按起点实体分页，每页取一批起点实体的全部出边。
+    支持按实体类型、关系类型和置信度过滤。
+    """
+
+    DEFAULT_PAGE_SIZE = 2000
+    MAX_PAGE_SIZE = 10000
+
+    NODE_PAGE_QUERY = """
+    MATCH (n:Entity)
+    WHERE n.name > $after
+    AND ($types IS NULL OR n.type IN $types)
+    RETURN n.name AS id, n.name AS name, n.type AS type
+    ORDER BY n.name
+    LIMIT $page_size
+    """
+
+    # 每行一个起点实体及其（过滤后的）全部出边，没有出边的起点也返回一行以推进分页位置
+    RELATIONSHIP_PAGE_QUERY = """
+    MATCH (src:Entity)
+    WHERE src.name > $after
+    AND ($types IS NULL OR src.type IN $types)
+    WITH src
+    ORDER BY src.name
+    LIMIT $page_size
+    OPTIONAL MATCH (src)-[r]->(dst:Entity)
+    WHERE ($relations IS NULL OR type(r) IN $relations)
+    AND ($types IS NULL OR dst.type IN $types)
+    AND COALESCE(r.confidence, 1.0) >= $min_confidence
+    WITH src, r, dst
+    ORDER BY src.name, type(r), dst.name
+    RETURN src.name AS id,
+           collect(CASE WHEN r IS NULL THEN NULL ELSE
+               {relation: type(r), target: dst.name, confidence: COALESCE(r.confidence, 1.0)} END) AS links
+    ORDER BY id
+    """
+
+    def __init__(self, kg_query):
+        """
+        初始化导出器
+
+        Args:
+            kg_query: 知识图谱查询器实例（使用其 graph 连接和图谱版本）
+        """
+        self.kg_query = kg_query
+
+    @staticmethod
+    def _normalize_filters(types: Optional[List[str]] = None,
+                           relations: Optional[List[str]] = None,
+                           min_confidence: float = 0.0) -> Dict[str, Any]:
+        """规范化过滤参数，空列表视为不过滤"""
+        return {
+            'types': sorted(set(types)) if types else None,
+            'relations': sorted(set(relations)) if relations else None,
+            'min_confidence': float(min_confidence or 0.0)
+        }
+
+    def compute_etag(self, types: Optional[List[str]] = None,
+                     relations: Optional[List[str]] = None,
+                     min_confidence: float = 0.0) -> str:
+        """
+        根据图谱版本和过滤条件计算ETag
+
+        Returns:
+            str: 不带引号的ETag（写响应头时由 Response.set_etag 加引号）
+        """
+        filters = self._normalize_filters(types, relations, min_confidence)
+        version = self.kg_query.get_graph_version()
+        payload = json.dumps({'version': version, **filters}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _iter_pages(self, template: str, query: str, after: str, page_size: int,
+                    params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """按实体名键集分页迭代查询结果（每行的 id 为实体名）"""
+        page_size = max(1, min(int(page_size), self.MAX_PAGE_SIZE))
+        while True:
+            rows = self.kg_query.run_query(template, query, after=after, page_size=page_size, **params)
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                break
+            after = rows[-1]['id']
+
+    def iter_nodes(self, types: Optional[List[str]] = None, after: str = '',
+                   page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        流式迭代实体节点
+
+        Args:
+            types: 实体类型过滤
+            after: 从该实体名之后开始（用于断点续传）
+            page_size: 每页条数
+        """
+        filters = self._normalize_filters(types)
+        return self._iter_pages('export_nodes', self.NODE_PAGE_QUERY, after, page_size, {'types': filters['types']})
+
+    def iter_relationships(self, types: Optional[List[str]] = None,
+                           relations: Optional[List[str]] = None,
+                           min_confidence: float = 0.0, after: str = '',
+                           page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        流式迭代关系
+
+        Args:
+            types: 两端实体类型过滤
+            relations: 关系类型过滤
+            min_confidence: 最低置信度
+            after: 从该起点实体名之后开始（用于断点续传）
+            page_size: 每页的起点实体数
+        """
+        filters = self._normalize_filters(types, relations, min_confidence)
+        for row in self._iter_pages('export_relationships', self.RELATIONSHIP_PAGE_QUERY, after, page_size, filters):
+            for link in row['links']:
+                yield {'source': row['id'], **link}
+
+    def stream_ndjson(self, types: Optional[List[str]] = None,
+                      relations: Optional[List[str]] = None,
+                      min_confidence: float = 0.0,
+                      page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[str]:
+        """
+        以NDJSON格式流式导出，每行一个节点或关系，最后一行为结束标记
+
+        Yields:
+            str: 一行JSON（含换行符）
+        """
+        node_count = 0
+        for node in self.iter_nodes(types, page_size=page_size):
+            node_count += 1
+            yield json.dumps({'kind': 'node', **node}, ensure_ascii=False) + '\n'
+
+        link_count = 0
+        for rel in self.iter_relationships(types, relations, min_confidence, page_size=page_size):
+            link_count += 1
+            yield json.dumps({'kind': 'link', **rel}, ensure_ascii=False) + '\n'
+
+        logging.info(f"图谱导出完成: {node_count} 个节点, {link_count} 个关系")
+        yield json.dumps({'kind': 'end', 'node_count': node_count, 'link_count': link_count}) + '\n'
+
+    def stream_json(self, types: Optional[List[str]] = None,
+                    relations: Optional[List[str]] = None,
+                    min_confidence: float = 0.0,
+                    page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[str]:
+        """
+        以分块JSON流式导出，结构与 Vue/src/data/graph.json 的 nodes/links 一致
+
+        Yields:
+            str: JSON文本片段
+        """
+        yield '{"nodes":['
+        separator = ''
+        for node in self.iter_nodes(types, page_size=page_size):
+            yield separator + json.dumps({'name': node['name'], 'category': node['type']}, ensure_ascii=False)
+            separator = ','
+
+        yield '],"links":['
+        separator = ''
+        for rel in self.iter_relationships(types, relations, min_confidence, page_size=page_size):
+            link = {
+                'source': rel['source'],
+                'target': rel['target'],
+                'confidence': rel['confidence'],
+                'label': {'show': True, 'formatter': rel['relation']}
+            }
+            yield separator + json.dumps(link, ensure_ascii=False)
+            separator = ','
+        yield ']}'
+
+
+def gzip_stream(chunks: Iterator[str], level: int = 6) -> Iterator[bytes]:
+    """
+    对文本流逐块进行gzip压缩
+
+    Args:
+        chunks: 文本片段迭代器
+        level: 压缩级别
+
+    Yields:
+        bytes: gzip数据块
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+图谱清单模块
+记录当前图谱中每个三元组 (头实体, 关系类型, 尾实体) -> 置信度，
+增量构建时与新一批三元组比对，得到需要新增 / 提升置信度 / 撤回的关系，
+只写入变化部分而不清空数据库
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Tuple
+
+Triple = Tuple[str, str, str]
+
+
+class GraphManifest:
+    """三元组清单（JSON 文件，按三元组排序写出，便于 diff）"""
+
+    def __init__(self, triples: Dict[Triple, float] = None, graph_version: Any = None):
+        self.triples: Dict[Triple, float] = dict(triples or {})
+        self.graph_version = graph_version
+
+    def __len__(self):
+        return len(self.triples)
+
+    @classmethod
+    def load(cls, path: str) -> 'GraphManifest':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls({(h, r, t): c for h, r, t, c in data['triples']}, data.get('graph_version'))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], graph_version: Any = None) -> 'GraphManifest':
+        """由 head、relation、tail、confidence 行构建（如从数据库扫描得到）"""
+        return cls({(row['head'], row['relation'], row['tail']): float(row['confidence']) for row in rows},
+                   graph_version)
+
+    def save(self, path: str):
+        """先写临时文件再替换，避免中断时留下半个清单"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {
+            'graph_version': self.graph_version,
+            'triples': [[h, r, t, c] for (h, r, t), c in sorted(self.triples.items())],
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=0)
+        os.replace(tmp_path, path)
+
+    def diff(self, incoming: Dict[Triple, float]) -> Dict[str, List[Triple]]:
+        """
+        与新一批三元组比对
+
+        Args:
+            incoming: 新的完整三元组集合 -> 置信度
+
+        Returns:
+            Dict: added（新三元组）、improved（置信度提高）、retracted（不再出现）
+        """
+        added, improved = [], []
+        for triple, confidence in incoming.items():
+            old = self.triples.get(triple)
+            if old is None:
+                added.append(triple)
+            elif confidence > old:
+                improved.append(triple)
+        retracted = [triple for triple in self.triples if triple not in incoming]
+        return {'added': sorted(added), 'improved': sorted(improved), 'retracted': sorted(retracted)}
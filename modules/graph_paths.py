@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+图路径引擎模块
+在进程内邻接表上查找两个概念之间置信度最高的 top-k 条路径
+"""
+
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class PathSearchTimeout(Exception):
+    """路径搜索超出时间限制"""
+
+
+class PathEngine:
+    """加权最短路径引擎
+
+    边权为 -log(confidence)，因此权重最小的路径即置信度之积最大的路径。
+    最短路径使用双向 Dijkstra，top-k 路径使用 Yen 算法；邻接表按图谱版本
+    从Neo4j加载一次，计算出的路径按 (起点, 终点, 参数, 图谱版本) 缓存。
+    """
+
+    DEFAULT_TOP_K = 3
+    DEFAULT_MAX_HOPS = 4
+    DEFAULT_TIMEOUT = 2.0
+    PATH_CACHE_SIZE = 1024
+
+    ADJACENCY_QUERY = """
+    MATCH (a:Entity)-[r]->(b:Entity)
+    WHERE COALESCE(r.confidence, 1.0) >= $threshold
+    RETURN a.name AS entity1, type(r) AS relation_type, b.name AS entity2,
+           COALESCE(r.confidence, 1.0) AS confidence
+    """
+
+    def __init__(self, kg_query, confidence_threshold: float = 0.0):
+        """
+        初始化路径引擎
+
+        Args:
+            kg_query: 知识图谱查询器实例（使用其 graph 连接和图谱版本）
+            confidence_threshold: 加载邻接表时的边置信度下限
+        """
+        self.kg_query = kg_query
+        self.confidence_threshold = confidence_threshold
+
+        # 节点 -> [(邻居, 权重, 是否正向, 关系信息)]
+        self.adjacency: Dict[str, List[Tuple[str, float, bool, Dict[str, Any]]]] = {}
+        self.adjacency_version = None
+        self.path_cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self.lock = threading.RLock()
+
+    def load_adjacency(self, edges: List[Dict[str, Any]], version: Any = None):
+        """
+        由关系列表构建邻接表，同一对节点同方向只保留置信度最高的关系
+
+        Args:
+            edges: 含 entity1、relation_type、entity2、confidence 的关系列表
+            version: 邻接表对应的图谱版本
+        """
+        best: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for edge in edges:
+            confidence = edge.get('confidence')
+            confidence = 1.0 if confidence is None else confidence
+            if confidence <= 0 or confidence < self.confidence_threshold:
+                continue
+            key = (edge['entity1'], edge['entity2'])
+            if key not in best or confidence > best[key]['confidence']:
+                best[key] = {
+                    'entity1': edge['entity1'],
+                    'relation_type': edge['relation_type'],
+                    'entity2': edge['entity2'],
+                    'confidence': confidence
+                }
+
+        adjacency: Dict[str, List[Tuple[str, float, bool, Dict[str, Any]]]] = {}
+        for (head, tail), edge in best.items():
+            weight = -math.log(min(edge['confidence'], 1.0))
+            adjacency.setdefault(head, []).append((tail, weight, True, edge))
+            adjacency.setdefault(tail, []).append((head, weight, False, edge))
+
+        with self.lock:
+            self.adjacency = adjacency
+            self.adjacency_version = version
+            self.path_cache.clear()
+        logging.info(f"路径引擎邻接表已加载: {len(adjacency)} 个节点, {len(best)} 条关系")
+
+    def _ensure_adjacency(self) -> Any:
+        """图谱版本变化时重新加载邻接表，返回当前版本"""
+        version = self.kg_query.get_graph_version()
+        if self.adjacency_version != version:
+            edges = self.kg_query.run_query('path_adjacency', self.ADJACENCY_QUERY,
+                                            threshold=self.confidence_threshold)
+            self.load_adjacency(edges, version)
+        return version
+
+    def _neighbors(self, node: str, directed: bool, reverse: bool, min_confidence: float):
+        """遍历邻居；有向模式下正向搜索只走出边，反向搜索只走入边"""
+        for neighbor, weight, forward, edge in self.adjacency.get(node, ()):
+            if directed and forward == reverse:
+                continue
+            if edge['confidence'] < min_confidence:
+                continue
+            yield neighbor, weight, edge
+
+    def _bidirectional_dijkstra(self, source: str, target: str,
+                                removed_nodes: Set[str], removed_edges: Set[tuple],
+                                directed: bool, min_confidence: float, deadline: float) -> Optional[Tuple[float, List[str], List[Dict[str, Any]]]]:
+        """
+        双向 Dijkstra 最短路径
+
+        Returns:
+            (总权重, 节点序列, 关系序列)，不可达时返回 None
+        """
+        if source == target:
+            return 0.0, [source], []
+
+        dist = [{source: 0.0}, {target: 0.0}]
+        prev: List[Dict[str, Tuple[str, Dict[str, Any]]]] = [{}, {}]
+        heaps = [[(0.0, source)], [(0.0, target)]]
+        settled: List[Set[str]] = [set(), set()]
+        best_total = math.inf
+        meeting = None
+
+        while heaps[0] and heaps[1]:
+            if time.time() > deadline:
+                raise PathSearchTimeout()
+            if heaps[0][0][0] + heaps[1][0][0] >= best_total:
+                break
+
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, node = heapq.heappop(heaps[side])
+            if node in settled[side]:
+                continue
+            settled[side].add(node)
+
+            for neighbor, weight, edge in self._neighbors(node, directed, bool(side), min_confidence):
+                if neighbor in removed_nodes:
+                    continue
+                edge_key = (node, neighbor) if side == 0 else (neighbor, node)
+                if edge_key in removed_edges:
+                    continue
+                new_dist = d + weight
+                if new_dist < dist[side].get(neighbor, math.inf):
+                    dist[side][neighbor] = new_dist
+                    prev[side][neighbor] = (node, edge)
+                    heapq.heappush(heaps[side], (new_dist, neighbor))
+                if neighbor in dist[1 - side]:
+                    total = dist[side][neighbor] + dist[1 - side][neighbor]
+                    if total < best_total:
+                        best_total = total
+                        meeting = neighbor
+
+        if meeting is None:
+            return None
+
+        nodes = [meeting]
+        edges: List[Dict[str, Any]] = []
+        node = meeting
+        while node in prev[0]:
+            node, edge = prev[0][node]
+            nodes.insert(0, node)
+            edges.insert(0, edge)
+        node = meeting
+        while node in prev[1]:
+            node, edge = prev[1][node]
+            nodes.append(node)
+            edges.append(edge)
+        return best_total, nodes, edges
+
+    def _hop_bounded_dijkstra(self, source: str, target: str, max_hops: int,
+                              removed_nodes: Set[str], removed_edges: Set[tuple],
+                              directed: bool, min_confidence: float, deadline: float) -> Optional[Tuple[float, List[str], List[Dict[str, Any]]]]:
+        """
+        跳数不超过 max_hops 的最短路径（状态为 (节点, 跳数) 的 Dijkstra）
+
+        出堆顺序为 (权重, 跳数)，节点上已有跳数不多于当前状态的出堆记录时当前状态被支配；
+        同权重时跳数更少的路径优先，因此找到的路径不含环。
+
+        Returns:
+            (总权重, 节点序列, 关系序列)，不可达时返回 None
+        """
+        if source == target:
+            return 0.0, [source], []
+
+        dist: Dict[Tuple[str, int], float] = {(source, 0): 0.0}
+        prev: Dict[Tuple[str, int], Tuple[str, Dict[str, Any]]] = {}
+        settled: Dict[str, List[int]] = {}
+        heap = [(0.0, 0, source)]
+
+        while heap:
+            if time.time() > deadline:
+                raise PathSearchTimeout()
+            d, hops, node = heapq.heappop(heap)
+            if d > dist[(node, hops)] or any(h <= hops for h in settled.get(node, ())):
+                continue
+            settled.setdefault(node, []).append(hops)
+
+            if node == target:
+                nodes = [node]
+                edges: List[Dict[str, Any]] = []
+                while hops > 0:
+                    node, edge = prev[(node, hops)]
+                    hops -= 1
+                    nodes.insert(0, node)
+                    edges.insert(0, edge)
+                return d, nodes, edges
+            if hops >= max_hops:
+                continue
+
+            for neighbor, weight, edge in self._neighbors(node, directed, False, min_confidence):
+                if neighbor in removed_nodes or (node, neighbor) in removed_edges:
+                    continue
+                if any(h <= hops + 1 for h in settled.get(neighbor, ())):
+                    continue
+                state = (neighbor, hops + 1)
+                new_dist = d + weight
+                if new_dist < dist.get(state, math.inf):
+                    dist[state] = new_dist
+                    prev[state] = (node, edge)
+                    heapq.heappush(heap, (new_dist, hops + 1, neighbor))
+        return None
+
+    def _shortest_path(self, source: str, target: str, max_hops: int,
+                       removed_nodes: Set[str], removed_edges: Set[tuple],
+                       directed: bool, min_confidence: float, deadline: float) -> Optional[Tuple[float, List[str], List[Dict[str, Any]]]]:
+        """
+        跳数不超过 max_hops 的最短路径：先用双向 Dijkstra，最短路径超出跳数时改用按跳数约束的搜索
+
+        Returns:
+            (总权重, 节点序列, 关系序列)，在跳数限制内不可达时返回 None
+        """
+        path = self._bidirectional_dijkstra(source, target, removed_nodes, removed_edges,
+                                            directed, min_confidence, deadline)
+        if path is None or len(path[2]) <= max_hops:
+            return path
+        return self._hop_bounded_dijkstra(source, target, max_hops, removed_nodes, removed_edges,
+                                          directed, min_confidence, deadline)
+
+    def _path_weight(self, edges: List[Dict[str, Any]]) -> float:
+        return sum(-math.log(min(edge['confidence'], 1.0)) for edge in edges)
+
+    def _yen(self, source: str, target: str, k: int, max_hops: int,
+             directed: bool, min_confidence: float, deadline: float) -> Tuple[List[Tuple[float, List[str], List[Dict[str, Any]]]], bool]:
+        """
+        Yen 算法求跳数不超过 max_hops 的 top-k 条无环路径（跳数限制在每次偏离路径搜索中执行）
+
+        Returns:
+            (已找到的路径, 是否超时)
+        """
+        accepted: List[Tuple[float, List[str], List[Dict[str, Any]]]] = []
+        try:
+            first = self._shortest_path(source, target, max_hops, set(), set(), directed,
+                                        min_confidence, deadline)
+            if first is None:
+                return accepted, False
+            self._yen_expand(first, target, k, max_hops, directed, min_confidence, deadline, accepted)
+        except PathSearchTimeout:
+            return accepted, True
+        return accepted, False
+
+    def _yen_expand(self, first, target: str, k: int, max_hops: int, directed: bool,
+                    min_confidence: float, deadline: float, accepted: List[Tuple[float, List[str], List[Dict[str, Any]]]]):
+        """从最短路径出发迭代生成偏离路径，结果写入 accepted"""
+        candidates: List[Tuple[float, List[str], List[Dict[str, Any]]]] = []
+        seen = {tuple(first[1])}
+        heapq.heappush(candidates, first)
+
+        while candidates and len(accepted) < k:
+            weight, nodes, edges = heapq.heappop(candidates)
+            accepted.append((weight, nodes, edges))
+
+            for i in range(len(nodes) - 1):
+                spur_node = nodes[i]
+                root_nodes = nodes[:i + 1]
+                root_edges = edges[:i]
+
+                removed_edges = set()
+                for _, other_nodes, _ in accepted + [(weight, nodes, edges)]:
+                    if other_nodes[:i + 1] == root_nodes and len(other_nodes) > i + 1:
+                        removed_edges.add((other_nodes[i], other_nodes[i + 1]))
+                        removed_edges.add((other_nodes[i + 1], other_nodes[i]))
+                removed_nodes = set(root_nodes[:-1])
+
+                # 偏离路径只能使用根路径剩余的跳数
+                spur = self._shortest_path(spur_node, target, max_hops - i, removed_nodes,
+                                           removed_edges, directed, min_confidence, deadline)
+                if spur is None:
+                    continue
+                total_nodes = root_nodes[:-1] + spur[1]
+                key = tuple(total_nodes)
+                if key in seen:
+                    continue
+                seen.add(key)
+                total_edges = root_edges + spur[2]
+                heapq.heappush(candidates, (self._path_weight(total_edges), total_nodes, total_edges))
+
+    def find_paths(self, source: str, target: str, k: int = DEFAULT_TOP_K,
+                   max_hops: int = DEFAULT_MAX_HOPS, timeout: float = DEFAULT_TIMEOUT,
+                   directed: bool = False, min_confidence: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        查找两个实体之间置信度最高的 top-k 条路径（带缓存）
+
+        Args:
+            source: 起点实体
+            target: 终点实体
+            k: 返回路径数
+            max_hops: 路径最大跳数
+            timeout: 单次查询时间限制（秒），超时返回已找到的路径
+            directed: 是否只沿关系方向搜索
+            min_confidence: 路径上每条边的置信度下限
+
+        Returns:
+            List[Dict]: 路径列表，每条含 nodes、relations、confidence、hops
+        """
+        version = self._ensure_adjacency()
+        cache_key = (source, target, k, max_hops, directed, min_confidence, version)
+        with self.lock:
+            if cache_key in self.path_cache:
+                self.path_cache.move_to_end(cache_key)
+                return self.path_cache[cache_key]
+
+        if source not in self.adjacency or target not in self.adjacency:
+            return []
+
+        start_time = time.time()
+        raw_paths, timed_out = self._yen(source, target, k, max_hops, directed,
+                                         min_confidence, start_time + timeout)
+        if timed_out:
+            logging.warning(f"路径搜索超时: {source} -> {target}（{timeout}s），返回已找到的 {len(raw_paths)} 条路径")
+
+        paths = [{
+            'nodes': nodes,
+            'relations': edges,
+            'confidence': math.exp(-weight),
+            'hops': len(edges)
+        } for weight, nodes, edges in raw_paths]
+
+        logging.info(f"路径搜索 {source} -> {target}: {len(paths)} 条路径，耗时: {time.time() - start_time:.3f}s")
+
+        if not timed_out:
+            with self.lock:
+                self.path_cache[cache_key] = paths
+                while len(self.path_cache) > self.PATH_CACHE_SIZE:
+                    self.path_cache.popitem(last=False)
+        return paths
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+图谱统计模块
+在构建图谱时计算统计信息（按实体类型、关系类型的计数，度分布）并与图谱版本一起写入
+GraphMeta 节点；查询层直接读取该节点（O(1)），新增三元组时只根据变化量增量更新
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# GraphMeta 节点的唯一键
+META_KEY = 'graph'
+
+
+def degree_bucket(degree: int) -> str:
+    """度数分桶：0、1、2-3、4-7、8-15 ..."""
+    if degree <= 0:
+        return '0'
+    if degree == 1:
+        return '1'
+    low = 1 << (degree.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+def _bucket_sort_key(bucket: str) -> int:
+    return int(bucket.split('-')[0])
+
+
+class GraphStatistics:
+    """图谱统计信息
+
+    node_types / relationship_types 为 类型 -> 数量，degree_histogram 为 度数分桶 -> 节点数。
+    """
+
+    def __init__(self, node_types: Optional[Dict[str, int]] = None,
+                 relationship_types: Optional[Dict[str, int]] = None,
+                 degree_histogram: Optional[Dict[str, int]] = None,
+                 max_degree: int = 0, version: Any = None, updated_at: float = None):
+        self.node_types = dict(node_types or {})
+        self.relationship_types = dict(relationship_types or {})
+        self.degree_histogram = dict(degree_histogram or {})
+        self.max_degree = max_degree
+        self.version = version
+        self.updated_at = updated_at
+
+    @property
+    def node_count(self) -> int:
+        return sum(self.node_types.values())
+
+    @property
+    def relationship_count(self) -> int:
+        return sum(self.relationship_types.values())
+
+    @classmethod
+    def from_graph_data(cls, nodes: Dict[str, str], triples: Iterable[Tuple[str, str, str]]) -> 'GraphStatistics':
+        """
+        由构建时已在内存中的数据计算统计（不扫描数据库）
+
+        Args:
+            nodes: 实体名 -> 实体类型
+            triples: (头实体, 关系类型, 尾实体)
+        """
+        stats = cls()
+        degrees = {name: 0 for name in nodes}
+        for entity_type in nodes.values():
+            stats.node_types[entity_type] = stats.node_types.get(entity_type, 0) + 1
+        for head, rel_type, tail in triples:
+            stats.relationship_types[rel_type] = stats.relationship_types.get(rel_type, 0) + 1
+            degrees[head] = degrees.get(head, 0) + 1
+            degrees[tail] = degrees.get(tail, 0) + 1
+        for degree in degrees.values():
+            bucket = degree_bucket(degree)
+            stats.degree_histogram[bucket] = stats.degree_histogram.get(bucket, 0) + 1
+        stats.max_degree = max(degrees.values(), default=0)
+        return stats
+
+    def apply_delta(self, new_nodes: Dict[str, str], triples: List[Tuple[str, str, str]],
+                    degrees_after: Dict[str, int]):
+        """
+        增量更新：新增节点和关系
+
+        Args:
+            new_nodes: 新建的实体名 -> 实体类型
+            triples: 新增的 (头实体, 关系类型, 尾实体)
+            degrees_after: 受影响实体在新增之后的度数
+        """
+        for entity_type in new_nodes.values():
+            self.node_types[entity_type] = self.node_types.get(entity_type, 0) + 1
+
+        added: Dict[str, int] = {}
+        for head, rel_type, tail in triples:
+            self.relationship_types[rel_type] = self.relationship_types.get(rel_type, 0) + 1
+            added[head] = added.get(head, 0) + 1
+            added[tail] = added.get(tail, 0) + 1
+
+        # 新节点原本不在直方图中；已有节点从旧桶移到新桶
+        for name in set(added) | set(new_nodes):
+            new_degree = degrees_after.get(name, added.get(name, 0))
+            if name not in new_nodes:
+                old_bucket = degree_bucket(new_degree - added.get(name, 0))
+                self.degree_histogram[old_bucket] = self.degree_histogram.get(old_bucket, 0) - 1
+                if self.degree_histogram[old_bucket] <= 0:
+                    del self.degree_histogram[old_bucket]
+            new_bucket = degree_bucket(new_degree)
+            self.degree_histogram[new_bucket] = self.degree_histogram.get(new_bucket, 0) + 1
+            self.max_degree = max(self.max_degree, new_degree)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """查询层返回的统计结构（兼容原 get_statistics 的字段）"""
+        return {
+            'node_count': self.node_count,
+            'relationship_count': self.relationship_count,
+            'relationship_types': [
+                {'rel_type': rel_type, 'count': count}
+                for rel_type, count in sorted(self.relationship_types.items(), key=lambda item: (-item[1], item[0]))
+            ],
+            'node_types': dict(sorted(self.node_types.items())),
+            'degree_histogram': dict(sorted(self.degree_histogram.items(), key=lambda item: _bucket_sort_key(item[0]))),
+            'max_degree': self.max_degree,
+            'graph_version': self.version,
+            'updated_at': self.updated_at,
+        }
+
+    # ------------------------------------------------------------------
+    # GraphMeta 节点读写（py2neo Graph）
+    # ------------------------------------------------------------------
+
+    def write(self, graph, version: Any = None, key: str = META_KEY):
+        """写入 GraphMeta 节点；version 为空时使用当前毫秒时间戳，key 为 'staging' 时写入预备版本"""
+        self.version = version if version is not None else int(time.time() * 1000)
+        self.updated_at = time.time()
+        graph.run("""
+        MERGE (m:GraphMeta {key: $key})
+        SET m.version = $version,
+            m.updated_at = $updated_at,
+            m.node_types = $node_types,
+            m.relationship_types = $relationship_types,
+            m.degree_histogram = $degree_histogram,
+            m.max_degree = $max_degree
+        """, key=key, version=self.version, updated_at=self.updated_at,
+                  node_types=json.dumps(self.node_types, ensure_ascii=False),
+                  relationship_types=json.dumps(self.relationship_types, ensure_ascii=False),
+                  degree_histogram=json.dumps(self.degree_histogram),
+                  max_degree=self.max_degree)
+
+    @classmethod
+    def from_meta(cls, meta: Optional[Dict[str, Any]]) -> Optional['GraphStatistics']:
+        """由 GraphMeta 节点属性还原；没有统计信息时返回None"""
+        if not meta or meta.get('relationship_types') is None:
+            return None
+        return cls(
+            node_types=json.loads(meta.get('node_types') or '{}'),
+            relationship_types=json.loads(meta['relationship_types']),
+            degree_histogram=json.loads(meta.get('degree_histogram') or '{}'),
+            max_degree=meta.get('max_degree') or 0,
+            version=meta.get('version'),
+            updated_at=meta.get('updated_at'),
+        )
+
+    @classmethod
+    def read(cls, graph, key: str = META_KEY) -> Optional['GraphStatistics']:
+        """从 GraphMeta 节点读取"""
+        rows = graph.run("MATCH (m:GraphMeta {key: $key}) RETURN properties(m) AS meta", key=key).data()
+        return cls.from_meta(rows[0]['meta'] if rows else None)
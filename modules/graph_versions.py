@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+图谱蓝绿切换模块
+全量构建不再清空正在服务的图谱，而是写入预备版本的标签命名空间（EntityStaging）；
+校验通过后在一个事务内切换：当前版本改标为 EntityPrevious，预备版本改标为 Entity，
+GraphMeta 上的活动版本指针（key='graph'）同时改指新版本。
+查询层只匹配 Entity 标签，事务提交前后看到的都是一整版图谱，不会查到正在写入的半成品；
+上一版本保留到下一次切换，rollback 在一个事务内换回。
+
+命名空间    实体标签          GraphMeta.key
+active      Entity            graph
+staging     EntityStaging     staging
+previous    EntityPrevious    previous
+"""
+
+import logging
+import os
+import shutil
+from typing import Any, Dict, Iterable
+
+from .graph_stats import META_KEY, GraphStatistics
+
+ACTIVE = 'active'
+STAGING = 'staging'
+PREVIOUS = 'previous'
+
+LABELS = {ACTIVE: 'Entity', STAGING: 'EntityStaging', PREVIOUS: 'EntityPrevious'}
+META_KEYS = {ACTIVE: META_KEY, STAGING: 'staging', PREVIOUS: 'previous'}
+
+# 回滚时交换 active / previous 用的临时标签和键
+_SWAP_LABEL = 'EntitySwap'
+_SWAP_KEY = 'swap'
+
+CLEAR_BATCH_SIZE = 5000
+
+# 随图谱版本一起保留上一版的文件后缀（溯源句索引、三元组清单）
+PREVIOUS_FILE_SUFFIX = '.previous'
+
+
+def clear_namespace(graph, namespace: str, batch_size: int = CLEAR_BATCH_SIZE) -> int:
+    """
+    分批删除一个非活动命名空间的节点、关系和 GraphMeta 记录（每批一个事务，查询不受影响）
+
+    Returns:
+        int: 删除的节点数
+    """
+    if namespace == ACTIVE:
+        raise ValueError("不能清理正在服务的图谱版本")
+    deleted = 0
+    while True:
+        count = graph.run(f"""
+        MATCH (n:`{LABELS[namespace]}`)
+        WITH n LIMIT $limit
+        DETACH DELETE n
+        RETURN count(*) AS count
+        """, limit=batch_size).data()[0]['count']
+        deleted += count
+        if count < batch_size:
+            break
+    graph.run("MATCH (m:GraphMeta {key: $key}) DELETE m", key=META_KEYS[namespace])
+    if deleted:
+        logging.info(f"已清理 {namespace} 版本的 {deleted} 个节点")
+    return deleted
+
+
+def _move(tx, source: str, target: str, source_key: str, target_key: str):
+    tx.run(f"MATCH (n:`{source}`) REMOVE n:`{source}` SET n:`{target}`")
+    tx.run("MATCH (m:GraphMeta {key: $key}) DELETE m", key=target_key)
+    tx.run("MATCH (m:GraphMeta {key: $source}) SET m.key = $target", source=source_key, target=target_key)
+
+
+def _run_in_transaction(graph, moves):
+    tx = graph.begin()
+    try:
+        for move in moves:
+            _move(tx, *move)
+        graph.commit(tx)
+    except Exception:
+        graph.rollback(tx)
+        raise
+
+
+def promote(graph) -> Any:
+    """
+    把预备版本切换为活动版本，原活动版本保留为上一版本（更早的版本先分批删除）
+
+    Returns:
+        新的活动版本号
+
+    Raises:
+        RuntimeError: 没有预备版本（未写入统计信息的构建不能切换）
+    """
+    staging = GraphStatistics.read(graph, META_KEYS[STAGING])
+    if staging is None:
+        raise RuntimeError("没有可切换的预备版本")
+    clear_namespace(graph, PREVIOUS)
+    _run_in_transaction(graph, [
+        (LABELS[ACTIVE], LABELS[PREVIOUS], META_KEYS[ACTIVE], META_KEYS[PREVIOUS]),
+        (LABELS[STAGING], LABELS[ACTIVE], META_KEYS[STAGING], META_KEYS[ACTIVE]),
+    ])
+    return staging.version
+
+
+def rollback(graph) -> Any:
+    """
+    交换活动版本和上一版本（再次执行即恢复）
+
+    Returns:
+        回滚后的活动版本号
+
+    Raises:
+        RuntimeError: 没有保留上一版本
+    """
+    previous = GraphStatistics.read(graph, META_KEYS[PREVIOUS])
+    if previous is None:
+        raise RuntimeError("没有可回滚的上一版本")
+    _run_in_transaction(graph, [
+        (LABELS[ACTIVE], _SWAP_LABEL, META_KEYS[ACTIVE], _SWAP_KEY),
+        (LABELS[PREVIOUS], LABELS[ACTIVE], META_KEYS[PREVIOUS], META_KEYS[ACTIVE]),
+        (_SWAP_LABEL, LABELS[PREVIOUS], _SWAP_KEY, META_KEYS[PREVIOUS]),
+    ])
+    return previous.version
+
+
+def list_versions(graph) -> Dict[str, Dict[str, Any]]:
+    """各命名空间的版本号、节点数和关系数（没有统计信息的命名空间不列出）"""
+    versions = {}
+    for namespace, key in META_KEYS.items():
+        stats = GraphStatistics.read(graph, key)
+        if stats is not None:
+            versions[namespace] = {'version': stats.version, 'nodes': stats.node_count,
+                                   'relationships': stats.relationship_count}
+    return versions
+
+
+# ----------------------------------------------------------------------
+# 随版本保留的文件
+# ----------------------------------------------------------------------
+
+def keep_previous_files(paths: Iterable[str]):
+    """新版本的文件写出前，把当前文件复制为 .previous 供回滚"""
+    for path in paths:
+        if os.path.exists(path):
+            shutil.copy2(path, path + PREVIOUS_FILE_SUFFIX)
+
+
+def swap_previous_files(paths: Iterable[str]):
+    """交换当前文件和 .previous 文件（与 rollback 配合）"""
+    for path in paths:
+        backup = path + PREVIOUS_FILE_SUFFIX
+        if not os.path.exists(backup):
+            continue
+        swap = path + '.swap'
+        if os.path.exists(path):
+            os.replace(path, swap)
+        os.replace(backup, path)
+        if os.path.exists(swap):
+            os.replace(swap, backup)
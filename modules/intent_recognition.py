@@ -17,13 +17,14 @@ class IntentRecognizer:
     负责加载NLU模型，进行意图识别和实体关系提取
     """
     
-    def __init__(self, model_path: str, knowledge_base: Dict[str, Any]):
+    def __init__(self, model_path: str, knowledge_base: Dict[str, Any], entity_linker=None):
         """
         初始化意图识别器
         
         Args:
             model_path: NLU模型路径
             knowledge_base: 知识库字典，包含entities和relations
+            entity_linker: 实体模糊链接器（EntityLinker），精确匹配失败时使用
         """
         self.model_path = model_path
         self.knowledge_base = knowledge_base
@@ -32,6 +33,7 @@ class IntentRecognizer:
         self.id2label = None
         self.entities_kb = knowledge_base.get("entities", {})
         self.relations_kb = knowledge_base.get("relations", {})
+        self.entity_linker = entity_linker
         
         self._load_model()
         
@@ -103,6 +105,30 @@ class IntentRecognizer:
                     
         return found_entities
     
+    def link_entities(self, text: str) -> List[str]:
+        """
+        模糊链接文本中的实体（容忍错别字）
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            List[str]: 链接到的实体列表
+        """
+        if self.entity_linker is None:
+            return []
+            
+        try:
+            self.entity_linker.refresh()
+            linked = self.entity_linker.link(text)
+        except Exception as e:
+            logging.error(f"实体模糊链接失败: {e}")
+            return []
+            
+        if linked:
+            logging.info(f"实体模糊链接: {[(m['mention'], m['entity']) for m in linked]}")
+        return [m['entity'] for m in linked]
+    
     def extract_relations(self, text: str) -> List[str]:
         """
         从文本中提取关系
@@ -135,6 +161,9 @@ class IntentRecognizer:
         """
         intent = self.recognize_intent(text)
         entities = self.extract_entities(text)
+        if not entities:
+            # 精确匹配失败时退回到模糊链接
+            entities = self.link_entities(text)
         relations = self.extract_relations(text)
         
         return {
@@ -6,14 +6,24 @@
 
 from py2neo import Graph
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 import logging
 import re
 import time
+import json
+import base64
+from collections import deque
+from itertools import islice
 from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor
 import threading
 
+from .graph_paths import PathEngine
+from .graph_stats import META_KEY
+from .query_backends import Neo4jBackend
+from .query_engine import QueryEngine
+from .relation_resolver import RelationResolver
+
 class KnowledgeGraphQuery:
     """知识图谱查询器
     
@@ -26,6 +36,31 @@ class KnowledgeGraphQuery:
     DEFAULT_CONFIDENCE_THRESHOLD = 0.8
     QUERY_RESULT_LIMIT = 1000
     FLOAT_PRECISION = 1e-10
+    GRAPH_VERSION_TTL = 5  # 图谱版本缓存秒数
+    
+    # 邻域扩展默认参数
+    DEFAULT_MAX_HOPS = 2
+    DEFAULT_TOP_M = 10
+    DEFAULT_NODE_BUDGET = 50
+    DEFAULT_MIN_PATH_CONFIDENCE = 0.5
+    
+    # 排序得分 = 置信度 × (1 - w + w × 相邻实体中心性)，中心性由 graph_centrality 在构建时写入
+    CENTRALITY_WEIGHT = 0.2
+    
+    # 键集分页默认页大小
+    DEFAULT_PAGE_SIZE = 50
+    
+    # 批量查询时每个实体（或实体对）返回的关系数上限
+    DEFAULT_PER_ENTITY_LIMIT = 20
+    
+    # 间接关系路径搜索参数
+    PATH_TOP_K = 3
+    PATH_MAX_HOPS = 4
+    PATH_TIMEOUT = 2.0
+    
+    # 慢查询日志
+    SLOW_QUERY_THRESHOLD = 0.5  # 秒
+    SLOW_QUERY_HISTORY = 100
     
     def __init__(self, neo4j_uri: str, username: str, password: str, max_workers: int = 4):
         """
@@ -61,6 +96,38 @@ class KnowledgeGraphQuery:
         self.query_cache = {}
         self.cache_lock = threading.RLock()
         self.cache_ttl = 600  # 10分钟缓存
+        
+        # 图谱版本（短时缓存，避免每次请求都访问数据库）
+        self._graph_version = None
+        self._graph_version_checked_at = 0.0
+        
+        # 间接关系路径引擎（首次使用时加载邻接表）
+        self.path_engine = PathEngine(self)
+        
+        # 慢查询日志
+        self.slow_query_threshold = float(os.getenv('KG_SLOW_QUERY_THRESHOLD', self.SLOW_QUERY_THRESHOLD))
+        self.slow_queries = deque(maxlen=self.SLOW_QUERY_HISTORY)
+        self.slow_query_logger = logging.getLogger('kg.slow_query')
+        # 查询记录器，由性能分析工具设置为列表以收集执行过的查询模板
+        self.query_recorder = None
+        
+        # 统一查询引擎（带溯源信息的查询接口，与 RAG.query_fixed 共用）
+        self.engine = QueryEngine(Neo4jBackend(self))
+        
+        # 关系短语 -> 精确关系类型
+        self.relation_resolver = RelationResolver()
+        
+        # 语义实体检索（离线构建的向量索引，首次使用时加载）
+        self.embedding_index_path = None
+        self.embedding_model_path = None
+        self.embedding_index = None
+        self.text_encoder = None
+        self.embedding_lock = threading.Lock()
+        
+        # 溯源句检索索引（图谱构建时生成，首次使用时内存映射加载）
+        self.sentence_index_path = None
+        self.sentence_index = None
+        self.sentence_index_mtime = None
     
     def _validate_params(self, neo4j_uri: str, username: str, password: str):
         """验证初始化参数"""
@@ -72,8 +139,8 @@ class KnowledgeGraphQuery:
             raise ValueError("password不能为空且必须是字符串")
     
     def _get_cache_key(self, query_type: str, *args) -> str:
-        """生成缓存键"""
-        return f"{query_type}:{'|'.join(str(arg) for arg in args)}"
+        """生成缓存键（带图谱版本，切换前开始的查询结果不会在切换后被命中）"""
+        return f"{query_type}@{self.graph_version}:{'|'.join(str(arg) for arg in args)}"
     
     def _get_cached_result(self, cache_key: str) -> Optional[Any]:
         """获取缓存结果"""
@@ -99,6 +166,173 @@ class KnowledgeGraphQuery:
             for key in expired_keys:
                 del self.query_cache[key]
 
+    @staticmethod
+    def summarize_plan(plan: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        汇总执行计划：算子列表、总db hits和根算子行数
+        
+        Args:
+            plan: EXPLAIN/PROFILE 返回的计划字典
+            
+        Returns:
+            Dict: 计划摘要
+        """
+        if not plan:
+            return {'operators': [], 'db_hits': None, 'rows': None}
+        
+        operators = []
+        db_hits = 0
+        stack = [plan]
+        while stack:
+            node = stack.pop()
+            operators.append(node.get('operatorType', ''))
+            db_hits += node.get('dbHits', 0) or 0
+            stack.extend(node.get('children', []))
+        
+        return {
+            'operators': operators,
+            'db_hits': db_hits if 'dbHits' in plan else None,
+            'rows': plan.get('rows')
+        }
+    
+    def _log_slow_query(self, template: str, query: str, params: Dict[str, Any], elapsed: float, row_count: int):
+        """记录慢查询：模板名、参数和执行计划摘要"""
+        try:
+            plan = self.graph.run("EXPLAIN " + query, **params).plan()
+            plan_summary = self.summarize_plan(plan)['operators']
+        except Exception as e:
+            plan_summary = [f"计划获取失败: {e}"]
+        
+        entry = {
+            'template': template,
+            'params': params,
+            'elapsed': round(elapsed, 4),
+            'rows': row_count,
+            'plan': plan_summary,
+            'timestamp': time.time()
+        }
+        self.slow_queries.append(entry)
+        self.slow_query_logger.warning("慢查询: " + json.dumps(entry, ensure_ascii=False, default=str))
+    
+    def run_query(self, template: str, query: str, **params) -> List[Dict[str, Any]]:
+        """
+        执行Cypher查询模板并记录慢查询
+        
+        Args:
+            template: 查询模板名，用于慢查询日志和性能分析
+            query: Cypher查询语句
+            **params: 查询参数
+            
+        Returns:
+            List[Dict]: 查询结果
+        """
+        if self.query_recorder is not None:
+            self.query_recorder.append((template, query, params))
+        
+        start_time = time.time()
+        result = self.graph.run(query, **params).data()
+        elapsed = time.time() - start_time
+        
+        if elapsed >= self.slow_query_threshold:
+            self._log_slow_query(template, query, params, elapsed, len(result))
+        return result
+    
+    def iter_query(self, template: str, query: str, **params) -> Iterator[Dict[str, Any]]:
+        """
+        以游标方式执行Cypher查询模板，逐行产出结果
+        
+        结果由驱动按需拉取，调用方提前停止迭代时关闭游标，
+        内存和耗时只与实际消费的行数相关；慢查询在游标关闭时记录。
+        
+        Args:
+            template: 查询模板名
+            query: Cypher查询语句
+            **params: 查询参数
+            
+        Yields:
+            Dict: 每行结果
+        """
+        if self.query_recorder is not None:
+            self.query_recorder.append((template, query, params))
+        
+        start_time = time.time()
+        cursor = self.graph.run(query, **params)
+        row_count = 0
+        try:
+            for record in cursor:
+                row_count += 1
+                yield record.data()
+        finally:
+            close = getattr(cursor, 'close', None)
+            if close is not None:
+                close()
+            elapsed = time.time() - start_time
+            if elapsed >= self.slow_query_threshold:
+                self._log_slow_query(template, query, params, elapsed, row_count)
+    
+    @staticmethod
+    def encode_page_token(confidence: float, element_id: str) -> str:
+        """把键集位置（得分, 关系 elementId）编码为不透明的分页令牌"""
+        payload = json.dumps([confidence, element_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_page_token(page_token: str) -> tuple:
+        """
+        解码分页令牌
+        
+        Raises:
+            ValueError: 令牌格式错误
+        """
+        try:
+            confidence, element_id = json.loads(base64.urlsafe_b64decode(page_token.encode('ascii')))
+            return float(confidence), str(element_id)
+        except Exception:
+            raise ValueError(f"无效的分页令牌: {page_token}")
+    
+    def get_graph_version(self) -> str:
+        """
+        获取当前图谱版本
+        
+        优先读取活动版本指针（GraphMeta {key: 'graph'}，蓝绿构建切换时更新）；不存在时退化为
+        节点数与关系数组成的指纹（两者由Neo4j计数存储直接给出）。
+        版本变化（切换或回滚）时清空查询缓存。
+        
+        Returns:
+            str: 图谱版本标识
+        """
+        now = time.time()
+        if self._graph_version is not None and now - self._graph_version_checked_at < self.GRAPH_VERSION_TTL:
+            return self._graph_version
+        
+        try:
+            result = self.run_query('graph_version', "MATCH (m:GraphMeta {key: $key}) RETURN m.version AS version",
+                                    key=META_KEY)
+            if result and result[0]['version'] is not None:
+                version = str(result[0]['version'])
+            else:
+                node_count = self.run_query('node_count', "MATCH (n:Entity) RETURN count(n) AS c")[0]['c']
+                rel_count = self.run_query('relationship_count',
+                                           "MATCH (:Entity)-[r]->(:Entity) RETURN count(r) AS c")[0]['c']
+                version = f"{node_count}-{rel_count}"
+        except Exception as e:
+            logging.error(f"获取图谱版本失败: {e}")
+            return self._graph_version or '0'
+        
+        if self._graph_version is not None and version != self._graph_version:
+            logging.info(f"图谱版本已切换: {self._graph_version} -> {version}，清空查询缓存")
+            with self.cache_lock:
+                self.query_cache.clear()
+            self.engine.clear_cache()
+        self._graph_version = version
+        self._graph_version_checked_at = now
+        return version
+    
+    @property
+    def graph_version(self) -> str:
+        """当前图谱版本，供布局缓存和导出ETag使用"""
+        return self.get_graph_version()
+    
     def _validate_entities(self, entities: List[str]) -> List[str]:
         """验证和清理实体列表"""
         if not entities:
@@ -108,28 +342,33 @@ class KnowledgeGraphQuery:
         cleaned_entities = []
         for entity in entities[:self.MAX_ENTITIES_PER_QUERY]:
             if isinstance(entity, str) and len(entity.strip()) <= self.MAX_ENTITY_LENGTH:
-                cleaned_entity = re.sub(r'[^\w\s\u4e00-\u9fff]', '', entity.strip())
+                cleaned_entity = re.sub(r'[^\w\s\u4e00-\u9fff+]', '', entity.strip())
                 if cleaned_entity:
                     cleaned_entities.append(cleaned_entity)
         
         return cleaned_entities
     
-    def find_entity_relations(self, entity: str, confidence_threshold: float = None) -> List[Dict[str, Any]]:
+    def find_entity_relations(self, entity: str, confidence_threshold: float = None,
+                              limit: int = None) -> List[Dict[str, Any]]:
         """
         查找实体的所有相关关系（带缓存）
         
+        按综合得分（置信度结合相邻实体中心性）在数据库内排序并截取前 limit 条
+        
         Args:
             entity: 实体名称
             confidence_threshold: 置信度阈值
+            limit: 返回条数，默认 QUERY_RESULT_LIMIT
             
         Returns:
             List[Dict]: 关系列表
         """
         if confidence_threshold is None:
             confidence_threshold = self.DEFAULT_CONFIDENCE_THRESHOLD
+        limit = self.QUERY_RESULT_LIMIT if limit is None else max(1, min(int(limit), self.QUERY_RESULT_LIMIT))
         
         # 检查缓存
-        cache_key = self._get_cache_key('entity_relations', entity, confidence_threshold)
+        cache_key = self._get_cache_key('entity_relations', entity, confidence_threshold, limit)
         cached_result = self._get_cached_result(cache_key)
         if cached_result is not None:
             logging.info(f"返回缓存的实体关系: {entity}")
@@ -145,26 +384,30 @@ class KnowledgeGraphQuery:
             
             # 优化的Cypher查询，使用索引
             cypher_query = """
-            MATCH (n)-[r]-(m)
-            WHERE n.name CONTAINS $entity OR m.name CONTAINS $entity
+            MATCH (n:Entity)-[r]-(m:Entity)
+            WHERE (n.name CONTAINS $entity OR m.name CONTAINS $entity)
             AND (r.confidence IS NULL OR r.confidence >= $threshold)
-            RETURN DISTINCT 
+            WITH DISTINCT n, r, m, COALESCE(r.confidence, 1.0) AS confidence
+            RETURN 
                 n.name as entity1, 
                 type(r) as relation, 
                 m.name as entity2,
-                COALESCE(r.confidence, 1.0) as confidence
-            ORDER BY confidence DESC
+                confidence,
+                confidence * (1 - $centrality_weight + $centrality_weight *
+                    (COALESCE(n.centrality, 0.0) + COALESCE(m.centrality, 0.0)) / 2) as score
+            ORDER BY score DESC
             LIMIT $limit
             """
             
             start_time = time.time()
-            result = self.graph.run(cypher_query, 
-                                  entity=entity, 
-                                  threshold=confidence_threshold,
-                                  limit=self.QUERY_RESULT_LIMIT).data()
+            results = self.run_query('entity_relations', cypher_query,
+                                     entity=entity,
+                                     threshold=confidence_threshold,
+                                     centrality_weight=self.CENTRALITY_WEIGHT,
+                                     limit=limit)
             
             query_time = time.time() - start_time
-            logging.info(f"找到实体 '{entity}' 的 {len(result)} 个关系，查询耗时: {query_time:.3f}s")
+            logging.info(f"找到实体 '{entity}' 的 {len(results)} 个关系，查询耗时: {query_time:.3f}s")
             
             # 缓存结果
             self._cache_result(cache_key, results)
@@ -175,6 +418,90 @@ class KnowledgeGraphQuery:
             logging.error(f"查找实体关系失败: {e}")
             return []
     
+    def iter_entity_relations(self, entity: str, confidence_threshold: float = None,
+                              page_token: Optional[str] = None,
+                              page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        按综合得分降序惰性迭代实体的关系（键集分页，不缓存）
+        
+        每次只向数据库请求一页（page_size 行），消费完一页才请求下一页；
+        排序键为 (得分 DESC, 关系 elementId ASC)，翻页位置不受前面数据增删影响。
+        得分是查询时计算的，每一页仍要在数据库内扫描并排序全部匹配的关系，
+        分页减少的是传输和客户端处理的行数，而不是数据库的扫描量。
+        
+        Args:
+            entity: 实体名称（与 find_entity_relations 一样按包含匹配）
+            confidence_threshold: 置信度阈值
+            page_token: 从该令牌之后继续（来自上一行的 page_token）
+            page_size: 每页行数
+            
+        Yields:
+            Dict: entity1、relation、entity2、confidence、score，以及指向该行之后的 page_token
+        """
+        if confidence_threshold is None:
+            confidence_threshold = self.DEFAULT_CONFIDENCE_THRESHOLD
+        
+        cleaned_entities = self._validate_entities([entity])
+        if not cleaned_entities:
+            return
+        
+        after_score, after_id = self.decode_page_token(page_token) if page_token else (None, '')
+        page_size = max(1, min(int(page_size), self.QUERY_RESULT_LIMIT))
+        
+        cypher_query = """
+        MATCH (n:Entity)-[r]->(m:Entity)
+        WHERE n.name CONTAINS $entity OR m.name CONTAINS $entity
+        WITH n, r, m, COALESCE(r.confidence, 1.0) AS confidence, elementId(r) AS rel_id
+        WHERE confidence >= $threshold
+        WITH n, r, m, confidence, rel_id,
+             confidence * (1 - $centrality_weight + $centrality_weight *
+                 (COALESCE(n.centrality, 0.0) + COALESCE(m.centrality, 0.0)) / 2) AS score
+        WHERE $after_score IS NULL OR score < $after_score
+              OR (score = $after_score AND rel_id > $after_id)
+        RETURN n.name AS entity1, type(r) AS relation, m.name AS entity2, confidence, score, rel_id
+        ORDER BY score DESC, rel_id
+        LIMIT $page_size
+        """
+        
+        while True:
+            row_count = 0
+            for row in self.iter_query('entity_relations_page', cypher_query,
+                                       entity=cleaned_entities[0],
+                                       threshold=confidence_threshold,
+                                       centrality_weight=self.CENTRALITY_WEIGHT,
+                                       after_score=after_score,
+                                       after_id=after_id,
+                                       page_size=page_size):
+                row_count += 1
+                after_score, after_id = row['score'], row.pop('rel_id')
+                row['page_token'] = self.encode_page_token(after_score, after_id)
+                yield row
+            if row_count < page_size:
+                return
+    
+    def find_entity_relations_page(self, entity: str, confidence_threshold: float = None,
+                                   page_token: Optional[str] = None,
+                                   page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        分页获取实体的关系，供API调用方逐页读取
+        
+        Returns:
+            Dict: relations（本页关系）和 next_page_token（没有更多时为None）
+            
+        Raises:
+            ValueError: 分页令牌无效
+        """
+        page_size = max(1, min(int(page_size), self.QUERY_RESULT_LIMIT))
+        # 多取一行判断是否还有下一页，取到即停止迭代
+        rows = list(islice(self.iter_entity_relations(entity, confidence_threshold, page_token, page_size + 1),
+                           page_size + 1))
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_page_token = rows[-1]['page_token'] if has_more else None
+        for row in rows:
+            row.pop('page_token')
+        return {'relations': rows, 'next_page_token': next_page_token}
+    
     def find_entities_by_relation(self, entities: List[str], relation: str, 
                                 confidence_threshold: float = None) -> List[Dict[str, Any]]:
         """
@@ -204,30 +531,50 @@ class KnowledgeGraphQuery:
             if not cleaned_entities or not relation:
                 return []
             
-            relation = re.sub(r'[^\w\s\u4e00-\u9fff]', '', relation.strip())
-            
-            # 构建Cypher查询
-            cypher_query = """
-            MATCH (n)-[r]-(m)
-            WHERE (n.name IN $entities OR m.name IN $entities)
-            AND (type(r) CONTAINS $relation OR r.name CONTAINS $relation)
-            AND (r.confidence IS NULL OR r.confidence >= $threshold)
-            RETURN DISTINCT 
-                n.name as entity1, 
-                type(r) as relation_type,
-                r.name as relation_name,
-                m.name as entity2,
-                COALESCE(r.confidence, 1.0) as confidence
-            ORDER BY confidence DESC
-            LIMIT $limit
-            """
+            relation = re.sub(r'[^\w\s\u4e00-\u9fff-]', '', relation.strip())
             
+            # 解析为精确关系类型（含互逆类型），使用类型化模式只展开相关关系
+            relation_types = self.relation_resolver.resolve(relation)
             start_time = time.time()
-            result = self.graph.run(cypher_query,
-                                  entities=cleaned_entities,
-                                  relation=relation,
-                                  threshold=confidence_threshold,
-                                  limit=self.QUERY_RESULT_LIMIT).data()
+            if relation_types:
+                cypher_query = f"""
+                MATCH (n:Entity)-[r{self.relation_resolver.type_pattern(relation_types)}]-(m:Entity)
+                WHERE n.name IN $entities
+                AND COALESCE(r.confidence, 1.0) >= $threshold
+                RETURN DISTINCT 
+                    startNode(r).name as entity1, 
+                    type(r) as relation_type,
+                    r.name as relation_name,
+                    endNode(r).name as entity2,
+                    COALESCE(r.confidence, 1.0) as confidence
+                ORDER BY confidence DESC
+                LIMIT $limit
+                """
+                result = self.run_query('entities_by_relation_typed', cypher_query,
+                                        entities=cleaned_entities,
+                                        threshold=confidence_threshold,
+                                        limit=self.QUERY_RESULT_LIMIT)
+            else:
+                # 无法解析的关系短语退回到字符串匹配
+                cypher_query = """
+                MATCH (n:Entity)-[r]-(m:Entity)
+                WHERE (n.name IN $entities OR m.name IN $entities)
+                AND (type(r) CONTAINS $relation OR r.name CONTAINS $relation)
+                AND (r.confidence IS NULL OR r.confidence >= $threshold)
+                RETURN DISTINCT 
+                    n.name as entity1, 
+                    type(r) as relation_type,
+                    r.name as relation_name,
+                    m.name as entity2,
+                    COALESCE(r.confidence, 1.0) as confidence
+                ORDER BY confidence DESC
+                LIMIT $limit
+                """
+                result = self.run_query('entities_by_relation', cypher_query,
+                                        entities=cleaned_entities,
+                                        relation=relation,
+                                        threshold=confidence_threshold,
+                                        limit=self.QUERY_RESULT_LIMIT)
             
             query_time = time.time() - start_time
             logging.info(f"根据关系 '{relation}' 找到 {len(result)} 个相关实体，查询耗时: {query_time:.3f}s")
@@ -279,7 +626,7 @@ class KnowledgeGraphQuery:
             # 首先查找直接关系
             if bidirectional:
                 direct_query = """
-                MATCH (n)-[r]-(m)
+                MATCH (n:Entity)-[r]-(m:Entity)
                 WHERE ((n.name = $entity1 AND m.name = $entity2) OR
                        (n.name = $entity2 AND m.name = $entity1))
                 AND (r.confidence IS NULL OR r.confidence >= $threshold)
@@ -295,7 +642,7 @@ class KnowledgeGraphQuery:
                 """
             else:
                 direct_query = """
-                MATCH (n)-[r]->(m)
+                MATCH (n:Entity)-[r]->(m:Entity)
                 WHERE n.name = $entity1 AND m.name = $entity2
                 AND (r.confidence IS NULL OR r.confidence >= $threshold)
                 RETURN DISTINCT 
@@ -309,54 +656,39 @@ class KnowledgeGraphQuery:
                 LIMIT $limit
                 """
             
-            direct_results = self.graph.run(direct_query,
-                                          entity1=entity1,
-                                          entity2=entity2,
-                                          threshold=confidence_threshold,
-                                          limit=self.QUERY_RESULT_LIMIT).data()
+            direct_results = self.run_query('relation_between' if bidirectional else 'relation_between_directed',
+                                            direct_query,
+                                            entity1=entity1,
+                                            entity2=entity2,
+                                            threshold=confidence_threshold,
+                                            limit=self.QUERY_RESULT_LIMIT)
             results.extend(direct_results)
             
-            # 如果没有直接关系且允许间接关系，查找间接关系
+            # 如果没有直接关系且允许间接关系，用路径引擎查找置信度最高的多跳路径
             if not direct_results and include_indirect:
-                if bidirectional:
-                    indirect_query = """
-                    MATCH (n)-[r1]-(middle)-[r2]-(m)
-                    WHERE ((n.name = $entity1 AND m.name = $entity2) OR
-                           (n.name = $entity2 AND m.name = $entity1))
-                    AND (r1.confidence IS NULL OR r1.confidence >= $threshold)
-                    AND (r2.confidence IS NULL OR r2.confidence >= $threshold)
-                    RETURN DISTINCT 
-                        n.name as entity1, 
-                        type(r1) + ' -> ' + middle.name + ' -> ' + type(r2) as relation_type,
-                        middle.name as relation_name,
-                        m.name as entity2,
-                        COALESCE(r1.confidence * r2.confidence, 0.8) as confidence,
-                        'indirect' as relation_path
-                    ORDER BY confidence DESC
-                    LIMIT 10
-                    """
-                else:
-                    indirect_query = """
-                    MATCH (n)-[r1]->(middle)-[r2]->(m)
-                    WHERE n.name = $entity1 AND m.name = $entity2
-                    AND (r1.confidence IS NULL OR r1.confidence >= $threshold)
-                    AND (r2.confidence IS NULL OR r2.confidence >= $threshold)
-                    RETURN DISTINCT 
-                        n.name as entity1, 
-                        type(r1) + ' -> ' + middle.name + ' -> ' + type(r2) as relation_type,
-                        middle.name as relation_name,
-                        m.name as entity2,
-                        COALESCE(r1.confidence * r2.confidence, 0.8) as confidence,
-                        'indirect' as relation_path
-                    ORDER BY confidence DESC
-                    LIMIT 10
-                    """
-                
-                indirect_results = self.graph.run(indirect_query,
-                                                 entity1=entity1,
-                                                 entity2=entity2,
-                                                 threshold=confidence_threshold).data()
-                results.extend(indirect_results)
+                paths = self.path_engine.find_paths(entity1, entity2,
+                                                    k=self.PATH_TOP_K,
+                                                    max_hops=self.PATH_MAX_HOPS,
+                                                    timeout=self.PATH_TIMEOUT,
+                                                    directed=not bidirectional,
+                                                    min_confidence=confidence_threshold)
+                for path in paths:
+                    middle_nodes = path['nodes'][1:-1]
+                    chain = []
+                    for relation, node in zip(path['relations'], path['nodes'][1:]):
+                        chain.append(relation['relation_type'])
+                        if node != entity2:
+                            chain.append(node)
+                    results.append({
+                        'entity1': entity1,
+                        'relation_type': ' -> '.join(chain),
+                        'relation_name': ' -> '.join(middle_nodes),
+                        'entity2': entity2,
+                        'confidence': path['confidence'],
+                        'relation_path': 'indirect',
+                        'hops': path['hops'],
+                        'path': path['relations']
+                    })
             
             return results
             
@@ -364,6 +696,480 @@ class KnowledgeGraphQuery:
             logging.error(f"查找实体间关系失败: {e}")
             return []
     
+    def find_entity_relations_many(self, entities: List[str], confidence_threshold: float = None,
+                                   per_entity_limit: int = DEFAULT_PER_ENTITY_LIMIT) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        批量查找多个实体的关系（一次往返，带缓存）
+        
+        使用 UNWIND + CALL {} 子查询，每个实体按名称精确匹配并单独按置信度截取 per_entity_limit 条，
+        避免 IN 列表查询中高度数实体挤占其他实体的结果
+        
+        Args:
+            entities: 实体列表
+            confidence_threshold: 置信度阈值
+            per_entity_limit: 每个实体返回的关系数上限
+            
+        Returns:
+            Dict[str, List[Dict]]: 实体 -> 关系列表（entity1、relation、entity2、confidence），
+            没有关系的实体对应空列表
+        """
+        if confidence_threshold is None:
+            confidence_threshold = self.DEFAULT_CONFIDENCE_THRESHOLD
+        
+        names = list(dict.fromkeys(self._validate_entities(entities)))
+        if not names:
+            return {}
+        
+        cache_key = self._get_cache_key('entity_relations_many', str(names), confidence_threshold, per_entity_limit)
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result is not None:
+            logging.info(f"返回缓存的批量实体关系: {names}")
+            return cached_result
+        
+        try:
+            cypher_query = """
+            UNWIND $names AS name
+            CALL {
+                WITH name
+                MATCH (n:Entity {name: name})-[r]-(m:Entity)
+                WHERE COALESCE(r.confidence, 1.0) >= $threshold
+                WITH r, m, COALESCE(r.confidence, 1.0) AS confidence
+                RETURN startNode(r).name AS entity1,
+                       type(r) AS relation,
+                       endNode(r).name AS entity2,
+                       confidence,
+                       confidence * (1 - $centrality_weight +
+                                     $centrality_weight * COALESCE(m.centrality, 0.0)) AS score
+                ORDER BY score DESC, entity1, relation, entity2
+                LIMIT $per_entity
+            }
+            RETURN name, entity1, relation, entity2, confidence
+            """
+            
+            start_time = time.time()
+            rows = self.run_query('entity_relations_many', cypher_query,
+                                  names=names,
+                                  threshold=confidence_threshold,
+                                  centrality_weight=self.CENTRALITY_WEIGHT,
+                                  per_entity=per_entity_limit)
+            
+            grouped: Dict[str, List[Dict[str, Any]]] = {name: [] for name in names}
+            for row in rows:
+                grouped[row.pop('name')].append(row)
+            
+            query_time = time.time() - start_time
+            logging.info(f"批量查询 {len(names)} 个实体的 {len(rows)} 个关系，查询耗时: {query_time:.3f}s")
+            
+            self._cache_result(cache_key, grouped)
+            return grouped
+            
+        except Exception as e:
+            logging.error(f"批量查找实体关系失败: {e}")
+            return {}
+    
+    def find_relations_between_many(self, entities: List[str] = None, pairs: List[tuple] = None,
+                                    confidence_threshold: float = None,
+                                    bidirectional: bool = True,
+                                    per_pair_limit: int = DEFAULT_PER_ENTITY_LIMIT) -> Dict[tuple, List[Dict[str, Any]]]:
+        """
+        批量查找多对实体之间的直接关系（一次往返，带缓存）
+        
+        Args:
+            entities: 实体列表，查询其中两两组合的实体对（与 pairs 二选一）
+            pairs: 显式给出的 (实体1, 实体2) 列表
+            confidence_threshold: 置信度阈值
+            bidirectional: 是否双向查找；为False时只查 实体1 -> 实体2
+            per_pair_limit: 每对实体返回的关系数上限
+            
+        Returns:
+            Dict[tuple, List[Dict]]: (实体1, 实体2) -> 关系列表，字段与 find_relation_by_entities 的直接关系一致
+        """
+        if confidence_threshold is None:
+            confidence_threshold = self.DEFAULT_CONFIDENCE_THRESHOLD
+        
+        if pairs is None:
+            names = list(dict.fromkeys(self._validate_entities(entities or [])))
+            pairs = [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+        else:
+            pairs = [
+                tuple(cleaned) for cleaned in (self._validate_entities(list(pair)) for pair in pairs)
+                if len(cleaned) == 2 and cleaned[0] != cleaned[1]
+            ]
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return {}
+        
+        cache_key = self._get_cache_key('relations_between_many', str(pairs), confidence_threshold,
+                                        bidirectional, per_pair_limit)
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result is not None:
+            logging.info(f"返回缓存的批量实体对关系: {len(pairs)} 对")
+            return cached_result
+        
+        try:
+            pattern = "-[r]-" if bidirectional else "-[r]->"
+            cypher_query = f"""
+            UNWIND $pairs AS pair
+            CALL {{
+                WITH pair
+                MATCH (a:Entity {{name: pair[0]}}){pattern}(b:Entity {{name: pair[1]}})
+                WHERE COALESCE(r.confidence, 1.0) >= $threshold
+                RETURN startNode(r).name AS entity1,
+                       type(r) AS relation_type,
+                       r.name AS relation_name,
+                       endNode(r).name AS entity2,
+                       COALESCE(r.confidence, 1.0) AS confidence
+                ORDER BY confidence DESC, entity1, relation_type
+                LIMIT $per_pair
+            }}
+            RETURN pair[0] AS source, pair[1] AS target,
+                   entity1, relation_type, relation_name, entity2, confidence,
+                   'direct' AS relation_path
+            """
+            
+            start_time = time.time()
+            rows = self.run_query('relations_between_many' if bidirectional else 'relations_between_many_directed',
+                                  cypher_query,
+                                  pairs=[list(pair) for pair in pairs],
+                                  threshold=confidence_threshold,
+                                  per_pair=per_pair_limit)
+            
+            grouped: Dict[tuple, List[Dict[str, Any]]] = {pair: [] for pair in pairs}
+            for row in rows:
+                grouped[(row.pop('source'), row.pop('target'))].append(row)
+            
+            query_time = time.time() - start_time
+            logging.info(f"批量查询 {len(pairs)} 对实体的 {len(rows)} 个关系，查询耗时: {query_time:.3f}s")
+            
+            self._cache_result(cache_key, grouped)
+            return grouped
+            
+        except Exception as e:
+            logging.error(f"批量查找实体间关系失败: {e}")
+            return {}
+    
+    def find_neighborhood(self, entities: List[str],
+                          max_hops: int = DEFAULT_MAX_HOPS,
+                          top_m: int = DEFAULT_TOP_M,
+                          node_budget: int = DEFAULT_NODE_BUDGET,
+                          min_path_confidence: float = DEFAULT_MIN_PATH_CONFIDENCE,
+                          confidence_threshold: float = None) -> Dict[str, Any]:
+        """
+        从问题实体出发进行有界的k跳邻域扩展（带缓存）
+        
+        每跳只发送一次查询，每个前沿节点只取置信度最高的 top_m 条边；
+        路径得分为沿途边置信度之积，低于 min_path_confidence 的路径被剪除，
+        每跳每个起点最多保留 top_m 条扩展边，总节点数不超过 node_budget。
+        多个起点的扩展相遇时，只返回连接这些起点的子图。
+        
+        Args:
+            entities: 起点实体列表
+            max_hops: 最大跳数
+            top_m: 每跳每个起点保留的边数
+            node_budget: 子图最大节点数
+            min_path_confidence: 路径置信度之积的下限
+            confidence_threshold: 单条边的置信度阈值
+            
+        Returns:
+            Dict: 包含 entities、nodes（节点 -> 最佳路径得分）、relations、connecting_nodes
+        """
+        if confidence_threshold is None:
+            confidence_threshold = self.DEFAULT_CONFIDENCE_THRESHOLD
+        
+        empty = {'entities': [], 'nodes': {}, 'relations': [], 'connecting_nodes': []}
+        
+        cache_key = self._get_cache_key('neighborhood', str(entities), max_hops, top_m,
+                                        node_budget, min_path_confidence, confidence_threshold)
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result is not None:
+            logging.info(f"返回缓存的邻域扩展结果: {entities}")
+            return cached_result
+        
+        try:
+            seeds = list(dict.fromkeys(self._validate_entities(entities)))
+            if not seeds:
+                return empty
+            
+            hop_query = """
+            UNWIND $names AS name
+            CALL {
+                WITH name
+                MATCH (n:Entity {name: name})-[r]-(m:Entity)
+                WHERE COALESCE(r.confidence, 1.0) >= $threshold
+                RETURN r, m
+                ORDER BY COALESCE(r.confidence, 1.0) *
+                         (1 - $centrality_weight + $centrality_weight * COALESCE(m.centrality, 0.0)) DESC
+                LIMIT $per_node
+            }
+            RETURN name AS source,
+                   m.name AS neighbor,
+                   startNode(r).name AS entity1,
+                   type(r) AS relation_type,
+                   endNode(r).name AS entity2,
+                   COALESCE(r.confidence, 1.0) AS confidence
+            """
+            
+            # (节点, 起点) -> 最佳路径得分 / 到达该节点的边
+            best: Dict[tuple, float] = {(seed, seed): 1.0 for seed in seeds}
+            parent: Dict[tuple, Optional[Dict[str, Any]]] = {(seed, seed): None for seed in seeds}
+            visited = set(seeds)
+            frontier = [(seed, seed, 1.0) for seed in seeds]
+            
+            start_time = time.time()
+            for hop in range(1, max_hops + 1):
+                if not frontier:
+                    break
+                names = list({node for node, _, _ in frontier})
+                rows = self.run_query('neighborhood_hop', hop_query,
+                                      names=names,
+                                      threshold=confidence_threshold,
+                                      centrality_weight=self.CENTRALITY_WEIGHT,
+                                      per_node=top_m)
+                edges_by_source: Dict[str, List[Dict[str, Any]]] = {}
+                for row in rows:
+                    edges_by_source.setdefault(row['source'], []).append(row)
+                
+                # 按起点收集候选扩展边
+                candidates: Dict[str, List[tuple]] = {}
+                for node, seed, score in frontier:
+                    for row in edges_by_source.get(node, []):
+                        neighbor = row['neighbor']
+                        path_score = score * row['confidence']
+                        if path_score < min_path_confidence:
+                            continue
+                        if path_score <= best.get((neighbor, seed), 0.0):
+                            continue
+                        candidates.setdefault(seed, []).append((path_score, neighbor, row))
+                
+                next_frontier = []
+                for seed, items in candidates.items():
+                    items.sort(key=lambda item: item[0], reverse=True)
+                    kept = 0
+                    for path_score, neighbor, row in items:
+                        if kept >= top_m:
+                            break
+                        if path_score <= best.get((neighbor, seed), 0.0):
+                            continue
+                        if neighbor not in visited:
+                            if len(visited) >= node_budget:
+                                continue
+                            visited.add(neighbor)
+                        best[(neighbor, seed)] = path_score
+                        parent[(neighbor, seed)] = {
+                            'entity1': row['entity1'],
+                            'relation_type': row['relation_type'],
+                            'entity2': row['entity2'],
+                            'confidence': row['confidence'],
+                            'hop': hop,
+                            'from': row['source']
+                        }
+                        next_frontier.append((neighbor, seed, path_score))
+                        kept += 1
+                frontier = next_frontier
+            
+            # 被多个起点到达的节点即为连接点
+            reached_by: Dict[str, set] = {}
+            for node, seed in best:
+                reached_by.setdefault(node, set()).add(seed)
+            connecting_nodes = [
+                node for node, origins in reached_by.items()
+                if len(origins) >= 2 and node not in seeds
+            ] + [seed for seed in seeds if len(reached_by.get(seed, ())) >= 2]
+            
+            # 多起点相遇时只保留连接路径，否则保留全部扩展边
+            if len(seeds) >= 2 and connecting_nodes:
+                keys = [(node, seed) for node in connecting_nodes for seed in reached_by[node]]
+            else:
+                keys = list(best.keys())
+            
+            relations: Dict[tuple, Dict[str, Any]] = {}
+            nodes: Dict[str, float] = {}
+            for node, seed in keys:
+                current = node
+                while True:
+                    nodes[current] = max(nodes.get(current, 0.0), best[(current, seed)])
+                    edge = parent[(current, seed)]
+                    if edge is None:
+                        break
+                    edge_key = (edge['entity1'], edge['relation_type'], edge['entity2'])
+                    relations.setdefault(edge_key, {
+                        key: value for key, value in edge.items() if key != 'from'
+                    })
+                    current = edge['from']
+            
+            result = {
+                'entities': seeds,
+                'nodes': nodes,
+                'relations': sorted(relations.values(), key=lambda r: r['confidence'], reverse=True),
+                'connecting_nodes': connecting_nodes
+            }
+            
+            query_time = time.time() - start_time
+            logging.info(f"邻域扩展 {seeds}: {len(nodes)} 个节点, {len(relations)} 条关系，耗时: {query_time:.3f}s")
+            
+            self._cache_result(cache_key, result)
+            return result
+            
+        except Exception as e:
+            logging.error(f"邻域扩展失败: {e}")
+            return empty
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        获取图谱统计信息（读取构建时物化的 GraphMeta 统计）
+        
+        Returns:
+            Dict: 节点数、关系数、各关系类型和实体类型数量、度分布、图谱版本
+        """
+        return self.engine.get_statistics()
+    
+    def check_entities_exist(self, entities: List[str]) -> Dict[str, bool]:
+        """
+        检查实体是否在图谱中存在
+        
+        Args:
+            entities: 实体列表
+            
+        Returns:
+            Dict[str, bool]: 实体 -> 是否存在
+        """
+        return self.engine.check_entities_exist(entities)
+    
+    def set_embedding_index(self, index_path: str, model_path: str):
+        """
+        配置语义实体检索使用的向量索引和编码模型
+        
+        Args:
+            index_path: 索引路径前缀（由 python -m modules.embedding_index build 生成）
+            model_path: 编码模型目录，需与构建索引时一致
+        """
+        with self.embedding_lock:
+            self.embedding_index_path = index_path
+            self.embedding_model_path = model_path
+            self.embedding_index = None
+            self.text_encoder = None
+    
+    def _ensure_embedding_index(self) -> bool:
+        """加载向量索引（内存映射）和编码器，未配置或文件不存在时返回False"""
+        with self.embedding_lock:
+            if self.embedding_index is not None:
+                return True
+            if not self.embedding_index_path or not os.path.exists(self.embedding_index_path + '.npy'):
+                return False
+            try:
+                from .embedding_index import EmbeddingIndex, TextEncoder
+                start_time = time.time()
+                index = EmbeddingIndex.load(self.embedding_index_path)
+                self.text_encoder = TextEncoder(self.embedding_model_path)
+                index.warm_up()
+                self.embedding_index = index
+                logging.info(f"向量索引加载完成: {len(index.ids)} 个实体，耗时 {time.time() - start_time:.2f}s")
+            except Exception as e:
+                logging.error(f"加载向量索引失败: {e}")
+                return False
+        if self.embedding_index.graph_version != self.graph_version:
+            logging.warning("向量索引与当前图谱版本不一致，请重新运行 embedding_index build")
+        return True
+    
+    def semantic_entity_lookup(self, texts: List[str], top_k: int = 5,
+                               min_score: float = 0.5) -> List[List[Dict[str, Any]]]:
+        """
+        语义实体检索：把描述性提及（如"先进先出的结构"）映射到最相近的实体
+        
+        Args:
+            texts: 查询文本列表（批量编码、批量检索）
+            top_k: 每个文本返回的实体数
+            min_score: 最低余弦相似度
+            
+        Returns:
+            List[List[Dict]]: 每个文本的候选，元素含 entity、score
+        """
+        if not texts:
+            return []
+        if not self._ensure_embedding_index():
+            return [[] for _ in texts]
+        
+        try:
+            start_time = time.time()
+            vectors = self.text_encoder.encode(list(texts))
+            results = self.embedding_index.search(vectors, top_k, min_score)
+            logging.info(f"语义实体检索 {len(texts)} 条，耗时: {time.time() - start_time:.3f}s")
+            return [[{'entity': name, 'score': round(score, 4)} for name, score in row] for row in results]
+        except Exception as e:
+            logging.error(f"语义实体检索失败: {e}")
+            return [[] for _ in texts]
+    
+    def set_sentence_index(self, index_path: str):
+        """
+        配置溯源句检索索引
+        
+        Args:
+            index_path: 索引路径前缀（由 neo4j/product.py 构建图谱时生成）
+        """
+        with self.embedding_lock:
+            self.sentence_index_path = index_path
+            self.sentence_index = None
+            self.sentence_index_mtime = None
+    
+    def _ensure_sentence_index(self):
+        """
+        加载溯源句索引；图谱重建后索引文件更新时重新加载
+        
+        旧索引不主动关闭：其他线程可能仍在旧索引上检索，最后一个引用释放时内存映射随之关闭。
+        
+        Returns:
+            SentenceIndex: 当前索引（调用方持有该引用完成检索），不可用时返回 None
+        """
+        if not self.sentence_index_path:
+            return None
+        meta_path = self.sentence_index_path + '.terms.json'
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            return None
+        
+        with self.embedding_lock:
+            if self.sentence_index is not None and mtime == self.sentence_index_mtime:
+                return self.sentence_index
+            try:
+                from .sentence_index import SentenceIndex
+                self.sentence_index = SentenceIndex.load(self.sentence_index_path)
+                self.sentence_index_mtime = mtime
+                logging.info(f"溯源句索引加载完成: {self.sentence_index.doc_count} 个句子")
+                return self.sentence_index
+            except Exception as e:
+                logging.error(f"加载溯源句索引失败: {e}")
+                return None
+    
+    def search_evidence(self, question: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        在关系溯源句中检索证据（不依赖实体链接）
+        
+        Args:
+            question: 问题文本
+            top_k: 返回的句子数
+            
+        Returns:
+            List[Dict]: 每项含 sentence、score、triples
+        """
+        if not question:
+            return []
+        sentence_index = self._ensure_sentence_index()
+        if sentence_index is None:
+            return []
+        
+        try:
+            start_time = time.time()
+            query_vector = None
+            if sentence_index.dense is not None and self._ensure_embedding_index():
+                query_vector = self.text_encoder.encode([question])
+            hits = sentence_index.search(question, top_k, query_vector)
+            logging.info(f"溯源句检索返回 {len(hits)} 条，耗时: {time.time() - start_time:.3f}s")
+            return hits
+        except Exception as e:
+            logging.error(f"溯源句检索失败: {e}")
+            return []
+    
     def get_entities_containing(self, keyword: str, limit: int = 50) -> List[str]:
         """
         获取包含关键词的实体
@@ -379,25 +1185,58 @@ class KnowledgeGraphQuery:
             if not keyword or not isinstance(keyword, str):
                 return []
             
-            keyword = re.sub(r'[^\w\s\u4e00-\u9fff]', '', keyword.strip())
+            keyword = re.sub(r'[^\w\s\u4e00-\u9fff+]', '', keyword.strip())
             if not keyword:
                 return []
             
             cypher_query = """
-            MATCH (n)
+            MATCH (n:Entity)
             WHERE n.name CONTAINS $keyword
             RETURN DISTINCT n.name as entity
             ORDER BY n.name
             LIMIT $limit
             """
             
-            result = self.graph.run(cypher_query, keyword=keyword, limit=limit).data()
+            result = self.run_query('entities_containing', cypher_query, keyword=keyword, limit=limit)
             return [record['entity'] for record in result]
             
         except Exception as e:
             logging.error(f"搜索实体失败: {e}")
             return []
     
+    def get_central_entities(self, limit: int = 5) -> List[str]:
+        """
+        获取中心性最高的实体（带缓存），作为全图概览的起点
+        
+        Args:
+            limit: 结果限制
+        
+        Returns:
+            List[str]: 实体列表，按中心性降序
+        """
+        cache_key = self._get_cache_key('central_entities', limit)
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result is not None:
+            return cached_result
+        
+        try:
+            cypher_query = """
+            MATCH (n:Entity)
+            WHERE n.centrality IS NOT NULL
+            RETURN n.name as entity
+            ORDER BY n.centrality DESC, n.name
+            LIMIT $limit
+            """
+            
+            result = [record['entity'] for record in
+                      self.run_query('central_entities', cypher_query, limit=limit)]
+            self._cache_result(cache_key, result)
+            return result
+        
+        except Exception as e:
+            logging.error(f"获取中心实体失败: {e}")
+            return []
+    
     def query_graph(self, question: str, entities: List[str] = None) -> Dict[str, Any]:
         """
         通用图查询接口
@@ -418,7 +1257,30 @@ class KnowledgeGraphQuery:
                 'confidence': 0.0
             }
             
-            if entities and len(entities) >= 2:
+            if entities and len(entities) > 2:
+                # 多个概念：扩展出连接这些概念的紧凑子图
+                neighborhood = self.find_neighborhood(entities)
+                relations = neighborhood['relations']
+                result['relations'] = relations
+                
+                if relations:
+                    result['answer'] = "、".join(neighborhood['entities']) + "之间的联系：" + "; ".join(
+                        f"{r['entity1']}{r['relation_type']}{r['entity2']}" for r in relations[:10]
+                    )
+                    result['confidence'] = max(r['confidence'] for r in relations)
+                else:
+                    # 没有连接子图时，一次往返取回每个概念各自的关系
+                    grouped = self.find_entity_relations_many(entities, per_entity_limit=5)
+                    relations = [r for rels in grouped.values() for r in rels]
+                    result['relations'] = relations
+                    if relations:
+                        result['answer'] = "; ".join(
+                            f"{name}相关的关系有：" + ", ".join(r['relation'] for r in rels)
+                            for name, rels in grouped.items() if rels
+                        )
+                        result['confidence'] = max(r['confidence'] for r in relations)
+            
+            elif entities and len(entities) == 2:
                 # 查找实体间关系
                 relations = self.find_relation_by_entities(entities)
                 result['relations'] = relations
@@ -430,9 +1292,9 @@ class KnowledgeGraphQuery:
                     result['confidence'] = rel.get('confidence', 0.0)
             
             elif entities and len(entities) == 1:
-                # 查找单个实体的关系
-                relations = self.find_entity_relations(entities[0])
-                result['relations'] = relations[:10]  # 限制返回数量
+                # 查找单个实体的关系（带缓存，数据库内排序后只取前10条）
+                relations = self.find_entity_relations(entities[0], limit=10)
+                result['relations'] = relations
                 
                 if relations:
                     result['answer'] = f"{entities[0]}相关的关系有：" + ", ".join([f"{r['relation']}" for r in relations[:5]])
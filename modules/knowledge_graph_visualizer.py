@@ -5,96 +5,416 @@
 
 import json
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 
+import numpy as np
+
 try:
-    from .knowledge_graph import KnowledgeGraphQuery
+    from .knowledge_graph_query import KnowledgeGraphQuery
 except ImportError:
     # 当作为独立脚本运行时使用绝对导入
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from modules.knowledge_graph import KnowledgeGraphQuery
+    from modules.knowledge_graph_query import KnowledgeGraphQuery
 
 class KnowledgeGraphVisualizer:
     """知识图谱可视化器"""
     
-    def __init__(self, kg_query: Optional[KnowledgeGraphQuery] = None):
+    # 默认子图规模限制
+    DEFAULT_MAX_NODES = 50
+    DEFAULT_MAX_EDGES = 100
+    DEFAULT_MIN_CONFIDENCE = 0.0
+    
+    # ECharts节点样式（与 Vue/src/data/graph.json 保持一致）
+    ENTITY_COLOR = '#42b983'
+    NEIGHBOR_COLOR = '#5470c6'
+    ENTITY_SYMBOL_SIZE = 60
+    NEIGHBOR_SYMBOL_SIZE = 40
+    CLUSTER_COLOR = '#909399'
+    CLUSTER_SYMBOL_SIZE = 50
+    
+    # 服务端布局参数
+    DEFAULT_LOD_THRESHOLD = 80
+    LAYOUT_ITERATIONS = 60
+    LAYOUT_CANVAS_SIZE = 1000.0
+    LAYOUT_CACHE_SIZE = 256
+    
+    def __init__(self, kg_query: Optional[KnowledgeGraphQuery] = None,
+                 max_nodes: int = DEFAULT_MAX_NODES,
+                 max_edges: int = DEFAULT_MAX_EDGES,
+                 min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                 precompute_layout: bool = True,
+                 lod_threshold: int = DEFAULT_LOD_THRESHOLD):
         """
         初始化可视化器
         
         Args:
             kg_query: 知识图谱查询器实例
+            max_nodes: 子图最大节点数
+            max_edges: 子图最大边数
+            min_confidence: 低于该置信度的关系会被剪除
+            precompute_layout: 是否在服务端计算节点坐标
+            lod_threshold: 节点数超过该值时折叠为聚类节点
         """
         self.kg_query = kg_query
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.min_confidence = min_confidence
+        self.precompute_layout = precompute_layout
+        self.lod_threshold = lod_threshold
+        
+        # 布局缓存：(子图哈希, 图谱版本) -> {节点: (x, y)}
+        self.layout_cache = OrderedDict()
+        self.layout_lock = threading.Lock()
+    
+    @staticmethod
+    def _relation_label(relation: Dict[str, Any]) -> str:
+        """兼容不同查询接口返回的关系字段"""
+        return (relation.get('relation_name') or relation.get('relation_type')
+                or relation.get('relation') or '')
         
     def visualize_knowledge_graph(self, query_result: Dict[str, Any]) -> Dict[str, Any]:
         """
         可视化知识图谱查询结果
         
+        节点以字典索引，构建复杂度为 O(V+E)；关系按置信度降序加入，
+        超出节点/边上限或低于置信度阈值的关系被剪除。
+        
         Args:
             query_result: 知识图谱查询结果
-            output_format: 输出格式 ('json', 'html')
             
         Returns:
             Dict: 可视化数据
         """
         # 提取节点和边
-        nodes = []
-        edges = []
+        nodes: Dict[str, Dict[str, Any]] = {}
+        edges: Dict[tuple, Dict[str, Any]] = {}
+        pruned = 0
         
-        # 处理实体节点
-        entities = query_result.get('entities', [])
-        for entity in entities:
-            nodes.append({
+        def add_node(entity: str, node_type: str) -> bool:
+            if entity in nodes:
+                return True
+            if len(nodes) >= self.max_nodes:
+                return False
+            nodes[entity] = {
                 'id': entity,
                 'label': entity,
-                'type': 'entity',
+                'type': node_type,
                 'size': 20
-            })
+            }
+            return True
         
-        # 处理关系边
-        relations = query_result.get('relations', [])
+        # 处理实体节点
+        for entity in query_result.get('entities', []):
+            if entity:
+                add_node(entity, 'entity')
+        
+        # 处理关系边，高置信度优先；多跳路径展开为逐跳的边
+        hops = []
+        for relation in query_result.get('relations', []):
+            hops.extend(relation.get('path') or [relation])
+        relations = sorted(
+            hops,
+            key=lambda r: r.get('confidence') if r.get('confidence') is not None else 1.0,
+            reverse=True
+        )
         for relation in relations:
             entity1 = relation.get('entity1')
             entity2 = relation.get('entity2')
-            relation_name = relation.get('relation_name', relation.get('relation_type', ''))
-            confidence = relation.get('confidence', 1.0)
-            
-            # 确保节点存在
-            for entity in [entity1, entity2]:
-                if entity and not any(node['id'] == entity for node in nodes):
-                    nodes.append({
-                        'id': entity,
-                        'label': entity,
-                        'type': 'entity',
-                        'size': 20
-                    })
-            
-            # 添加边
-            if entity1 and entity2:
-                edges.append({
-                    'source': entity1,
-                    'target': entity2,
-                    'label': relation_name,
-                    'confidence': confidence,
-                    'type': 'relation'
-                })
+            confidence = relation.get('confidence')
+            confidence = 1.0 if confidence is None else confidence
+            
+            if not entity1 or not entity2 or confidence < self.min_confidence:
+                pruned += 1
+                continue
+            if len(edges) >= self.max_edges:
+                pruned += 1
+                continue
+            
+            relation_name = self._relation_label(relation)
+            edge_key = (entity1, entity2, relation_name)
+            if edge_key in edges:
+                continue
+            
+            # 确保节点存在，节点数超限时剪除该关系
+            if not (add_node(entity1, 'neighbor') and add_node(entity2, 'neighbor')):
+                pruned += 1
+                continue
+            
+            edges[edge_key] = {
+                'source': entity1,
+                'target': entity2,
+                'label': relation_name,
+                'confidence': confidence,
+                'type': 'relation'
+            }
         
         visualization_data = {
-            'nodes': nodes,
-            'edges': edges,
+            'nodes': list(nodes.values()),
+            'edges': list(edges.values()),
             'metadata': {
                 'question': query_result.get('question', ''),
                 'answer': query_result.get('answer', ''),
                 'confidence': query_result.get('confidence', 0.0),
                 'node_count': len(nodes),
-                'edge_count': len(edges)
+                'edge_count': len(edges),
+                'pruned_count': pruned
             }
         }
         
-        
         return visualization_data
     
+    def to_echarts(self, visualization_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        转换为前端ECharts使用的 nodes/links 格式
+        
+        Args:
+            visualization_data: visualize_knowledge_graph 的返回值
+            
+        Returns:
+            Dict: 与 Vue/src/data/graph.json 结构一致的图数据
+        """
+        echarts_nodes = []
+        for node in visualization_data.get('nodes', []):
+            node_type = node.get('type')
+            if node_type == 'entity':
+                symbol_size, color = self.ENTITY_SYMBOL_SIZE, self.ENTITY_COLOR
+            elif node_type == 'cluster':
+                symbol_size, color = self.CLUSTER_SYMBOL_SIZE, self.CLUSTER_COLOR
+            else:
+                symbol_size, color = self.NEIGHBOR_SYMBOL_SIZE, self.NEIGHBOR_COLOR
+            echarts_node = {
+                'name': node['id'],
+                'symbolSize': symbol_size,
+                'itemStyle': {'color': color}
+            }
+            if 'x' in node and 'y' in node:
+                echarts_node['x'] = node['x']
+                echarts_node['y'] = node['y']
+            if node_type == 'cluster':
+                echarts_node['value'] = len(node.get('members', []))
+            echarts_nodes.append(echarts_node)
+        
+        echarts_links = []
+        for edge in visualization_data.get('edges', []):
+            echarts_links.append({
+                'source': edge['source'],
+                'target': edge['target'],
+                'label': {
+                    'show': True,
+                    'formatter': edge['label'],
+                    'fontSize': 12,
+                    'color': '#333'
+                },
+                'lineStyle': {
+                    'width': 2,
+                    'curveness': 0.2
+                }
+            })
+        
+        return {'nodes': echarts_nodes, 'links': echarts_links}
+    
+    def build_graph_payload(self, query_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        根据查询结果生成 /reply 接口返回的证据子图
+        
+        Args:
+            query_result: 知识图谱查询结果
+            
+        Returns:
+            Dict: ECharts格式的子图，无结果时返回空字典
+        """
+        if not query_result or not (query_result.get('relations') or query_result.get('entities')):
+            return {}
+        visualization = self.visualize_knowledge_graph(query_result)
+        if self.precompute_layout:
+            visualization = self.layout_graph(visualization)
+        return self.to_echarts(visualization)
+    
+    def simplify_graph(self, visualization_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        细节层次简化：节点数超过阈值时，把低度数节点折叠进相邻的保留节点
+        
+        查询实体总是保留，其余节点按度数排序；被折叠的节点归入度数最高的
+        保留邻居所对应的聚类节点，无保留邻居的节点归入同一个"其他"聚类。
+        
+        Args:
+            visualization_data: visualize_knowledge_graph 的返回值
+            
+        Returns:
+            Dict: 简化后的可视化数据
+        """
+        nodes = visualization_data.get('nodes', [])
+        if len(nodes) <= self.lod_threshold:
+            return visualization_data
+        
+        edges = visualization_data.get('edges', [])
+        degree: Dict[str, int] = {node['id']: 0 for node in nodes}
+        adjacency: Dict[str, List[str]] = {node['id']: [] for node in nodes}
+        for edge in edges:
+            degree[edge['source']] += 1
+            degree[edge['target']] += 1
+            adjacency[edge['source']].append(edge['target'])
+            adjacency[edge['target']].append(edge['source'])
+        
+        # 为聚类节点预留位置
+        ranked = sorted(nodes, key=lambda n: (n.get('type') != 'entity', -degree[n['id']]))
+        kept_count = max(1, self.lod_threshold // 2)
+        kept = {node['id'] for node in ranked[:kept_count]}
+        
+        clusters: Dict[str, List[str]] = {}
+        for node in ranked[kept_count:]:
+            anchors = [n for n in adjacency[node['id']] if n in kept]
+            anchor = max(anchors, key=lambda n: degree[n]) if anchors else ''
+            clusters.setdefault(anchor, []).append(node['id'])
+        
+        simplified_nodes = [node for node in nodes if node['id'] in kept]
+        simplified_edges = [
+            edge for edge in edges
+            if edge['source'] in kept and edge['target'] in kept
+        ]
+        for anchor, members in clusters.items():
+            cluster_id = f"{anchor or '其他'}(+{len(members)})"
+            simplified_nodes.append({
+                'id': cluster_id,
+                'label': cluster_id,
+                'type': 'cluster',
+                'size': 20,
+                'members': members
+            })
+            if anchor:
+                simplified_edges.append({
+                    'source': anchor,
+                    'target': cluster_id,
+                    'label': '聚类',
+                    'confidence': 1.0,
+                    'type': 'cluster'
+                })
+        
+        metadata = dict(visualization_data.get('metadata', {}))
+        metadata.update({
+            'node_count': len(simplified_nodes),
+            'edge_count': len(simplified_edges),
+            'collapsed_count': sum(len(m) for m in clusters.values())
+        })
+        return {'nodes': simplified_nodes, 'edges': simplified_edges, 'metadata': metadata}
+    
+    @staticmethod
+    def _subgraph_hash(visualization_data: Dict[str, Any]) -> str:
+        """计算子图结构哈希，作为布局缓存键"""
+        node_ids = sorted(node['id'] for node in visualization_data.get('nodes', []))
+        edge_keys = sorted(f"{e['source']}\t{e['target']}" for e in visualization_data.get('edges', []))
+        digest = hashlib.sha1()
+        digest.update('\n'.join(node_ids).encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update('\n'.join(edge_keys).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _force_layout(self, node_count: int, edge_index: np.ndarray) -> np.ndarray:
+        """
+        向量化的 Fruchterman-Reingold 力导向布局
+        
+        Args:
+            node_count: 节点数
+            edge_index: 形状为 (E, 2) 的边端点下标
+            
+        Returns:
+            np.ndarray: 形状为 (V, 2) 的坐标，范围 [0, LAYOUT_CANVAS_SIZE]
+        """
+        if node_count == 1:
+            return np.full((1, 2), self.LAYOUT_CANVAS_SIZE / 2)
+        
+        # 固定随机种子，保证同一子图布局稳定
+        rng = np.random.default_rng(42)
+        pos = rng.random((node_count, 2))
+        k = np.sqrt(1.0 / node_count)
+        temperature = 0.1
+        cooling = temperature / (self.LAYOUT_ITERATIONS + 1)
+        src, dst = (edge_index[:, 0], edge_index[:, 1]) if len(edge_index) else (None, None)
+        
+        for _ in range(self.LAYOUT_ITERATIONS):
+            # 斥力：所有节点对之间 k^2 / d
+            delta = pos[:, None, :] - pos[None, :, :]
+            distance = np.linalg.norm(delta, axis=-1)
+            np.clip(distance, 0.01, None, out=distance)
+            displacement = np.einsum('ijk,ij->ik', delta, (k * k) / distance ** 2)
+            
+            # 引力：相连节点之间 d^2 / k
+            if src is not None:
+                edge_delta = pos[src] - pos[dst]
+                edge_length = np.linalg.norm(edge_delta, axis=-1)[:, None]
+                attraction = edge_delta * edge_length / k
+                np.add.at(displacement, src, -attraction)
+                np.add.at(displacement, dst, attraction)
+            
+            length = np.linalg.norm(displacement, axis=-1)
+            np.clip(length, 0.01, None, out=length)
+            pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+            temperature -= cooling
+        
+        # 归一化到画布
+        pos -= pos.min(axis=0)
+        span = pos.max(axis=0)
+        span[span == 0] = 1.0
+        return pos / span * self.LAYOUT_CANVAS_SIZE
+    
+    def layout_graph(self, visualization_data: Dict[str, Any],
+                     graph_version: Any = None) -> Dict[str, Any]:
+        """
+        在服务端计算节点坐标（带缓存和细节层次简化）
+        
+        Args:
+            visualization_data: visualize_knowledge_graph 的返回值
+            graph_version: 图谱版本，缺省时取查询器的 graph_version
+            
+        Returns:
+            Dict: 节点带有 x/y 坐标的可视化数据
+        """
+        visualization_data = self.simplify_graph(visualization_data)
+        nodes = visualization_data.get('nodes', [])
+        if not nodes:
+            return visualization_data
+        
+        if graph_version is None:
+            graph_version = getattr(self.kg_query, 'graph_version', 0)
+        cache_key = (self._subgraph_hash(visualization_data), graph_version)
+        
+        with self.layout_lock:
+            positions = self.layout_cache.get(cache_key)
+            if positions is not None:
+                self.layout_cache.move_to_end(cache_key)
+        
+        if positions is None:
+            index = {node['id']: i for i, node in enumerate(nodes)}
+            edge_index = np.array(
+                [(index[e['source']], index[e['target']]) for e in visualization_data.get('edges', [])],
+                dtype=np.intp
+            ).reshape(-1, 2)
+            coords = self._force_layout(len(nodes), edge_index)
+            positions = {
+                node['id']: (round(float(coords[i, 0]), 2), round(float(coords[i, 1]), 2))
+                for i, node in enumerate(nodes)
+            }
+            with self.layout_lock:
+                self.layout_cache[cache_key] = positions
+                while len(self.layout_cache) > self.LAYOUT_CACHE_SIZE:
+                    self.layout_cache.popitem(last=False)
+        
+        laid_out_nodes = []
+        for node in nodes:
+            x, y = positions[node['id']]
+            laid_out_nodes.append({**node, 'x': x, 'y': y})
+        
+        return {**visualization_data, 'nodes': laid_out_nodes}
+    
+    def clear_layout_cache(self):
+        """清空布局缓存（图谱更新后调用）"""
+        with self.layout_lock:
+            self.layout_cache.clear()
+    
     def query_and_visualize(self, question: str, entities: List[str] = None) -> Dict[str, Any]:
         """
         查询并可视化知识图谱
@@ -136,17 +456,19 @@ class KnowledgeGraphVisualizer:
     
 
 
-def create_visualizer_with_kg(kg_query: Optional[KnowledgeGraphQuery] = None) -> KnowledgeGraphVisualizer:
+def create_visualizer_with_kg(kg_query: Optional[KnowledgeGraphQuery] = None,
+                              **kwargs) -> KnowledgeGraphVisualizer:
     """
     创建带知识图谱查询功能的可视化器
     
     Args:
         kg_query: 知识图谱查询器实例
+        **kwargs: 透传给 KnowledgeGraphVisualizer 的子图限制参数
         
     Returns:
         KnowledgeGraphVisualizer: 可视化器实例
     """
-    return KnowledgeGraphVisualizer(kg_query)
+    return KnowledgeGraphVisualizer(kg_query, **kwargs)
 
 
 # 示例用法
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+路径引擎正确性检查
+在夹具图上运行 PathEngine.find_paths，并在随机图上与穷举所有跳数受限简单路径的结果比较，
+检查 top-k 路径的置信度是否与穷举一致。不需要 Neo4j。
+
+用法:
+    python -m modules.path_check
+    python -m modules.path_check --graphs 500 --seed 1
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.graph_paths import PathEngine
+
+
+class FixtureGraph:
+    """提供 PathEngine 所需的 get_graph_version / run_query 的内存图"""
+
+    def __init__(self, edges: List[Dict[str, Any]]):
+        self.edges = edges
+
+    def get_graph_version(self) -> str:
+        return 'fixture'
+
+    def run_query(self, template: str, query: str, **params) -> List[Dict[str, Any]]:
+        return self.edges
+
+
+def edge(entity1: str, entity2: str, confidence: float) -> Dict[str, Any]:
+    return {'entity1': entity1, 'relation_type': '相关', 'entity2': entity2, 'confidence': confidence}
+
+
+def chain(nodes: str, confidence: float) -> List[Dict[str, Any]]:
+    return [edge(a, b, confidence) for a, b in zip(nodes, nodes[1:])]
+
+
+# 最轻的路径较长：跳数限制为 2 时只有低置信度的 A-Y-T 满足条件
+HOP_LIMIT_EDGES = chain('ABCDT', 0.99) + chain('APQRT', 0.95) + chain('AYT', 0.5)
+
+# (名称, 关系, 起点, 终点, find_paths 参数, 期望的节点序列)
+CASES = [
+    ('跳数限制内的低置信度路径', HOP_LIMIT_EDGES, 'A', 'T', {'k': 3, 'max_hops': 2}, [['A', 'Y', 'T']]),
+    ('跳数足够时按置信度排序', HOP_LIMIT_EDGES, 'A', 'T', {'k': 3, 'max_hops': 4},
+     [['A', 'B', 'C', 'D', 'T'], ['A', 'P', 'Q', 'R', 'T'], ['A', 'Y', 'T']]),
+    ('跳数限制为 1 时不可达', HOP_LIMIT_EDGES, 'A', 'T', {'k': 3, 'max_hops': 1}, []),
+    ('有向搜索只走出边', chain('AB', 0.9) + [edge('C', 'B', 0.9)], 'A', 'C', {'k': 2, 'directed': True}, []),
+]
+
+
+def brute_force(edges: List[Dict[str, Any]], source: str, target: str, k: int, max_hops: int) -> List[float]:
+    """穷举跳数受限的无向简单路径，返回置信度最高的 k 条路径的置信度"""
+    best: Dict[tuple, float] = {}
+    for e in edges:
+        for key in ((e['entity1'], e['entity2']), (e['entity2'], e['entity1'])):
+            best[key] = max(best.get(key, 0.0), e['confidence'])
+    adjacency: Dict[str, List[str]] = {}
+    for a, b in best:
+        adjacency.setdefault(a, []).append(b)
+
+    found = []
+    stack = [(source, [source], 1.0)]
+    while stack:
+        node, path, confidence = stack.pop()
+        if node == target:
+            found.append(confidence)
+            continue
+        if len(path) - 1 >= max_hops:
+            continue
+        for neighbor in adjacency.get(node, ()):
+            if neighbor not in path:
+                stack.append((neighbor, path + [neighbor], confidence * best[(node, neighbor)]))
+    return sorted(found, reverse=True)[:k]
+
+
+def run_cases() -> List[str]:
+    """运行夹具用例，返回失败说明"""
+    failures = []
+    for name, edges, source, target, params, expected in CASES:
+        paths = PathEngine(FixtureGraph(edges)).find_paths(source, target, **params)
+        nodes = [path['nodes'] for path in paths]
+        if nodes != expected:
+            failures.append(f"{name}: 期望 {expected}，得到 {nodes}")
+    return failures
+
+
+def run_random(graphs: int, seed: int) -> List[str]:
+    """在随机图上与穷举结果比较，返回失败说明"""
+    rng = random.Random(seed)
+    failures = []
+    for i in range(graphs):
+        names = [f"n{j}" for j in range(rng.randint(4, 9))]
+        edges = [edge(a, b, round(rng.uniform(0.3, 1.0), 2))
+                 for a in names for b in names if a < b and rng.random() < 0.35]
+        source, target = rng.sample(names, 2)
+        k, max_hops = rng.randint(1, 4), rng.randint(1, 4)
+        engine = PathEngine(FixtureGraph(edges))
+        got = [path['confidence'] for path in engine.find_paths(source, target, k=k, max_hops=max_hops)]
+        expected = brute_force(edges, source, target, k, max_hops) if source in engine.adjacency and \
+            target in engine.adjacency else []
+        if len(got) != len(expected) or any(not math.isclose(a, b, rel_tol=1e-9) for a, b in zip(got, expected)):
+            failures.append(f"随机图 {i}（{source}->{target}, k={k}, max_hops={max_hops}）: "
+                            f"期望 {expected}，得到 {got}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="路径引擎正确性检查")
+    parser.add_argument('--graphs', type=int, default=200, help='随机图数量')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    failures = run_cases()
+    print(f"{'✅' if not failures else '❌'} 夹具用例: {len(CASES) - len(failures)}/{len(CASES)} 通过")
+    random_failures = run_random(args.graphs, args.seed)
+    print(f"{'✅' if not random_failures else '❌'} 随机图: {args.graphs - len(random_failures)}/{args.graphs} 与穷举一致")
+    for failure in (failures + random_failures)[:10]:
+        print(f"   {failure}")
+    sys.exit(1 if failures or random_failures else 0)
+
+
+if __name__ == "__main__":
+    main()
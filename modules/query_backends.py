@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+查询后端模块
+为统一查询引擎提供可替换的图数据访问实现：Neo4j 和内存索引
+
+所有后端返回相同结构的关系行:
+    source, relation, target, confidence, source_sentence
+结果按 confidence 降序、再按 source/relation/target 升序排列，保证不同后端输出一致。
+缺失的置信度按 1.0 处理，置信度过滤在后端内完成。
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+from .graph_stats import META_KEY, GraphStatistics
+
+# 浮点比较容差，与原查询层保持一致
+FLOAT_PRECISION = 1e-10
+
+
+def _sort_key(row: Dict[str, Any]):
+    return (-row['confidence'], row['source'], row['relation'], row['target'])
+
+
+class QueryBackend(ABC):
+    """查询后端接口（缺少任一查询方法的后端无法实例化）"""
+
+    name = 'base'
+
+    @abstractmethod
+    def entity_relations(self, entities: List[str], threshold: float, limit: int) -> List[Dict[str, Any]]:
+        """返回以任一实体为头或尾的关系"""
+
+    @abstractmethod
+    def relations_by_type(self, entities: List[str], relations: List[str],
+                          threshold: float, limit: int) -> List[Dict[str, Any]]:
+        """返回与实体相连、类型属于 relations 的关系"""
+
+    @abstractmethod
+    def relations_between(self, entity1: str, entity2: str, threshold: float,
+                          bidirectional: bool, limit: int) -> List[Dict[str, Any]]:
+        """返回两个实体之间的关系，带 direction 字段（forward/reverse）"""
+
+    @abstractmethod
+    def entities_exist(self, entities: List[str]) -> Dict[str, bool]:
+        """检查实体是否存在"""
+
+    @abstractmethod
+    def entities_containing(self, keyword: str, limit: int) -> List[str]:
+        """返回名称包含关键词的实体，按名称排序"""
+
+    @abstractmethod
+    def statistics(self) -> Dict[str, Any]:
+        """返回节点数、关系数和各关系类型数量"""
+
+
+class Neo4jBackend(QueryBackend):
+    """基于Neo4j的查询后端，查询通过 KnowledgeGraphQuery.run_query 执行以记录慢查询"""
+
+    name = 'neo4j'
+
+    ROW_PROJECTION = """
+    src.name AS source,
+    type(r) AS relation,
+    dst.name AS target,
+    COALESCE(r.confidence, 1.0) AS confidence,
+    r.source_sentence AS source_sentence
+    """
+
+    def __init__(self, kg_query):
+        """
+        Args:
+            kg_query: 知识图谱查询器实例（提供 run_query）
+        """
+        self.kg_query = kg_query
+
+    def entity_relations(self, entities, threshold, limit):
+        query = f"""
+        MATCH (src:Entity)-[r]->(dst:Entity)
+        WHERE (src.name IN $entities OR dst.name IN $entities)
+        AND COALESCE(r.confidence, 1.0) >= $threshold
+        RETURN {self.ROW_PROJECTION}
+        ORDER BY confidence DESC, source, relation, target
+        LIMIT $limit
+        """
+        return self.kg_query.run_query('engine_entity_relations', query, entities=entities,
+                                       threshold=threshold - FLOAT_PRECISION, limit=limit)
+
+    def relations_by_type(self, entities, relations, threshold, limit):
+        resolver = getattr(self.kg_query, 'relation_resolver', None)
+        if resolver is None or any(rel not in resolver.relation_types for rel in relations):
+            # 未知类型不能写进模式，退回到按 type(r) 过滤
+            query = f"""
+            MATCH (src:Entity)-[r]->(dst:Entity)
+            WHERE (src.name IN $entities OR dst.name IN $entities)
+            AND type(r) IN $relations
+            AND COALESCE(r.confidence, 1.0) >= $threshold
+            RETURN {self.ROW_PROJECTION}
+            ORDER BY confidence DESC, source, relation, target
+            LIMIT $limit
+            """
+            return self.kg_query.run_query('engine_relations_by_type', query, entities=entities,
+                                           relations=relations, threshold=threshold - FLOAT_PRECISION,
+                                           limit=limit)
+
+        # 类型化模式只展开指定类型的关系，两个方向分别从已知实体出发
+        type_pattern = resolver.type_pattern(relations)
+        query = f"""
+        CALL {{
+            MATCH (src:Entity)-[r{type_pattern}]->(dst:Entity)
+            WHERE src.name IN $entities
+            RETURN src, r, dst
+            UNION
+            MATCH (src:Entity)-[r{type_pattern}]->(dst:Entity)
+            WHERE dst.name IN $entities
+            RETURN src, r, dst
+        }}
+        WITH src, r, dst
+        WHERE COALESCE(r.confidence, 1.0) >= $threshold
+        RETURN {self.ROW_PROJECTION}
+        ORDER BY confidence DESC, source, relation, target
+        LIMIT $limit
+        """
+        return self.kg_query.run_query('engine_relations_by_type_typed', query, entities=entities,
+                                       threshold=threshold - FLOAT_PRECISION, limit=limit)
+
+    def relations_between(self, entity1, entity2, threshold, bidirectional, limit):
+        if bidirectional:
+            match = """
+            MATCH (src:Entity)-[r]->(dst:Entity)
+            WHERE ((src.name = $entity1 AND dst.name = $entity2)
+                OR (src.name = $entity2 AND dst.name = $entity1))
+            """
+        else:
+            match = """
+            MATCH (src:Entity)-[r]->(dst:Entity)
+            WHERE src.name = $entity1 AND dst.name = $entity2
+            """
+        query = f"""
+        {match}
+        AND COALESCE(r.confidence, 1.0) >= $threshold
+        RETURN {self.ROW_PROJECTION},
+          CASE WHEN src.name = $entity1 THEN 'forward' ELSE 'reverse' END AS direction
+        ORDER BY confidence DESC, source, relation, target
+        LIMIT $limit
+        """
+        return self.kg_query.run_query('engine_relations_between', query, entity1=entity1,
+                                       entity2=entity2, threshold=threshold - FLOAT_PRECISION,
+                                       limit=limit)
+
+    def entities_exist(self, entities):
+        query = """
+        UNWIND $entities AS entity_name
+        OPTIONAL MATCH (n:Entity {name: entity_name})
+        WITH entity_name, count(n) > 0 AS exists
+        RETURN entity_name, exists
+        """
+        rows = self.kg_query.run_query('engine_entities_exist', query, entities=entities)
+        return {row['entity_name']: row['exists'] for row in rows}
+
+    def entities_containing(self, keyword, limit):
+        query = """
+        MATCH (n:Entity)
+        WHERE n.name CONTAINS $keyword
+        RETURN DISTINCT n.name AS name
+        ORDER BY name
+        LIMIT $limit
+        """
+        rows = self.kg_query.run_query('engine_entities_containing', query, keyword=keyword, limit=limit)
+        return [row['name'] for row in rows]
+
+    def statistics(self):
+        # 优先读取构建时物化在 GraphMeta 节点上的统计
+        rows = self.kg_query.run_query('engine_statistics',
+                                       "MATCH (m:GraphMeta {key: $key}) RETURN properties(m) AS meta",
+                                       key=META_KEY)
+        stats = GraphStatistics.from_meta(rows[0]['meta'] if rows else None)
+        if stats is not None:
+            return stats.to_dict()
+
+        # 旧图谱没有物化统计时退回到全图扫描
+        node_count = self.kg_query.run_query('engine_node_count', "MATCH (n:Entity) RETURN count(n) AS c")[0]['c']
+        rel_types = self.kg_query.run_query(
+            'engine_relationship_types',
+            "MATCH (:Entity)-[r]->(:Entity) RETURN type(r) AS rel_type, count(r) AS count ORDER BY count DESC, rel_type"
+        )
+        return {
+            'node_count': node_count,
+            'relationship_count': sum(row['count'] for row in rel_types),
+            'relationship_types': rel_types
+        }
+
+
+class InMemoryBackend(QueryBackend):
+    """基于内存字典索引的查询后端
+
+    适合中小规模图谱（本课程图谱在万级关系以内）：按头/尾实体建立倒排，
+    每次查询只访问相关实体的邻接行。
+    """
+
+    name = 'memory'
+
+    def __init__(self, triples: Optional[Iterable[Dict[str, Any]]] = None):
+        """
+        Args:
+            triples: 关系行，含 source、relation、target，可选 confidence、source_sentence
+        """
+        self.nodes = set()
+        self.rows: List[Dict[str, Any]] = []
+        self.by_source: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_target: Dict[str, List[Dict[str, Any]]] = {}
+        if triples:
+            self.load(triples)
+
+    def load(self, triples: Iterable[Dict[str, Any]]):
+        """追加关系行并更新索引"""
+        for triple in triples:
+            confidence = triple.get('confidence')
+            row = {
+                'source': triple['source'],
+                'relation': triple['relation'],
+                'target': triple['target'],
+                'confidence': 1.0 if confidence is None else float(confidence),
+                'source_sentence': triple.get('source_sentence')
+            }
+            self.rows.append(row)
+            self.nodes.add(row['source'])
+            self.nodes.add(row['target'])
+            self.by_source.setdefault(row['source'], []).append(row)
+            self.by_target.setdefault(row['target'], []).append(row)
+
+    def add_nodes(self, names: Iterable[str]):
+        """添加孤立节点"""
+        self.nodes.update(names)
+
+    @classmethod
+    def from_neo4j(cls, kg_query) -> 'InMemoryBackend':
+        """从Neo4j导出全部关系构建内存后端"""
+        backend = cls()
+        rows = kg_query.run_query('engine_dump', f"""
+        MATCH (src:Entity)-[r]->(dst:Entity)
+        RETURN {Neo4jBackend.ROW_PROJECTION}
+        """)
+        backend.load(rows)
+        names = kg_query.run_query('engine_dump_nodes', "MATCH (n:Entity) RETURN n.name AS name")
+        backend.add_nodes(row['name'] for row in names)
+        return backend
+
+    def _touching(self, entities: List[str]) -> List[Dict[str, Any]]:
+        """返回头或尾属于实体集合的关系（去重）"""
+        seen = set()
+        rows = []
+        for entity in entities:
+            for row in self.by_source.get(entity, []) + self.by_target.get(entity, []):
+                if id(row) not in seen:
+                    seen.add(id(row))
+                    rows.append(row)
+        return rows
+
+    @staticmethod
+    def _select(rows: List[Dict[str, Any]], threshold: float, limit: int) -> List[Dict[str, Any]]:
+        threshold -= FLOAT_PRECISION
+        selected = [dict(row) for row in rows if row['confidence'] >= threshold]
+        selected.sort(key=_sort_key)
+        return selected[:limit]
+
+    def entity_relations(self, entities, threshold, limit):
+        return self._select(self._touching(entities), threshold, limit)
+
+    def relations_by_type(self, entities, relations, threshold, limit):
+        relation_set = set(relations)
+        rows = [row for row in self._touching(entities) if row['relation'] in relation_set]
+        return self._select(rows, threshold, limit)
+
+    def relations_between(self, entity1, entity2, threshold, bidirectional, limit):
+        rows = [row for row in self.by_source.get(entity1, []) if row['target'] == entity2]
+        if bidirectional:
+            rows += [row for row in self.by_source.get(entity2, []) if row['target'] == entity1]
+        selected = self._select(rows, threshold, limit)
+        for row in selected:
+            row['direction'] = 'forward' if row['source'] == entity1 else 'reverse'
+        return selected
+
+    def entities_exist(self, entities):
+        return {entity: entity in self.nodes for entity in entities}
+
+    def entities_containing(self, keyword, limit):
+        return sorted(name for name in self.nodes if keyword in name)[:limit]
+
+    def statistics(self):
+        counts: Dict[str, int] = {}
+        for row in self.rows:
+            counts[row['relation']] = counts.get(row['relation'], 0) + 1
+        rel_types = [
+            {'rel_type': rel_type, 'count': count}
+            for rel_type, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        ]
+        return {
+            'node_count': len(self.nodes),
+            'relationship_count': len(self.rows),
+            'relationship_types': rel_types
+        }
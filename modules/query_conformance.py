@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+查询后端一致性检查与基准测试
+在同一份夹具图谱上对每个后端运行相同的查询用例，校验结果语义并比较各后端输出，
+再测量每个后端的查询吞吐，用于在不改变行为的前提下选择最快的后端
+
+用法:
+    python -m modules.query_conformance                      # 仅内存后端
+    python -m modules.query_conformance --backends memory,neo4j --bench 200
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.query_backends import InMemoryBackend, Neo4jBackend, QueryBackend
+from modules.query_engine import QueryEngine
+
+# 夹具实体名前缀与标签，避免与真实图谱冲突
+FIXTURE_PREFIX = 'conf_'
+FIXTURE_LABEL = 'Conformance'
+
+
+def n(name: str) -> str:
+    """夹具实体名"""
+    return FIXTURE_PREFIX + name
+
+
+FIXTURE_TRIPLES = [
+    {'source': n('线性表'), 'relation': '包含', 'target': n('数组'), 'confidence': 0.95, 'source_sentence': '线性表包含数组'},
+    {'source': n('线性表'), 'relation': '包含', 'target': n('链表'), 'confidence': 0.9, 'source_sentence': '线性表包含链表'},
+    {'source': n('栈'), 'relation': '被包含', 'target': n('线性表'), 'confidence': 0.85, 'source_sentence': '栈是一种线性表'},
+    {'source': n('队列'), 'relation': '被包含', 'target': n('线性表'), 'confidence': 0.85, 'source_sentence': '队列是一种线性表'},
+    {'source': n('栈'), 'relation': '相对', 'target': n('队列'), 'confidence': 0.7, 'source_sentence': '栈与队列相对'},
+    {'source': n('队列'), 'relation': '相对', 'target': n('栈'), 'confidence': 0.82, 'source_sentence': '队列与栈相对'},
+    {'source': n('二叉树'), 'relation': '被包含', 'target': n('树'), 'confidence': 0.99, 'source_sentence': '二叉树是一种树'},
+    {'source': n('链表'), 'relation': '依赖', 'target': n('指针'), 'confidence': None, 'source_sentence': '链表依赖指针'},
+]
+FIXTURE_ISOLATED = [n('孤立')]
+
+
+def _triples(rows: List[Dict[str, Any]]) -> List[Tuple[str, str, str]]:
+    return [(row['source'], row['relation'], row['target']) for row in rows]
+
+
+# 用例: (名称, 查询函数, 校验函数)
+CASES: List[Tuple[str, Callable[[QueryEngine], Any], Callable[[Any], bool]]] = [
+    ('entity_relations_sorted',
+     lambda e: e.find_entity_relations([n('线性表')], 0.8),
+     lambda r: _triples(r) == [
+         (n('线性表'), '包含', n('数组')),
+         (n('线性表'), '包含', n('链表')),
+         (n('栈'), '被包含', n('线性表')),
+         (n('队列'), '被包含', n('线性表')),
+     ]),
+    ('entity_relations_threshold',
+     lambda e: e.find_entity_relations([n('栈')], 0.8),
+     lambda r: _triples(r) == [(n('栈'), '被包含', n('线性表')), (n('队列'), '相对', n('栈'))]),
+    ('entity_relations_threshold_boundary',
+     lambda e: e.find_entity_relations([n('栈')], 0.82),
+     lambda r: (n('队列'), '相对', n('栈')) in _triples(r)),
+    ('null_confidence_as_one',
+     lambda e: e.find_entity_relations([n('指针')], 0.99),
+     lambda r: len(r) == 1 and r[0]['confidence'] == 1.0),
+    ('provenance_sentence',
+     lambda e: e.find_entity_relations([n('二叉树')], 0.5),
+     lambda r: len(r) == 1 and r[0]['source_sentence'] == '二叉树是一种树'),
+    ('entities_by_relation',
+     lambda e: e.find_entities_by_relation([n('线性表')], '被包含', 0.8),
+     lambda r: _triples(r) == [(n('栈'), '被包含', n('线性表')), (n('队列'), '被包含', n('线性表'))]),
+    ('entities_by_relation_synonym',
+     lambda e: e.find_entities_by_relation([n('线性表')], '属于', 0.8),
+     lambda r: _triples(r) == [(n('栈'), '被包含', n('线性表')), (n('队列'), '被包含', n('线性表'))]),
+    ('entities_by_relation_code',
+     lambda e: e.find_entities_by_relation([n('线性表')], 'belg', 0.8),
+     lambda r: _triples(r) == [(n('线性表'), '包含', n('数组')), (n('线性表'), '包含', n('链表'))]),
+    ('relation_between_bidirectional',
+     lambda e: e.find_relation_by_entities([n('栈'), n('队列')], 0.5),
+     lambda r: [(row['source'], row['direction']) for row in r] == [(n('队列'), 'reverse'), (n('栈'), 'forward')]),
+    ('relation_between_directed',
+     lambda e: e.find_relation_by_entities([n('栈'), n('队列')], 0.5, bidirectional=False),
+     lambda r: [(row['source'], row['direction']) for row in r] == [(n('栈'), 'forward')]),
+    ('entities_exist',
+     lambda e: e.check_entities_exist([n('孤立'), n('不存在')]),
+     lambda r: r == {n('孤立'): True, n('不存在'): False}),
+    ('entities_containing',
+     lambda e: e.get_entities_containing(n('二')),
+     lambda r: r == [n('二叉树')]),
+    ('invalid_threshold_rejected',
+     lambda e: _raises(lambda: e.find_entity_relations([n('栈')], 1.5), ValueError),
+     lambda r: r is True),
+    ('empty_entities_rejected',
+     lambda e: _raises(lambda: e.find_entity_relations([]), ValueError),
+     lambda r: r is True),
+]
+
+
+def _raises(func: Callable[[], Any], exc_type) -> bool:
+    try:
+        func()
+    except exc_type:
+        return True
+    return False
+
+
+def load_fixture_neo4j(kg_query):
+    """把夹具写入Neo4j（带 Conformance 标签）"""
+    names = sorted({t['source'] for t in FIXTURE_TRIPLES} | {t['target'] for t in FIXTURE_TRIPLES} | set(FIXTURE_ISOLATED))
+    kg_query.graph.run(f"UNWIND $names AS name CREATE (:Entity:{FIXTURE_LABEL} {{name: name, type: 'CON'}})", names=names)
+    for triple in FIXTURE_TRIPLES:
+        kg_query.graph.run(f"""
+        MATCH (h:{FIXTURE_LABEL} {{name: $source}}), (t:{FIXTURE_LABEL} {{name: $target}})
+        CREATE (h)-[r:`{triple['relation']}`]->(t)
+        SET r.confidence = $confidence, r.source_sentence = $source_sentence
+        """, **triple)
+
+
+def drop_fixture_neo4j(kg_query):
+    """删除Neo4j中的夹具"""
+    kg_query.graph.run(f"MATCH (n:{FIXTURE_LABEL}) DETACH DELETE n")
+
+
+def make_memory_backend() -> InMemoryBackend:
+    backend = InMemoryBackend(FIXTURE_TRIPLES)
+    backend.add_nodes(FIXTURE_ISOLATED)
+    return backend
+
+
+def run_conformance(backend: QueryBackend) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    对单个后端运行全部用例
+
+    Returns:
+        (用例名 -> 结果, 失败的用例名列表)
+    """
+    engine = QueryEngine(backend, cache_ttl=0)
+    outputs, failures = {}, []
+    for name, query, check in CASES:
+        try:
+            result = query(engine)
+            outputs[name] = result
+            if not check(result):
+                failures.append(name)
+        except Exception as e:
+            outputs[name] = f"异常: {e}"
+            failures.append(name)
+    return outputs, failures
+
+
+def run_benchmark(backend: QueryBackend, iterations: int) -> float:
+    """无缓存地循环运行全部用例，返回每秒查询数"""
+    engine = QueryEngine(backend, cache_ttl=0)
+    start_time = time.time()
+    for _ in range(iterations):
+        for _, query, _ in CASES:
+            query(engine)
+    elapsed = time.time() - start_time
+    return iterations * len(CASES) / elapsed if elapsed > 0 else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询后端一致性检查与基准测试")
+    parser.add_argument('--backends', default='memory', help='逗号分隔: memory,neo4j')
+    parser.add_argument('--bench', type=int, default=0, help='基准测试轮数，0 表示不测')
+    args = parser.parse_args()
+
+    backends: Dict[str, QueryBackend] = {}
+    kg_query = None
+    for name in args.backends.split(','):
+        name = name.strip()
+        if name == 'memory':
+            backends[name] = make_memory_backend()
+        elif name == 'neo4j':
+            from modules.config_manager import get_config_manager
+            from modules.knowledge_graph_query import KnowledgeGraphQuery
+            db_config = get_config_manager().get_database_config()
+            kg_query = KnowledgeGraphQuery(db_config['uri'], db_config['user_name'], db_config['password'])
+            drop_fixture_neo4j(kg_query)
+            load_fixture_neo4j(kg_query)
+            backends[name] = Neo4jBackend(kg_query)
+        else:
+            parser.error(f"未知后端: {name}")
+
+    exit_code = 0
+    try:
+        reference = None
+        for name, backend in backends.items():
+            outputs, failures = run_conformance(backend)
+            if reference is None:
+                reference = (name, outputs)
+            mismatches = [case for case in outputs if outputs[case] != reference[1].get(case)]
+            status = '✅' if not failures and not mismatches else '❌'
+            print(f"{status} {name}: {len(CASES) - len(failures)}/{len(CASES)} 用例通过")
+            for case in failures:
+                print(f"   失败: {case} -> {outputs[case]}")
+            for case in mismatches:
+                print(f"   与 {reference[0]} 输出不一致: {case}")
+            if failures or mismatches:
+                exit_code = 1
+
+            if args.bench:
+                qps = run_benchmark(backend, args.bench)
+                print(f"   基准: {qps:.0f} 次查询/秒")
+    finally:
+        if kg_query is not None:
+            drop_fixture_neo4j(kg_query)
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+统一查询引擎模块
+合并 KnowledgeGraphQuery 的缓存与 DSAGraphQAFixed 的输入校验、方向处理和溯源信息，
+通过可替换的查询后端（Neo4j / 内存）提供同一套问答查询接口
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List
+
+from .query_backends import QueryBackend
+from .relation_resolver import RelationResolver
+
+
+class QueryEngine:
+    """统一查询引擎
+
+    所有查询接口返回带溯源信息的关系行（source、relation、target、confidence、
+    source_sentence），输入不合法时抛出 ValueError/TypeError，与原 DSAGraphQAFixed 一致。
+    """
+
+    # 常量定义
+    MAX_ENTITY_LENGTH = 100
+    MAX_ENTITIES_PER_QUERY = 50
+    DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+    QUERY_RESULT_LIMIT = 1000
+    CACHE_TTL = 600  # 10分钟缓存
+
+    # 数据库中实际的关系类型（中文）
+    RELATION_TYPES = ["依赖", "被依赖", "包含", "被包含", "同义", "相对", "拥有", "属性"]
+
+    SUSPICIOUS_PATTERNS = [
+        r"[';]",  # 分号和单引号
+        r"\b(DROP|DELETE|CREATE|ALTER|MERGE)\b",  # 危险的Cypher关键词
+        r"//",  # 注释符号
+        r"/\*.*\*/",  # 块注释
+    ]
+
+    def __init__(self, backend: QueryBackend, cache_ttl: int = CACHE_TTL):
+        """
+        初始化查询引擎
+
+        Args:
+            backend: 查询后端实例
+            cache_ttl: 查询缓存秒数，0 表示不缓存
+        """
+        self.backend = backend
+        self.cache_ttl = cache_ttl
+        self.query_cache = {}
+        self.cache_lock = threading.RLock()
+        self.logger = logging.getLogger(__name__)
+        self.relation_resolver = RelationResolver()
+
+    # ------------------------------------------------------------------
+    # 缓存
+    # ------------------------------------------------------------------
+
+    def _cached(self, cache_key: str, compute):
+        """按键读取缓存，未命中时计算并写入"""
+        now = time.time()
+        with self.cache_lock:
+            entry = self.query_cache.get(cache_key)
+            if entry is not None and now - entry[1] < self.cache_ttl:
+                return entry[0]
+        result = compute()
+        if self.cache_ttl > 0:
+            with self.cache_lock:
+                self.query_cache[cache_key] = (result, now)
+                expired = [key for key, (_, ts) in self.query_cache.items() if now - ts >= self.cache_ttl]
+                for key in expired:
+                    del self.query_cache[key]
+        return result
+
+    def clear_cache(self):
+        """清空查询缓存（图谱更新后调用）"""
+        with self.cache_lock:
+            self.query_cache.clear()
+
+    # ------------------------------------------------------------------
+    # 输入校验
+    # ------------------------------------------------------------------
+
+    def _contains_suspicious_patterns(self, text: str) -> bool:
+        """检查文本是否包含可疑的注入模式"""
+        return any(re.search(pattern, text, re.IGNORECASE) for pattern in self.SUSPICIOUS_PATTERNS)
+
+    def _validate_entities(self, entities: List[str]) -> List[str]:
+        """验证和清理实体列表
+
+        Raises:
+            ValueError: 实体验证失败
+            TypeError: 类型错误
+        """
+        if entities is None:
+            raise TypeError("实体列表不能为None")
+
+        if not isinstance(entities, list):
+            raise TypeError("entities必须是列表类型")
+
+        if not entities:
+            raise ValueError("实体列表不能为空")
+
+        if len(entities) > self.MAX_ENTITIES_PER_QUERY:
+            raise ValueError(f"实体数量不能超过{self.MAX_ENTITIES_PER_QUERY}个")
+
+        clean_entities = []
+        for i, entity in enumerate(entities):
+            if entity is None:
+                continue
+
+            entity_str = str(entity).strip()
+            if not entity_str:
+                continue
+
+            if len(entity_str) > self.MAX_ENTITY_LENGTH:
+                raise ValueError(f"第{i+1}个实体名称过长（最大{self.MAX_ENTITY_LENGTH}字符）: {entity_str[:50]}...")
+
+            if self._contains_suspicious_patterns(entity_str):
+                raise ValueError(f"实体名称包含可疑字符: {entity_str}")
+
+            clean_entities.append(entity_str)
+
+        if not clean_entities:
+            raise ValueError("没有有效的实体")
+
+        return clean_entities
+
+    def _validate_confidence_threshold(self, confidence_threshold: float) -> float:
+        """验证置信度阈值
+
+        Raises:
+            ValueError: 置信度阈值无效
+            TypeError: 类型错误
+        """
+        if not isinstance(confidence_threshold, (int, float)):
+            raise TypeError("置信度阈值必须是数字类型")
+
+        if not (0.0 <= confidence_threshold <= 1.0):
+            raise ValueError("置信度阈值必须在0.0到1.0之间")
+
+        return float(confidence_threshold)
+
+    def _validate_relation(self, relation: str) -> str:
+        """验证关系类型"""
+        if not relation or not isinstance(relation, str):
+            raise ValueError("关系类型不能为空且必须是字符串")
+
+        relation = relation.strip()
+        if not relation:
+            raise ValueError("关系类型不能为空")
+
+        if self._contains_suspicious_patterns(relation):
+            raise ValueError(f"关系类型包含可疑字符: {relation}")
+
+        return relation
+
+    # ------------------------------------------------------------------
+    # 查询接口
+    # ------------------------------------------------------------------
+
+    def find_entity_relations(self, entities: List[str],
+                              confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> List[Dict[str, Any]]:
+        """接口1: 接收实体列表，查找所有相关的关系和实体
+
+        Returns:
+            包含关系信息的列表，每个元素包含source、relation、target、confidence、source_sentence
+        """
+        clean_entities = self._validate_entities(entities)
+        confidence_threshold = self._validate_confidence_threshold(confidence_threshold)
+
+        cache_key = f"entity_relations:{clean_entities}:{confidence_threshold}"
+        return self._cached(cache_key, lambda: self.backend.entity_relations(
+            clean_entities, confidence_threshold, self.QUERY_RESULT_LIMIT))
+
+    def find_entities_by_relation(self, entities: List[str], relation: str,
+                                  confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> List[Dict[str, Any]]:
+        """接口2: 接收实体和关系，找到有这个关系的其他实体
+
+        关系可以是中文类型、英文编码（如 rely）或知识库中的同义词（如 属于），
+        解析为精确的关系类型后再查询
+
+        Returns:
+            包含关系信息的列表
+        """
+        clean_entities = self._validate_entities(entities)
+        confidence_threshold = self._validate_confidence_threshold(confidence_threshold)
+        relation = self._validate_relation(relation)
+        relation_types = self.relation_resolver.resolve(relation, include_inverse=False) or [relation]
+
+        cache_key = f"entities_by_relation:{clean_entities}:{relation_types}:{confidence_threshold}"
+        return self._cached(cache_key, lambda: self.backend.relations_by_type(
+            clean_entities, relation_types, confidence_threshold, self.QUERY_RESULT_LIMIT))
+
+    def find_relation_by_entities(self, entities: List[str],
+                                  confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+                                  bidirectional: bool = True,
+                                  debug: bool = False) -> List[Dict[str, Any]]:
+        """接口3: 接收两个实体，找到这两个实体之间的关系
+
+        Returns:
+            包含关系信息的列表，每个元素额外包含direction（forward/reverse）
+        """
+        clean_entities = self._validate_entities(entities)
+        confidence_threshold = self._validate_confidence_threshold(confidence_threshold)
+
+        if len(clean_entities) != 2:
+            raise ValueError("实体列表必须包含两个实体")
+
+        entity1, entity2 = clean_entities
+
+        if debug:
+            self._print_entity_diagnostics([entity1, entity2])
+
+        cache_key = f"relation_by_entities:{entity1}:{entity2}:{confidence_threshold}:{bidirectional}"
+        return self._cached(cache_key, lambda: self.backend.relations_between(
+            entity1, entity2, confidence_threshold, bidirectional, self.QUERY_RESULT_LIMIT))
+
+    def _print_entity_diagnostics(self, entities: List[str]):
+        """调试模式：打印实体存在性和相似实体建议"""
+        entity_check = self.check_entities_exist(entities)
+        print(f"实体存在性检查:")
+        for entity in entities:
+            print(f"  '{entity}': {'✅存在' if entity_check.get(entity, False) else '❌不存在'}")
+
+        for entity in entities:
+            if not entity_check.get(entity, False):
+                similar_entities = self.get_entities_containing(entity)
+                if similar_entities:
+                    print(f"  建议：'{entity}'不存在，但找到包含该词的实体: {similar_entities[:5]}")
+                else:
+                    print(f"  建议：'{entity}'不存在，且没有找到相似实体")
+
+    def check_entities_exist(self, entities: List[str]) -> Dict[str, bool]:
+        """检查实体是否在数据库中存在"""
+        if not entities:
+            return {}
+
+        try:
+            return self.backend.entities_exist(list(entities))
+        except Exception as e:
+            self.logger.error(f"检查实体存在性失败: {e}")
+            return {entity: False for entity in entities}
+
+    def get_entities_containing(self, keyword: str, limit: int = 20) -> List[str]:
+        """获取包含指定关键词的实体列表"""
+        if not keyword or not isinstance(keyword, str):
+            return []
+
+        keyword = keyword.strip()
+        if not keyword:
+            return []
+
+        try:
+            return self.backend.entities_containing(keyword, limit)
+        except Exception as e:
+            self.logger.error(f"搜索包含关键词的实体失败: {e}")
+            return []
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取系统统计信息"""
+        try:
+            stats = dict(self.backend.statistics())
+            stats['supported_relations'] = self.RELATION_TYPES
+            return stats
+        except Exception as e:
+            self.logger.error(f"获取统计信息失败: {e}")
+            return {"error": f"获取统计信息失败: {e}"}
+
+    # ------------------------------------------------------------------
+    # 问答流程
+    # ------------------------------------------------------------------
+
+    def query_graph(self, question: str, entities) -> Dict[str, Any]:
+        """核心查询流程
+
+        Args:
+            question: 问题文本
+            entities: 实体列表，或含 entities（及可选 relation）的字典
+
+        Returns:
+            带溯源信息的查询结果
+        """
+        if not question or not isinstance(question, str):
+            raise ValueError("问题不能为空且必须是字符串")
+
+        try:
+            if isinstance(entities, dict):
+                if 'relation' in entities:
+                    results = self.find_entities_by_relation(entities['entities'], entities['relation'])
+                else:
+                    results = self.find_entity_relations(entities['entities'])
+            else:
+                results = self.find_entity_relations(entities)
+
+            return self._format_results(question, results)
+
+        except Exception as e:
+            self.logger.error(f"查询失败: {e}")
+            return {
+                "question": question,
+                "answer": f"查询失败: {e}",
+                "knowledge_trace": [],
+                "error": str(e)
+            }
+
+    def _format_results(self, question: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """生成带溯源信息的回答"""
+        if not results:
+            return {
+                "question": question,
+                "answer": "暂无可靠知识支持",
+                "knowledge_trace": []
+            }
+
+        main_answer = f"{results[0]['source']} → {results[0]['relation']} → {results[0]['target']}"
+
+        trace_info = [{
+            "path": f"{r['source']} → {r['relation']} → {r['target']}",
+            "confidence": r['confidence'],
+            "source_sentence": r['source_sentence']
+        } for r in results]
+
+        return {
+            "question": question,
+            "answer": main_answer,
+            "knowledge_trace": trace_info
+        }
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Cypher性能分析工具
+在可配置规模的合成图谱上以 PROFILE 运行查询层的全部查询模板，
+记录返回行数、db hits 和耗时，输出对比表
+
+用法:
+    python -m modules.query_profiler --nodes 2000 --rels 10000 --output profile.json
+    python -m modules.query_profiler --compare profile.json
+    python -m modules.query_profiler --relation-benchmark
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.config_manager import get_config_manager
+from modules.knowledge_graph_query import KnowledgeGraphQuery
+from modules.graph_export import GraphExporter
+
+
+# 合成数据使用的标签和名称前缀，便于清理
+SYNTHETIC_LABEL = 'Synthetic'
+SYNTHETIC_PREFIX = 'syn_'
+RELATION_TYPES = ["依赖", "被依赖", "包含", "被包含", "同义", "相对", "拥有", "属性"]
+ENTITY_TYPES = ["CON", "ARI"]
+
+
+def build_synthetic_graph(kg_query: KnowledgeGraphQuery, node_count: int, rel_count: int,
+                          batch_size: int = 5000, seed: int = 42):
+    """
+    写入合成图谱（节点带 Entity 和 Synthetic 标签）
+
+    Args:
+        kg_query: 知识图谱查询器
+        node_count: 节点数
+        rel_count: 关系数
+        batch_size: 每批写入条数
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    graph = kg_query.graph
+
+    for start in range(0, node_count, batch_size):
+        rows = [
+            {'name': f"{SYNTHETIC_PREFIX}{i}", 'type': rng.choice(ENTITY_TYPES)}
+            for i in range(start, min(start + batch_size, node_count))
+        ]
+        graph.run(f"""
+        UNWIND $rows AS row
+        CREATE (n:Entity:{SYNTHETIC_LABEL} {{name: row.name, type: row.type}})
+        """, rows=rows)
+
+    # 按关系类型分组写入，关系类型不能参数化
+    rels_by_type: Dict[str, List[Dict[str, Any]]] = {}
+    for _ in range(rel_count):
+        # 幂律分布的头实体，模拟"树"、"图"这类枢纽概念
+        head = int(node_count * rng.random() ** 3)
+        tail = rng.randrange(node_count)
+        if head == tail:
+            continue
+        rel_type = rng.choice(RELATION_TYPES)
+        rels_by_type.setdefault(rel_type, []).append({
+            'head': f"{SYNTHETIC_PREFIX}{head}",
+            'tail': f"{SYNTHETIC_PREFIX}{tail}",
+            'confidence': round(rng.uniform(0.5, 1.0), 4),
+            'sentence': f"{SYNTHETIC_PREFIX}{head}{rel_type}{SYNTHETIC_PREFIX}{tail}"
+        })
+
+    for rel_type, rels in rels_by_type.items():
+        for start in range(0, len(rels), batch_size):
+            graph.run(f"""
+            UNWIND $rows AS row
+            MATCH (h:{SYNTHETIC_LABEL} {{name: row.head}}), (t:{SYNTHETIC_LABEL} {{name: row.tail}})
+            CREATE (h)-[:`{rel_type}` {{confidence: row.confidence, source_sentence: row.sentence}}]->(t)
+            """, rows=rels[start:start + batch_size])
+
+
+def drop_synthetic_graph(kg_query: KnowledgeGraphQuery):
+    """删除合成图谱"""
+    kg_query.graph.run(f"MATCH (n:{SYNTHETIC_LABEL}) DETACH DELETE n")
+
+
+def default_cases(sample: List[str]) -> List[Tuple[str, Callable[[KnowledgeGraphQuery], Any]]]:
+    """查询层的代表性调用，用于收集各个查询模板"""
+    a, b, c = sample[0], sample[1], sample[2]
+    return [
+        ('find_entity_relations', lambda kg: kg.find_entity_relations(a)),
+        ('find_entities_by_relation', lambda kg: kg.find_entities_by_relation([a, b], '包含')),
+        ('find_relation_by_entities', lambda kg: kg.find_relation_by_entities([a, b])),
+        ('find_relation_by_entities_directed',
+         lambda kg: kg.find_relation_by_entities([a, b], bidirectional=False, include_indirect=False)),
+        ('find_neighborhood', lambda kg: kg.find_neighborhood([a, b, c])),
+        ('find_entity_relations_many', lambda kg: kg.find_entity_relations_many([a, b, c])),
+        ('find_relations_between_many', lambda kg: kg.find_relations_between_many([a, b, c])),
+        ('get_entities_containing', lambda kg: kg.get_entities_containing(a)),
+        ('graph_export', lambda kg: (list(GraphExporter(kg).iter_nodes(page_size=100)),
+                                     list(GraphExporter(kg).iter_relationships(page_size=100)))),
+    ]
+
+
+def collect_templates(kg_query: KnowledgeGraphQuery,
+                      cases: List[Tuple[str, Callable[[KnowledgeGraphQuery], Any]]]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """运行调用用例并记录实际执行的查询模板（每个模板保留第一次出现的参数）"""
+    kg_query.query_recorder = []
+    kg_query.cache_ttl = 0  # 关闭缓存，确保每个模板都真正执行
+    try:
+        for _, case in cases:
+            case(kg_query)
+        templates: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for template, query, params in kg_query.query_recorder:
+            templates.setdefault(template, (query, params))
+        return templates
+    finally:
+        kg_query.query_recorder = None
+
+
+def profile_templates(kg_query: KnowledgeGraphQuery,
+                      templates: Dict[str, Tuple[str, Dict[str, Any]]],
+                      repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    以 PROFILE 运行每个模板，返回对比表的行
+
+    Returns:
+        List[Dict]: 每行含 template、rows、db_hits、time_ms、operators
+    """
+    report = []
+    for template, (query, params) in sorted(templates.items()):
+        timings = []
+        plan_summary = {}
+        row_count = 0
+        for _ in range(repeat):
+            start_time = time.time()
+            cursor = kg_query.graph.run("PROFILE " + query, **params)
+            row_count = len(cursor.data())
+            timings.append((time.time() - start_time) * 1000)
+            plan_summary = kg_query.summarize_plan(cursor.plan())
+        report.append({
+            'template': template,
+            'rows': row_count,
+            'db_hits': plan_summary.get('db_hits'),
+            'time_ms': round(statistics.median(timings), 2),
+            'operators': plan_summary.get('operators', [])
+        })
+    return report
+
+
+def relation_benchmark(kg_query: KnowledgeGraphQuery, entities: List[str],
+                       repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    对比按关系查询的两种写法：字符串匹配 type(r) CONTAINS 与类型化模式 -[r:包含|被包含]-
+
+    Returns:
+        List[Dict]: 每个关系类型一行，含两种写法的 db hits、耗时和返回行数
+    """
+    contains_query = """
+    MATCH (n)-[r]-(m)
+    WHERE (n.name IN $entities OR m.name IN $entities)
+    AND (type(r) CONTAINS $relation OR r.name CONTAINS $relation)
+    RETURN DISTINCT n.name AS entity1, type(r) AS relation_type, m.name AS entity2
+    """
+    typed_query = """
+    MATCH (n:Entity)-[r{pattern}]-(m:Entity)
+    WHERE n.name IN $entities
+    RETURN DISTINCT startNode(r).name AS entity1, type(r) AS relation_type, endNode(r).name AS entity2
+    """
+    resolver = kg_query.relation_resolver
+    report = []
+    for relation in RELATION_TYPES:
+        pattern = resolver.type_pattern(resolver.resolve(relation))
+        row = {'relation': relation}
+        for name, query, params in (
+            ('contains', contains_query, {'entities': entities, 'relation': relation}),
+            ('typed', typed_query.format(pattern=pattern), {'entities': entities}),
+        ):
+            templates = {name: (query, params)}
+            result = profile_templates(kg_query, templates, repeat)[0]
+            row[f'{name}_db_hits'] = result['db_hits']
+            row[f'{name}_time_ms'] = result['time_ms']
+            row[f'{name}_rows'] = result['rows']
+        report.append(row)
+    return report
+
+
+def format_relation_benchmark(report: List[Dict[str, Any]]) -> str:
+    """格式化关系查询对比表"""
+    header = (f"{'relation':<10}{'contains_hits':>15}{'typed_hits':>12}{'saving':>9}"
+              f"{'contains_ms':>13}{'typed_ms':>10}")
+    lines = [header, '-' * len(header)]
+    for row in report:
+        old, new = row['contains_db_hits'], row['typed_db_hits']
+        saving = f"{1 - new / old:.0%}" if old and new is not None else '-'
+        lines.append(f"{row['relation']:<10}{str(old):>15}{str(new):>12}{saving:>9}"
+                     f"{row['contains_time_ms']:>13.2f}{row['typed_time_ms']:>10.2f}")
+    return '\n'.join(lines)
+
+
+def format_table(report: List[Dict[str, Any]], baseline: Optional[List[Dict[str, Any]]] = None) -> str:
+    """格式化对比表；提供基线时附加 db hits 和耗时的变化"""
+    base = {row['template']: row for row in (baseline or [])}
+    header = f"{'template':<32}{'rows':>8}{'db_hits':>12}{'time_ms':>10}"
+    if base:
+        header += f"{'Δdb_hits':>12}{'Δtime_ms':>10}"
+    lines = [header, '-' * len(header)]
+    for row in report:
+        line = f"{row['template']:<32}{row['rows']:>8}{str(row['db_hits']):>12}{row['time_ms']:>10.2f}"
+        if base:
+            old = base.get(row['template'])
+            if old and old.get('db_hits') is not None and row['db_hits'] is not None:
+                line += f"{row['db_hits'] - old['db_hits']:>+12}{row['time_ms'] - old['time_ms']:>+10.2f}"
+            else:
+                line += f"{'-':>12}{'-':>10}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cypher查询模板性能分析")
+    parser.add_argument('--nodes', type=int, default=2000, help='合成图谱节点数')
+    parser.add_argument('--rels', type=int, default=10000, help='合成图谱关系数')
+    parser.add_argument('--repeat', type=int, default=3, help='每个模板重复次数（取中位数）')
+    parser.add_argument('--output', help='将结果写入JSON文件')
+    parser.add_argument('--compare', help='与之前保存的JSON结果对比')
+    parser.add_argument('--keep', action='store_true', help='分析结束后保留合成图谱')
+    parser.add_argument('--relation-benchmark', action='store_true',
+                        help='只对比按关系查询的字符串匹配与类型化模式')
+    args = parser.parse_args()
+
+    db_config = get_config_manager().get_database_config()
+    kg_query = KnowledgeGraphQuery(db_config['uri'], db_config['user_name'], db_config['password'])
+
+    print(f"🔄 写入合成图谱: {args.nodes} 个节点, {args.rels} 个关系")
+    build_synthetic_graph(kg_query, args.nodes, args.rels)
+    try:
+        sample = [f"{SYNTHETIC_PREFIX}{i}" for i in range(3)]
+        if args.relation_benchmark:
+            print(format_relation_benchmark(relation_benchmark(kg_query, sample[:2], args.repeat)))
+            return
+        templates = collect_templates(kg_query, default_cases(sample))
+        report = profile_templates(kg_query, templates, args.repeat)
+    finally:
+        if not args.keep:
+            drop_synthetic_graph(kg_query)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['report']
+    print(format_table(report, baseline))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'nodes': args.nodes, 'rels': args.rels, 'report': report}, f, ensure_ascii=False, indent=2)
+        print(f"✅ 结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
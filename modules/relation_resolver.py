@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+关系解析模块
+把问题中的关系短语（同义词、英文编码或中文类型）解析为图谱中精确的关系类型，
+使查询可以使用 -[r:包含|被包含]- 这样的类型化模式，而不是逐条比较 type(r) 字符串
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional
+
+try:
+    from intent_recognition.knowledge_base import KNOWLEDGE_BASE, RELATION_CODES, INVERSE_RELATIONS
+except ImportError:
+    import os
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from intent_recognition.knowledge_base import KNOWLEDGE_BASE, RELATION_CODES, INVERSE_RELATIONS
+
+
+class RelationResolver:
+    """关系短语解析器"""
+
+    def __init__(self, relations_kb: Optional[Dict[str, List[str]]] = None,
+                 relation_codes: Optional[Dict[str, str]] = None,
+                 inverse_relations: Optional[Dict[str, str]] = None):
+        """
+        初始化关系解析器
+
+        Args:
+            relations_kb: 关系类型 -> 同义词列表，默认取 KNOWLEDGE_BASE['relations']
+            relation_codes: 英文编码 -> 关系类型，默认取 RELATION_CODES
+            inverse_relations: 关系类型 -> 互逆关系类型
+        """
+        relations_kb = KNOWLEDGE_BASE.get('relations', {}) if relations_kb is None else relations_kb
+        relation_codes = RELATION_CODES if relation_codes is None else relation_codes
+        self.inverse_relations = INVERSE_RELATIONS if inverse_relations is None else inverse_relations
+
+        # "无" 表示没有关系，不是可查询的类型
+        self.relation_types = {
+            rel for rel in list(relations_kb.keys()) + list(relation_codes.values()) if rel != '无'
+        }
+
+        # 短语 -> 关系类型，精确匹配
+        self.phrase_map: Dict[str, str] = {}
+        for code, rel_type in relation_codes.items():
+            if rel_type in self.relation_types:
+                self.phrase_map[code] = rel_type
+        for rel_type in self.relation_types:
+            self.phrase_map[rel_type] = rel_type
+
+        # 同义词子串匹配：模板中的 "..." 拆成多个必须依次出现的片段
+        self.synonym_patterns = []
+        for rel_type, synonyms in relations_kb.items():
+            if rel_type not in self.relation_types:
+                continue
+            for synonym in synonyms:
+                parts = [part for part in synonym.split('...') if part]
+                if not parts:
+                    continue
+                if len(parts) == 1:
+                    self.phrase_map.setdefault(parts[0], rel_type)
+                pattern = re.compile('.*?'.join(re.escape(part) for part in parts))
+                self.synonym_patterns.append((len(''.join(parts)), pattern, rel_type))
+        # 更长的同义词优先，避免 "依赖" 抢先匹配 "被依赖"
+        self.synonym_patterns.sort(key=lambda item: item[0], reverse=True)
+
+    def resolve(self, phrase: str, include_inverse: bool = True) -> List[str]:
+        """
+        解析关系短语
+
+        Args:
+            phrase: 关系短语
+            include_inverse: 是否同时返回互逆关系（用于无向匹配）
+
+        Returns:
+            List[str]: 精确的关系类型列表，无法解析时为空
+        """
+        if not phrase or not isinstance(phrase, str):
+            return []
+        phrase = phrase.strip()
+
+        rel_type = self.phrase_map.get(phrase)
+        if rel_type is None:
+            for _, pattern, candidate in self.synonym_patterns:
+                if pattern.search(phrase):
+                    rel_type = candidate
+                    break
+        if rel_type is None:
+            logging.info(f"无法解析关系短语: {phrase}")
+            return []
+
+        types = [rel_type]
+        inverse = self.inverse_relations.get(rel_type)
+        if include_inverse and inverse and inverse != rel_type and inverse in self.relation_types:
+            types.append(inverse)
+        return types
+
+    def type_pattern(self, relation_types: List[str]) -> str:
+        """
+        生成Cypher关系类型模式，如 :`包含`|`被包含`
+
+        关系类型不能参数化，因此只接受白名单中的类型
+
+        Raises:
+            ValueError: 存在未知的关系类型
+        """
+        unknown = [rel for rel in relation_types if rel not in self.relation_types]
+        if unknown or not relation_types:
+            raise ValueError(f"未知的关系类型: {unknown}")
+        return ':' + '|'.join(f"`{rel}`" for rel in relation_types)
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+溯源句检索模块
+对关系的 source_sentence 建立 jieba 分词的 BM25 倒排索引（文档号差分 + varint 压缩的倒排表），
+可选附加稠密向量索引；图谱构建时增量写入，服务时内存映射加载，
+使没有链接到实体的问题也能检索到有依据的证据句供大模型使用
+
+文件布局（prefix 为路径前缀）:
+    prefix.postings.bin   所有词项的压缩倒排表，依次存放
+    prefix.terms.json     {"terms": {词项: [偏移, 字节数, 文档频率]}, "doc_count", "avg_length", "graph_version"}
+    prefix.doclen.npy     每个文档的词数（int32）
+    prefix.docs.json      每个文档的句子及其支撑的关系三元组
+    prefix.dense.npy/.ids.json   可选的稠密向量索引（EmbeddingIndex，ID 为文档号）
+
+用法:
+    python -m modules.sentence_index query --index data/sentence_index 为什么要用栈
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import jieba
+import numpy as np
+
+# 索引的全部文件（terms.json 放最后：服务端按它的修改时间判断是否重新加载）
+INDEX_SUFFIXES = ('.postings.bin', '.docs.json', '.doclen.npy', '.dense.npy', '.dense.ids.json', '.terms.json')
+
+# 只由标点和空白组成的词项不入索引
+_SKIP_TOKEN = re.compile(r'^[\W_]+$')
+
+
+def tokenize(text: str) -> List[str]:
+    """搜索引擎模式分词，英文统一小写"""
+    return [token.lower() for token in jieba.lcut_for_search(text or '') if not _SKIP_TOKEN.match(token)]
+
+
+def encode_varints(values: List[int]) -> bytes:
+    """无符号整数序列的 varint 编码（每字节 7 位，最高位为续位标志）"""
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varints(buffer, offset: int, length: int) -> List[int]:
+    """解码 buffer[offset:offset+length] 中的 varint 序列"""
+    values = []
+    value = shift = 0
+    for byte in buffer[offset:offset + length]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def _atomic_write(path: str, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SentenceIndexBuilder:
+    """倒排索引构建器
+
+    图谱构建时对每条创建的关系调用 add；同一句子只建一次文档，句子支撑的三元组附在文档上。
+    from_index 可以在已有索引上继续追加（增量构建）。
+    """
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self.doc_ids: Dict[str, int] = {}
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, sentence: str, source: str, relation: str, target: str, confidence: float = None):
+        """添加一条关系的溯源句"""
+        if not isinstance(sentence, str) or not sentence.strip():
+            return
+        sentence = sentence.strip()
+        triple = [source, relation, target, None if confidence is None else float(confidence)]
+
+        doc_id = self.doc_ids.get(sentence)
+        if doc_id is not None:
+            if triple not in self.docs[doc_id]['triples']:
+                self.docs[doc_id]['triples'].append(triple)
+            return
+
+        doc_id = len(self.docs)
+        self.doc_ids[sentence] = doc_id
+        self.docs.append({'sentence': sentence, 'triples': [triple]})
+        tokens = tokenize(sentence)
+        self.doc_lengths.append(len(tokens))
+        for token in tokens:
+            term_postings = self.postings.setdefault(token, {})
+            term_postings[doc_id] = term_postings.get(doc_id, 0) + 1
+
+    @classmethod
+    def from_index(cls, prefix: str) -> 'SentenceIndexBuilder':
+        """读取已有索引以便继续追加"""
+        builder = cls()
+        index = SentenceIndex.load(prefix)
+        try:
+            builder.docs = index.docs
+            builder.doc_ids = {doc['sentence']: i for i, doc in enumerate(index.docs)}
+            builder.doc_lengths = [int(n) for n in index.doc_lengths]
+            for term in index.terms:
+                docs, tfs = index.postings(term)
+                builder.postings[term] = dict(zip(docs.tolist(), tfs.tolist()))
+        finally:
+            index.close()
+        return builder
+
+    def save(self, prefix: str, graph_version: Any = None):
+        """写出索引文件（每个文件先写临时文件再替换）"""
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+
+        blob = bytearray()
+        terms = {}
+        for term in sorted(self.postings):
+            term_postings = self.postings[term]
+            docs = sorted(term_postings)
+            deltas = [docs[0]] + [b - a for a, b in zip(docs, docs[1:])]
+            encoded = encode_varints(deltas) + encode_varints([term_postings[d] for d in docs])
+            terms[term] = [len(blob), len(encoded), len(docs)]
+            blob += encoded
+
+        _atomic_write(prefix + '.postings.bin', bytes(blob))
+        _atomic_write(prefix + '.docs.json', json.dumps(self.docs, ensure_ascii=False).encode('utf-8'))
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(prefix)), suffix='.npy',
+                                         delete=False) as f:
+            np.save(f, np.asarray(self.doc_lengths, dtype=np.int32))
+        os.replace(f.name, prefix + '.doclen.npy')
+        meta = {
+            'terms': terms,
+            'doc_count': len(self.docs),
+            'avg_length': float(np.mean(self.doc_lengths)) if self.doc_lengths else 0.0,
+            'graph_version': graph_version,
+        }
+        _atomic_write(prefix + '.terms.json', json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        logging.info(f"溯源句索引已保存: {len(self.docs)} 个句子, {len(terms)} 个词项, 倒排表 {len(blob)} 字节")
+
+
+class SentenceIndex:
+    """BM25 检索（倒排表与文档长度内存映射），可选稠密向量混合检索"""
+
+    K1 = 1.5
+    B = 0.75
+    RRF_K = 60  # 混合检索时的倒数排名融合常数
+
+    def __init__(self, prefix: str):
+        with open(prefix + '.terms.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(prefix + '.docs.json', 'r', encoding='utf-8') as f:
+            self.docs: List[Dict[str, Any]] = json.load(f)
+
+        self.terms: Dict[str, List[int]] = meta['terms']
+        self.doc_count = meta['doc_count']
+        self.avg_length = meta['avg_length'] or 1.0
+        self.graph_version = meta.get('graph_version')
+        self.doc_lengths = np.load(prefix + '.doclen.npy', mmap_mode='r')
+
+        self._file = open(prefix + '.postings.bin', 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._postings = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        self.dense = None
+        if os.path.exists(prefix + '.dense.npy'):
+            from .embedding_index import EmbeddingIndex
+            self.dense = EmbeddingIndex.load(prefix + '.dense')
+
+    @classmethod
+    def load(cls, prefix: str) -> 'SentenceIndex':
+        return cls(prefix)
+
+    def close(self):
+        if isinstance(self._postings, mmap.mmap):
+            self._postings.close()
+        self._file.close()
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """解码词项的倒排表，返回 (文档号数组, 词频数组)"""
+        entry = self.terms.get(term)
+        if entry is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        offset, length, df = entry
+        values = decode_varints(self._postings, offset, length)
+        docs = np.cumsum(np.asarray(values[:df], dtype=np.int64))
+        return docs, np.asarray(values[df:], dtype=np.int64)
+
+    def bm25(self, question: str, k: int) -> List[Tuple[int, float]]:
+        """BM25 打分，返回 (文档号, 分数)"""
+        if not self.doc_count:
+            return []
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for term in set(tokenize(question)):
+            docs, tfs = self.postings(term)
+            if not len(docs):
+                continue
+            idf = np.log(1 + (self.doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += idf * tfs * (self.K1 + 1) / (tfs + norm)
+
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(doc), float(scores[doc])) for doc in top]
+
+    def search(self, question: str, k: int = 5, query_vector: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        检索证据句
+
+        Args:
+            question: 问题文本
+            k: 返回数量
+            query_vector: 问题的稠密向量；提供且存在稠密索引时与 BM25 做倒数排名融合
+
+        Returns:
+            List[Dict]: 每项含 sentence、score、triples（[source, relation, target, confidence]）
+        """
+        ranked = self.bm25(question, k * 4 if query_vector is not None else k)
+        if query_vector is not None and self.dense is not None:
+            fused: Dict[int, float] = {}
+            for rank, (doc, _) in enumerate(ranked):
+                fused[doc] = fused.get(doc, 0.0) + 1.0 / (self.RRF_K + rank + 1)
+            for rank, (doc, _) in enumerate(self.dense.search(query_vector, k * 4)[0]):
+                fused[int(doc)] = fused.get(int(doc), 0.0) + 1.0 / (self.RRF_K + rank + 1)
+            ranked = sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+        return [dict(self.docs[doc], score=round(score, 4)) for doc, score in ranked[:k]]
+
+
+def build_dense(prefix: str, encoder, batch_size: int = 64):
+    """为已有的 BM25 索引附加稠密向量索引（encoder 为 embedding_index.TextEncoder）"""
+    from .embedding_index import EmbeddingIndex
+
+    with open(prefix + '.docs.json', 'r', encoding='utf-8') as f:
+        docs = json.load(f)
+    vectors = encoder.encode([doc['sentence'] for doc in docs], batch_size)
+    EmbeddingIndex(vectors.astype(np.float16), [str(i) for i in range(len(docs))]).save(prefix + '.dense')
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from modules.config_manager import get_config_manager
+
+    config = get_config_manager()
+    parser = argparse.ArgumentParser(description="溯源句检索索引")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    query_parser = subparsers.add_parser('query', help='检索证据句')
+    query_parser.add_argument('text')
+    query_parser.add_argument('--index', default=config.get('retrieval.sentence_index_path'))
+    query_parser.add_argument('-k', type=int, default=5)
+
+    dense_parser = subparsers.add_parser('dense', help='为已有索引构建稠密向量部分')
+    dense_parser.add_argument('--index', default=config.get('retrieval.sentence_index_path'))
+    dense_parser.add_argument('--model', default=config.get('embedding.model_path'))
+    args = parser.parse_args()
+
+    if args.command == 'query':
+        index = SentenceIndex.load(args.index)
+        for hit in index.search(args.text, args.k):
+            print(f"{hit['score']:.4f}  {hit['sentence']}")
+    else:
+        from modules.embedding_index import TextEncoder
+        build_dense(args.index, TextEncoder(args.model))
+        print(f"✅ 稠密向量索引已保存到 {args.index}.dense.npy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+流式图谱数据导入模块
+按块解析 iteration_version_N.json（JSONL），逐块标准化、过滤后交给批量写入器，
+内存中只保留滚动去重索引（每个 (实体对, 关系) 当前最优的一条），不再把整个语料读成 DataFrame。
+
+去重规则与 Neo4jKnowledgeGraph.deduplicate_relationships 一致：同一无序实体对的同一关系只保留
+置信度最高的一条，置信度相同保留 relation_key（头|尾|关系）较小的，再相同保留先出现的；
+后到的更优记录会覆盖先写入的关系（方向相反时先删除旧关系）。
+"""
+
+import itertools
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import ujson as json_parser
+except ImportError:  # ujson 不可用时退回标准库
+    import json as json_parser
+
+CHUNK_LINES = 2000
+
+COLUMNS = ['sentence', 'head', 'tail', 'relation', 'confidence']
+
+
+def iter_line_chunks(path: str, chunk_lines: int = CHUNK_LINES) -> Iterator[Tuple[int, List[str]]]:
+    """按块读取原始行，产出 (块首行号, 行列表)，解析可以交给其他进程"""
+    with open(path, 'r', encoding='utf-8') as f:
+        line_num = 1
+        while True:
+            lines = list(itertools.islice(f, chunk_lines))
+            if not lines:
+                break
+            yield line_num, lines
+            line_num += len(lines)
+
+
+def parse_jsonl_lines(lines: List[str], first_line: int = 1,
+                      errors: Optional[List[Tuple[int, str]]] = None) -> pd.DataFrame:
+    """
+    解析一块 JSONL 行，展开为一行一个关系提及的 DataFrame
+
+    Args:
+        lines: 原始行
+        first_line: 第一行的行号（用于错误信息）
+        errors: 传入列表时收集解析失败的 (行号, 错误)
+
+    Returns:
+        pd.DataFrame: 列为 sentence、head、tail、relation、confidence
+    """
+    columns = {name: [] for name in COLUMNS}
+    for line_num, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            data = json_parser.loads(line)
+        except ValueError as e:
+            if errors is not None:
+                errors.append((line_num, str(e)))
+            continue
+        sentence = data.get('sentText', '')
+        for relation in data.get('relationMentions', []):
+            columns['sentence'].append(sentence)
+            columns['head'].append(relation.get('em1Text', ''))
+            columns['tail'].append(relation.get('em2Text', ''))
+            columns['relation'].append(relation.get('label', ''))
+            columns['confidence'].append(relation.get('confidence', 1.0))
+    return pd.DataFrame(columns)
+
+
+def iter_jsonl_chunks(path: str, chunk_lines: int = CHUNK_LINES,
+                      errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[pd.DataFrame]:
+    """按块读取并解析 JSONL（参数同 parse_jsonl_lines）"""
+    for first_line, lines in iter_line_chunks(path, chunk_lines):
+        yield parse_jsonl_lines(lines, first_line, errors)
+
+
+def prepare_chunk(df: pd.DataFrame, normalizer) -> pd.DataFrame:
+    """标准化实体并过滤无效关系（与 load_json_data、deduplicate_relationships 的规则一致）"""
+    df = df.copy()
+    df['head_clean'] = normalizer.normalize_series(df['head'])
+    df['tail_clean'] = normalizer.normalize_series(df['tail'])
+    df['confidence'] = pd.to_numeric(df['confidence'], errors='coerce')
+    # CSV 中空白的关系单元格读成 NaN，与 'none' 一样不是有效关系
+    return df[df['relation'].notna() & (df['relation'] != '') & (df['relation'] != 'none') &
+              df['head_clean'].notna() & df['tail_clean'].notna()]
+
+
+class Candidate(NamedTuple):
+    confidence: float
+    relation_key: str
+    head: str
+    tail: str
+    relation: str
+    sentence: str
+
+
+class RollingDeduplicator:
+    """滚动去重索引：(较小实体, 较大实体, 关系) -> 当前最优的一条"""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.best: Dict[Tuple[str, str, str], Candidate] = {}
+        # 组内出现过的方向（位 1：较小实体在前，位 2：较大实体在前），决定最终输出顺序
+        self.directions: Dict[Tuple[str, str, str], int] = {}
+        self.rows_seen = 0
+
+    def __len__(self):
+        return len(self.best)
+
+    @staticmethod
+    def _wins(new: Candidate, old: Optional[Candidate]) -> bool:
+        if old is None:
+            return True
+        return new.confidence > old.confidence or (
+            new.confidence == old.confidence and new.relation_key < old.relation_key)
+
+    def update(self, df: pd.DataFrame) -> Dict[str, List[Candidate]]:
+        """
+        用一块（已标准化的）数据更新索引
+
+        Returns:
+            Dict: upserts（本块之后需要写入的最优记录）、
+                  deletes（方向被反转、需要从图中删除的旧记录）
+        """
+        self.rows_seen += len(df)
+        previous: Dict[Tuple[str, str, str], Optional[Candidate]] = {}
+        for head, tail, relation, confidence, sentence in zip(
+                df['head_clean'], df['tail_clean'], df['relation'], df['confidence'], df['sentence']):
+            if not (confidence >= self.threshold) or head == tail or pd.isna(relation) or relation in ('', 'none'):
+                continue
+            group = (head, tail, relation) if head < tail else (tail, head, relation)
+            self.directions[group] = self.directions.get(group, 0) | (1 if head < tail else 2)
+            candidate = Candidate(float(confidence), f"{head}|{tail}|{relation}", head, tail, relation, sentence)
+            old = self.best.get(group)
+            if self._wins(candidate, old):
+                if group not in previous:
+                    previous[group] = old
+                self.best[group] = candidate
+
+        upserts, deletes = [], []
+        for group, old in previous.items():
+            new = self.best[group]
+            if old is not None and (old.head, old.tail) != (new.head, new.tail):
+                deletes.append(old)
+            if old is None or old != new:
+                upserts.append(new)
+        return {'upserts': upserts, 'deletes': deletes}
+
+    def ordered(self) -> List[Candidate]:
+        """最终结果，按组内出现过的最小 relation_key 排序（与批量去重的输出顺序一致）"""
+        def sort_key(group):
+            low, high, relation = group
+            keys = []
+            if self.directions[group] & 1:
+                keys.append(f"{low}|{high}|{relation}")
+            if self.directions[group] & 2:
+                keys.append(f"{high}|{low}|{relation}")
+            return min(keys)
+        return [self.best[group] for group in sorted(self.best, key=sort_key)]
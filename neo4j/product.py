@@ -1,12 +1,35 @@
 from py2neo import Graph, Node, Relationship
 import os
+import sys
 import pandas as pd
-import re
+import numpy as np
 import json
+import time
+import argparse
+import tempfile
+import contextlib
 from tqdm import tqdm
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from intent_recognition.knowledge_base import RELATION_CODES
+from modules.sentence_index import SentenceIndexBuilder, INDEX_SUFFIXES
+from modules.graph_stats import GraphStatistics
+from modules.graph_centrality import run_centrality_job
+from modules.bulk_loader import BulkLoader
+from modules.admin_import import write_import_files, import_command
+from modules.graph_manifest import GraphManifest
+from modules.entity_normalizer import EntityNormalizer
+from modules.stream_ingest import CHUNK_LINES
+from modules.build_pipeline import GraphBuildPipeline
+from modules.build_checkpoint import BuildCheckpoint, file_hash
+from modules.graph_versions import (ACTIVE, STAGING, LABELS, META_KEYS, clear_namespace, promote, rollback,
+                                    list_versions, keep_previous_files, swap_previous_files)
+from modules.build_report import BuildReport, Phase, format_report, write_synthetic_predictions
+
 class Neo4jKnowledgeGraph:
-    def __init__(self, uri="bolt://localhost:7687", user="neo4j", password="123456",confidence=0.82):
+    def __init__(self, uri="bolt://localhost:7687", user="neo4j", password="123456",confidence=0.82,
+                 sentence_index_path=None, batch_size=BulkLoader.BATCH_SIZE, writers=BulkLoader.WRITERS,
+                 connect=True, manifest_path=None, checkpoint_path=None, report_path=None):
         self.confidence=confidence
         """初始化Neo4j图数据库连接
         
@@ -14,22 +37,50 @@ class Neo4jKnowledgeGraph:
             uri (str): Neo4j数据库URI
             user (str): 用户名
             password (str): 密码
+            sentence_index_path (str): 溯源句检索索引的路径前缀
+            batch_size (int): 批量写入时每个事务的行数
+            writers (int): 并行写入关系的会话数
+            connect (bool): 是否连接数据库（只生成离线导入文件时不需要）
+            manifest_path (str): 三元组清单路径，增量构建时据此比对变化
+            checkpoint_path (str): 构建检查点路径，中断后据此续跑
+            report_path (str): 构建报告（JSON）路径
         """
+        self.batch_size = batch_size
+        self.writers = writers
         # 获取当前文件所在目录
         cur_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_path = os.path.join(cur_dir, "data")
+        self.sentence_index_path = sentence_index_path or os.getenv(
+            "SENTENCE_INDEX_PATH", os.path.join(os.path.dirname(cur_dir), "data", "sentence_index"))
+        self.sentence_index = SentenceIndexBuilder()
+        self.manifest = GraphManifest()
+        self.checkpoint_path = checkpoint_path or os.getenv(
+            "BUILD_CHECKPOINT_PATH", os.path.join(os.path.dirname(cur_dir), "data", "build_checkpoint.json"))
+        self.checkpoint = None
+        # 进行中的构建报告（build_knowledge_graph 期间）
+        self.report = None
+        self.report_path = report_path or os.getenv(
+            "BUILD_REPORT_PATH", os.path.join(os.path.dirname(cur_dir), "data", "build_report.json"))
+        # 写入的图谱命名空间：全量构建期间为预备版本，切换后查询才能看到
+        self.namespace = ACTIVE
+        # 实体标准化词典（与 relation_extend 共用，跨构建复用）
+        self.normalizer = EntityNormalizer()
+        self.manifest_path = manifest_path or os.getenv(
+            "GRAPH_MANIFEST_PATH", os.path.join(os.path.dirname(cur_dir), "data", "graph_manifest.json"))
         
         # Neo4j连接配置
-        try:
-            #从环境变量获取连接信息
-            password = os.getenv("NEO4J_KEY", password)
-            self.graph = Graph(uri, auth=(user, password))
-            # 测试连接
-            self.graph.run("RETURN 1")
-            print("✅ Neo4j图数据库连接成功")
-        except Exception as e:
-            print(f"❌ Neo4j连接失败: {e}")
-            raise e
+        self.graph = None
+        if connect:
+            try:
+                #从环境变量获取连接信息
+                password = os.getenv("NEO4J_KEY", password)
+                self.graph = Graph(uri, auth=(user, password))
+                # 测试连接
+                self.graph.run("RETURN 1")
+                print("✅ Neo4j图数据库连接成功")
+            except Exception as e:
+                print(f"❌ Neo4j连接失败: {e}")
+                raise e
         
         # 加载实体类型映射表
         vocab_path = "/root/KG/DeepKE/example/ner/prepare-data/vocab_dict.csv"
@@ -39,17 +90,19 @@ class Neo4jKnowledgeGraph:
             print(f"⚠️ 词汇表文件不存在: {vocab_path}，使用默认实体类型")
             self.entity_type_map = {}
 
-        self.relation_dict={
-            "rely":"依赖",
-            "b-rely":"被依赖",
-            "belg":"包含",
-            "b-belg":"被包含",
-            "syno":"同义",
-            "relative":"相对",
-            "attr":"拥有",
-            "b-attr":"属性",
-            "none":"无"
-        }
+        # 英文关系编码 -> 中文关系类型（与查询层的关系解析共用）
+        self.relation_dict = dict(RELATION_CODES)
+
+    @property
+    def label(self):
+        """当前写入的实体标签"""
+        return LABELS[self.namespace]
+
+    def phase(self, name):
+        """构建报告中的一个（子）阶段；没有进行中的构建报告时不记录"""
+        if self.report is None:
+            return contextlib.nullcontext(Phase(name))
+        return self.report.phase(name)
 
     def clean_database(self):
         """彻底清理数据库：删除所有节点、关系和标签定义"""
@@ -81,32 +134,8 @@ class Neo4jKnowledgeGraph:
         return entity_type_map
 
     def normalize_entity(self, entity):
-        """标准化实体名称，提取核心术语"""
-        # 检查输入是否为空或None
-        if not entity or not str(entity).strip():
-            return None
-            
-        # 移除描述性文本和特殊字符
-        patterns = [
-            r'是[\u4e00-\u9fa5]+的[\u4e00-\u9fa5]+',
-            r'指[\u4e00-\u9fa5]+',
-            r'通过[\u4e00-\u9fa5]+',
-            r'利用[\u4e00-\u9fa5]+',
-            r'从[\u4e00-\u9fa5]+'
-        ]
-        
-        for pattern in patterns:
-            entity = re.sub(pattern, '', entity)
-        
-        # 移除特殊字符和多余空格
-        entity = re.sub(r'[^\w\u4e00-\u9fa5]+', ' ', entity).strip()
-        entity = re.sub(r'\s+', ' ', entity)
-        
-        # 如果处理后为空字符串，返回None
-        if not entity or len(entity.strip()) == 0:
-            return None
-            
-        return entity
+        """标准化实体名称，提取核心术语（查持久化词典，未命中时计算）"""
+        return self.normalizer.normalize(entity)
 
     def get_entity_type(self, entity):
         """根据实体名称获取类型"""
@@ -124,9 +153,11 @@ class Neo4jKnowledgeGraph:
         file_path = os.path.join(self.data_path, "predictions.csv")
         df = pd.read_csv(file_path)
         
-        # 实体标准化
-        df['head_clean'] = df['head'].apply(self.normalize_entity)
-        df['tail_clean'] = df['tail'].apply(self.normalize_entity)
+        # 实体标准化（按唯一值批量计算）
+        with self.phase('normalize') as phase:
+            df['head_clean'] = self.normalizer.normalize_series(df['head'])
+            df['tail_clean'] = self.normalizer.normalize_series(df['tail'])
+            phase.rows = len(df)
         
         # 过滤无效关系：移除none关系和包含空实体的记录
         df_filtered = df[
@@ -143,6 +174,8 @@ class Neo4jKnowledgeGraph:
     def load_json_data(self, json_file_path):
         """加载并处理JSON格式的知识图谱数据"""
         relations_data = []
+        normalize_seconds = 0.0
+        mentions = 0
         
         print(f"🔄 正在加载JSON文件: {json_file_path}")
         
@@ -157,9 +190,12 @@ class Neo4jKnowledgeGraph:
                         tail_entity = relation.get('em2Text', '')
                         relation_type = relation.get('label', '')
                         
-                        # 实体标准化
+                        # 实体标准化（与解析交错进行，单独累计耗时）
+                        start = time.perf_counter()
                         head_clean = self.normalize_entity(head_entity)
                         tail_clean = self.normalize_entity(tail_entity)
+                        normalize_seconds += time.perf_counter() - start
+                        mentions += 1
                         
                         # 过滤无效关系
                         if (relation_type != 'none' and 
@@ -186,6 +222,8 @@ class Neo4jKnowledgeGraph:
                     print(f"⚠️ 第{line_num}行处理错误: {e}")
                     continue
         
+        if self.report is not None:
+            self.report.record_phase('normalize', normalize_seconds, mentions)
         df = pd.DataFrame(relations_data)
         print(f"📊 JSON数据加载完成: 共 {len(df)} 条有效关系")
         return df
@@ -193,6 +231,7 @@ class Neo4jKnowledgeGraph:
     def create_nodes(self, df):
         """创建所有实体节点"""
         print("🔄🔄 正在创建实体节点...")
+        start_time = time.time()
         
         # 获取所有唯一实体
         all_entities = set(df['head_clean'].tolist() + df['tail_clean'].tolist())
@@ -206,16 +245,39 @@ class Neo4jKnowledgeGraph:
             entity_type = self.get_entity_type(entity)
             
             # 创建带标签的节点
-            node = Node("Entity", name=entity, type=entity_type)
+            node = Node(self.label, name=entity, type=entity_type)
             nodes[entity] = node
             tx.create(node)
         
         self.graph.commit(tx)
-        print(f"✅ 成功创建 {len(nodes)} 个实体节点")
+        elapsed = time.time() - start_time
+        if self.report is not None:
+            # 单事务写入，整个事务记为一个写入批次
+            self.report.record_write(len(nodes), elapsed)
+        print(f"✅ 成功创建 {len(nodes)} 个实体节点 ({len(nodes) / max(elapsed, 1e-9):.0f} nodes/sec)")
+        return nodes
+    
+    def create_nodes_bulk(self, df):
+        """分批 UNWIND MERGE 创建实体节点，返回 实体名 -> {name, type}"""
+        print("🔄🔄 正在批量创建实体节点...")
+        all_entities = sorted(set(df['head_clean'].tolist() + df['tail_clean'].tolist()))
+        nodes = {entity: {'name': entity, 'type': self.get_entity_type(entity)} for entity in all_entities}
+        
+        loader = BulkLoader(self.graph, self.batch_size, self.writers,
+                            checkpoint=self.checkpoint, label=self.label, report=self.report)
+        report = loader.load_nodes(list(nodes.values()))
+        print(f"✅ 成功创建 {report['count']} 个实体节点，耗时 {report['seconds']:.2f}s "
+              f"({(report['count'] - loader.skipped) / max(report['seconds'], 1e-9):.0f} nodes/sec"
+              f"{f'，跳过已提交的 {loader.skipped} 个' if loader.skipped else ''})")
         return nodes
 
     def deduplicate_relationships(self, df):
-        """去除重复关系，按置信度保留最高的关系,并且过滤掉置信度小于0.8的关系"""
+        """去除重复关系，按置信度保留最高的关系,并且过滤掉置信度小于0.8的关系
+        
+        同一 (头实体, 尾实体, 关系) 保留置信度最高的一条（相同时取最先出现的）；
+        同类关系互相指向（A->B 和 B->A）时保留置信度更高的方向，相同时保留 relation_key 较小的。
+        实体名编码为整数后用排序分组一次完成，结果按 relation_key 排序。
+        """
         print("🔄🔄 正在去重关系...")
         
         # 过滤掉置信度小于0.8的关系
@@ -236,44 +298,29 @@ class Neo4jKnowledgeGraph:
         # 创建关系唯一标识：头实体-尾实体-关系类型
         df['relation_key'] = df['head_clean'] + '|' + df['tail_clean'] + '|' + df['relation']
         
-        # 按关系唯一标识分组，保留置信度最高的记录
-        df_dedup = df.loc[df.groupby('relation_key')['confidence'].idxmax()]
+        if df.empty:
+            print("📊 去重前: 0 条关系，去重后: 0 条关系")
+            return pd.DataFrame()
         
-        # 处理互相指向的相同关系类型（A->B 和 B->A 的同类关系），允许不同关系类型的相互指向
-        mutual_relations = []
-        processed_pairs = set()
+        # 头尾实体共用一套分类编码，无序实体对 = (较小编码, 较大编码)
+        entity_codes = pd.Categorical(pd.concat([df['head_clean'], df['tail_clean']], ignore_index=True)).codes
+        head_codes, tail_codes = entity_codes[:len(df)], entity_codes[len(df):]
+        pair_low = np.minimum(head_codes, tail_codes)
+        pair_high = np.maximum(head_codes, tail_codes)
+        relation_codes = pd.Categorical(df['relation']).codes
+        key_rank = pd.factorize(df['relation_key'], sort=True)[0]
+        confidence = df['confidence'].to_numpy(dtype=np.float64)
+        position = np.arange(len(df))
         
-        for _, row in df_dedup.iterrows():
-            head, tail, relation = row['head_clean'], row['tail_clean'], row['relation']
-            # 创建包含关系类型的唯一标识，用于识别相同关系类型的互相指向
-            pair_key = tuple(sorted([head, tail]) + [relation])
-            
-            if pair_key in processed_pairs:
-                continue
-                
-            # 查找互相指向的相同关系类型
-            reverse_relation = df_dedup[
-                (df_dedup['head_clean'] == tail) & 
-                (df_dedup['tail_clean'] == head) & 
-                (df_dedup['relation'] == relation)
-            ]
-            
-            if not reverse_relation.empty:
-                # 存在互相指向的相同关系类型，保留置信度更高的
-                current_confidence = row['confidence']
-                reverse_confidence = reverse_relation.iloc[0]['confidence']
-                
-                if current_confidence >= reverse_confidence:
-                    mutual_relations.append(row)
-                else:
-                    mutual_relations.append(reverse_relation.iloc[0])
-                    
-                processed_pairs.add(pair_key)
-            else:
-                # 没有互相指向的相同关系类型，直接保留
-                mutual_relations.append(row)
+        # 每个 (实体对, 关系类型) 组内按 置信度降序、relation_key 升序、出现顺序 排序，取第一条
+        order = np.lexsort((position, key_rank, -confidence, relation_codes, pair_high, pair_low))
+        group_keys = np.stack([pair_low[order], pair_high[order], relation_codes[order]])
+        group_start = np.flatnonzero(np.r_[True, (np.diff(group_keys, axis=1) != 0).any(axis=0)])
+        best = order[group_start]
         
-        result_df = pd.DataFrame(mutual_relations)
+        # 每组输出在组内最小的 relation_key 的位置
+        first_key = np.minimum.reduceat(key_rank[order], group_start)
+        result_df = df.iloc[best[np.argsort(first_key, kind='stable')]]
         print(f"📊 去重前: {len(df)} 条关系，去重后: {len(result_df)} 条关系")
         return result_df
     
@@ -282,10 +329,14 @@ class Neo4jKnowledgeGraph:
         print("🔄🔄 正在创建关系...")
         
         # 先进行关系去重
-        df_dedup = self.deduplicate_relationships(df)
+        with self.phase('dedup') as phase:
+            df_dedup = self.deduplicate_relationships(df)
+            phase.rows = len(df)
         
+        start_time = time.time()
         tx = self.graph.begin()
         relationship_types = set()
+        created = []
         
         for _, row in tqdm(df_dedup.iterrows(), total=len(df_dedup), desc="创建关系"):
             source = nodes.get(row['head_clean'])
@@ -301,10 +352,385 @@ class Neo4jKnowledgeGraph:
                                       source_sentence=row['sentence'])
             tx.create(relationship)
             relationship_types.add(rel_type)
+            created.append((row['head_clean'], rel_type, row['tail_clean']))
+            self.manifest.triples[created[-1]] = float(row['confidence'])
+            self.sentence_index.add(row['sentence'], row['head_clean'], rel_type, row['tail_clean'], row['confidence'])
         
         self.graph.commit(tx)
-        print(f"✅ 成功创建 {len(df_dedup)} 个关系，包含 {len(relationship_types)} 种关系类型")
+        elapsed = time.time() - start_time
+        if self.report is not None:
+            self.report.record_write(len(created), elapsed)
+        print(f"✅ 成功创建 {len(df_dedup)} 个关系，包含 {len(relationship_types)} 种关系类型 "
+              f"({len(created) / max(elapsed, 1e-9):.0f} rels/sec)")
+        return created
+    
+    def create_relationships_bulk(self, df, nodes):
+        """按关系类型分组、分批并行 UNWIND MERGE 创建关系"""
+        print("🔄🔄 正在批量创建关系...")
+        with self.phase('dedup') as phase:
+            df_dedup = self.deduplicate_relationships(df)
+            phase.rows = len(df)
+        
+        rows_by_type = {}
+        created = []
+        for row in df_dedup.itertuples(index=False):
+            if row.head_clean not in nodes or row.tail_clean not in nodes:
+                continue
+            rel_type = self.relation_dict.get(row.relation, row.relation)
+            rows_by_type.setdefault(rel_type, []).append({
+                'head': row.head_clean, 'tail': row.tail_clean,
+                'confidence': float(row.confidence), 'sentence': row.sentence
+            })
+            created.append((row.head_clean, rel_type, row.tail_clean))
+            self.manifest.triples[created[-1]] = float(row.confidence)
+            self.sentence_index.add(row.sentence, row.head_clean, rel_type, row.tail_clean, row.confidence)
+        
+        loader = BulkLoader(self.graph, self.batch_size, self.writers,
+                            checkpoint=self.checkpoint, label=self.label, report=self.report)
+        report = loader.load_relationships(rows_by_type)
+        print(f"✅ 成功创建 {report['count']} 个关系，包含 {len(rows_by_type)} 种关系类型，"
+              f"耗时 {report['seconds']:.2f}s ({(report['count'] - loader.skipped) / max(report['seconds'], 1e-9):.0f} rels/sec, "
+              f"{loader.writers} 个写入会话{f'，跳过已提交的 {loader.skipped} 个' if loader.skipped else ''})")
+        return created
+        
+    def write_statistics(self, nodes, triples):
+        """由构建时的节点和关系计算统计信息，与新的图谱版本一起写入 GraphMeta 节点"""
+        entity_types = {name: node['type'] for name, node in nodes.items()}
+        stats = GraphStatistics.from_graph_data(entity_types, triples)
+        stats.write(self.graph, key=META_KEYS[self.namespace])
+        print(f"✅ 图谱统计已写入: {stats.node_count} 个节点, {stats.relationship_count} 个关系, 版本 {stats.version}")
+        return stats
+    
+    def update_statistics(self, new_nodes, added):
+        """
+        只查询受影响节点的度数，增量更新统计信息并写入新的图谱版本；
+        没有已存储的统计信息时全量重新统计
+        
+        Args:
+            new_nodes (dict): 新建的实体名 -> 实体类型
+            added (list): 新建的 (头实体, 关系类型, 尾实体)
+        
+        Returns:
+            GraphStatistics: 写入后的统计信息
+        """
+        touched = sorted({name for head, _, tail in added for name in (head, tail)} | set(new_nodes))
+        degrees = {row['name']: row['degree'] for row in self.graph.run("""
+        UNWIND $names AS name
+        MATCH (n:Entity {name: name})
+        RETURN name, COUNT { (n)--() } AS degree
+        """, names=touched).data()}
+        
+        stats = GraphStatistics.read(self.graph)
+        if stats is None:
+            print("⚠️ 未找到图谱统计信息，将全量重新统计")
+            stats = self.scan_statistics()
+            version = None
+        else:
+            stats.apply_delta(new_nodes, added, degrees)
+            version = int(stats.version or 0) + 1
+        
+        stats.write(self.graph, version)
+        return stats
+    
+    def add_triples(self, df):
+        """
+        向已有图谱追加三元组，只创建尚不存在的节点和关系（任一方向已有同类关系即视为已存在，
+        与 deduplicate_relationships 的每对实体只保留一个方向一致），
+        并增量更新统计信息、图谱版本和溯源句检索索引。
+        中心性需要全图计算，追加时不重算（新实体中心性按 0 排序），下次全量构建时更新
+        
+        Args:
+            df: 含 head、tail、relation、confidence、sentence 列的数据
+        
+        Returns:
+            list: 实际新建的 (头实体, 关系类型, 尾实体)
+        """
+        df = df.copy()
+        if 'head_clean' not in df.columns:
+            df['head_clean'] = self.normalizer.normalize_series(df['head'])
+        if 'tail_clean' not in df.columns:
+            df['tail_clean'] = self.normalizer.normalize_series(df['tail'])
+        self.normalizer.save()
+        df_dedup = self.deduplicate_relationships(df)
+        if df_dedup.empty:
+            print("⚠️ 没有需要追加的关系")
+            return []
+        
+        # 在已有的溯源句索引上继续追加
+        if not len(self.sentence_index) and os.path.exists(self.sentence_index_path + '.terms.json'):
+            self.sentence_index = SentenceIndexBuilder.from_index(self.sentence_index_path)
+        
+        # 新节点
+        names = sorted(set(df_dedup['head_clean']) | set(df_dedup['tail_clean']))
+        existing = {row['name'] for row in self.graph.run(
+            "MATCH (n:Entity) WHERE n.name IN $names RETURN n.name AS name", names=names).data()}
+        new_nodes = {name: self.get_entity_type(name) for name in names if name not in existing}
+        self.graph.run("""
+        UNWIND $rows AS row
+        CREATE (:Entity {name: row.name, type: row.type})
+        """, rows=[{'name': name, 'type': entity_type} for name, entity_type in new_nodes.items()])
+        
+        # 按关系类型分组，跳过任一方向已存在的关系（关系类型不能参数化）
+        rows_by_type = {}
+        for _, row in df_dedup.iterrows():
+            rel_type = self.relation_dict.get(row['relation'], row['relation'])
+            rows_by_type.setdefault(rel_type, []).append({
+                'head': row['head_clean'], 'tail': row['tail_clean'],
+                'confidence': float(row['confidence']), 'sentence': row['sentence']
+            })
+        
+        added = []
+        for rel_type, rows in rows_by_type.items():
+            present = {(r['head'], r['tail']) for r in self.graph.run(f"""
+            UNWIND $rows AS row
+            MATCH (h:Entity {{name: row.head}})-[:`{rel_type}`]-(t:Entity {{name: row.tail}})
+            RETURN DISTINCT row.head AS head, row.tail AS tail
+            """, rows=rows).data()}
+            rows = [r for r in rows if (r['head'], r['tail']) not in present]
+            self.graph.run(f"""
+            UNWIND $rows AS row
+            MATCH (h:Entity {{name: row.head}}), (t:Entity {{name: row.tail}})
+            CREATE (h)-[:`{rel_type}` {{confidence: row.confidence, source_sentence: row.sentence}}]->(t)
+            """, rows=rows)
+            for r in rows:
+                added.append((r['head'], rel_type, r['tail']))
+                self.sentence_index.add(r['sentence'], r['head'], rel_type, r['tail'], r['confidence'])
+        
+        stats = self.update_statistics(new_nodes, added)
+        
+        self.sentence_index.save(self.sentence_index_path, stats.version)
+        
+        # 清单只记录本次实际新建的关系（已存在的关系保持原置信度）
+        confidences = {(r['head'], rel_type, r['tail']): r['confidence']
+                       for rel_type, rows in rows_by_type.items() for r in rows}
+        manifest = self.load_manifest()
+        for triple in added:
+            manifest.triples[triple] = confidences[triple]
+        manifest.graph_version = stats.version
+        manifest.save(self.manifest_path)
+        print(f"✅ 追加 {len(new_nodes)} 个节点, {len(added)} 个关系，图谱版本 {stats.version}"
+              f"（中心性未重算，下次全量构建时更新）")
+        return added
+        
+    def scan_statistics(self):
+        """扫描数据库全量计算统计信息（没有构建时数据可用时使用）"""
+        nodes = {row['name']: row['type'] for row in self.graph.run(
+            "MATCH (n:Entity) RETURN n.name AS name, n.type AS type").data()}
+        triples = [(row['h'], row['r'], row['t']) for row in self.graph.run(
+            "MATCH (h:Entity)-[r]->(t:Entity) RETURN h.name AS h, type(r) AS r, t.name AS t").data()]
+        return GraphStatistics.from_graph_data(nodes, triples)
+    
+    def load_manifest(self):
+        """读取三元组清单；清单不存在时从数据库扫描现有关系重建"""
+        if os.path.exists(self.manifest_path):
+            return GraphManifest.load(self.manifest_path)
+        print("⚠️ 未找到三元组清单，从数据库扫描现有关系")
+        rows = self.graph.run("""
+        MATCH (h:Entity)-[r]->(t:Entity)
+        RETURN h.name AS head, type(r) AS relation, t.name AS tail, COALESCE(r.confidence, 1.0) AS confidence
+        """).data()
+        stats = GraphStatistics.read(self.graph)
+        return GraphManifest.from_rows(rows, stats.version if stats else None)
+    
+    def delete_relationships(self, loader, rows_by_type):
+        """按关系类型分批删除关系（rows_by_type: 关系类型 -> [{head, tail}]）"""
+        for rel_type, rows in rows_by_type.items():
+            loader.delete_relationships(rel_type, rows)
+    
+    def stream_build_knowledge_graph(self, file_path, chunk_lines=CHUNK_LINES, data_source='json', workers=1):
+        """
+        流式构建知识图谱：按块解析、标准化、去重并批量写入，
+        内存中只保留滚动去重索引和实体名，峰值内存不随语料行数增长；
+        workers > 1 时解析/标准化在进程池中并行，关系由多个写入线程并行写入，结果与串行构建相同。
+        写入预备版本，完成后切换，构建期间查询仍由当前版本应答
+        
+        Args:
+            file_path (str): iteration_version_N.json（JSONL）或 CSV 路径
+            chunk_lines (int): 每块解析的行数
+            data_source (str): 'json' 或 'csv'
+            workers (int): 解析/标准化进程数
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"数据文件不存在: {file_path}")
+        self.namespace = STAGING
+        try:
+            clear_namespace(self.graph, STAGING)
+            self.create_indexes()
+            
+            print(f"🔄 正在流式导入: {file_path}（{workers} 个解析进程, {self.writers} 个写入线程）")
+            pipeline = GraphBuildPipeline(self, workers=workers, writers=self.writers, chunk_lines=chunk_lines)
+            report = pipeline.run(file_path, data_source)
+            dedup, nodes = pipeline.dedup, pipeline.nodes
+            for line_num, error in pipeline.errors[:10]:
+                print(f"⚠️ 第{line_num}行JSON解析错误: {error}")
+            self.normalizer.save()
+            for stage in report['stages']:
+                print(f"📊 {stage['stage']:<6} {stage['rows']:>10} 行  忙碌 {stage['busy_seconds']:>8.2f}s  "
+                      f"阻塞 {stage['blocked_seconds']:>8.2f}s  {stage['rows_per_second']:>10.0f} rows/sec")
+            
+            # 由最终的去重索引生成溯源句索引、清单和统计
+            self.sentence_index = SentenceIndexBuilder()
+            self.manifest = GraphManifest()
+            triples = []
+            for c in dedup.ordered():
+                rel_type = self.relation_dict.get(c.relation, c.relation)
+                triples.append((c.head, rel_type, c.tail))
+                self.manifest.triples[triples[-1]] = c.confidence
+                self.sentence_index.add(c.sentence, c.head, rel_type, c.tail, c.confidence)
+            elapsed = report['wall_seconds']
+            print(f"✅ 流式导入 {dedup.rows_seen} 条记录: {len(nodes)} 个节点, {len(triples)} 个关系，"
+                  f"耗时 {elapsed:.2f}s ({dedup.rows_seen / max(elapsed, 1e-9):.0f} rows/sec)")
+            
+            self.update_centrality()
+            stats = self.write_statistics(nodes, triples)
+        finally:
+            self.namespace = ACTIVE
+        self.promote_graph()
+        return stats
+    
+    def sync_graph(self, data_source='csv', json_file_path=None, csv_file_path=None):
+        """
+        增量构建：把数据源的完整三元组集合与清单比对，不清空数据库，
+        只 MERGE 新增或置信度提高的关系、删除被撤回的关系（及因此孤立的实体），保留索引，
+        最后图谱版本号 +1，查询层的缓存随版本失效
+        
+        Args:
+            参数同 build_knowledge_graph
+        
+        Returns:
+            dict: added、improved、retracted 三类三元组
+        """
+        df = self.load_source(data_source, json_file_path, csv_file_path)
+        print(f"📊📊 已加载 {len(df)} 条知识记录")
+        df_dedup = self.deduplicate_relationships(df)
+        
+        # 新的完整三元组集合；溯源句索引随之整体重建（被撤回的句子不再保留）
+        incoming = {}
+        self.sentence_index = SentenceIndexBuilder()
+        for row in df_dedup.itertuples(index=False):
+            rel_type = self.relation_dict.get(row.relation, row.relation)
+            incoming[(row.head_clean, rel_type, row.tail_clean)] = (float(row.confidence), row.sentence)
+            self.sentence_index.add(row.sentence, row.head_clean, rel_type, row.tail_clean, row.confidence)
+        
+        manifest = self.load_manifest()
+        changes = manifest.diff({triple: value[0] for triple, value in incoming.items()})
+        print(f"📊 与清单比对: 新增 {len(changes['added'])}, 置信度提高 {len(changes['improved'])}, "
+              f"撤回 {len(changes['retracted'])}")
+        if not any(changes.values()):
+            # 图谱未变化：不提升版本号，查询缓存和导出 ETag 继续有效
+            print("✅ 数据源与清单一致，图谱无需更新")
+            return changes
+        
+        loader = BulkLoader(self.graph, self.batch_size, self.writers)
+        upserts = changes['added'] + changes['improved']
+        new_nodes = {}
+        if upserts:
+            names = sorted({name for head, _, tail in upserts for name in (head, tail)})
+            existing = {row['name'] for row in self.graph.run(
+                "MATCH (n:Entity) WHERE n.name IN $names RETURN n.name AS name", names=names).data()}
+            new_nodes = {name: self.get_entity_type(name) for name in names if name not in existing}
+            loader.load_nodes([{'name': name, 'type': self.get_entity_type(name)} for name in names])
+            rows_by_type = {}
+            for head, rel_type, tail in upserts:
+                confidence, sentence = incoming[(head, rel_type, tail)]
+                rows_by_type.setdefault(rel_type, []).append(
+                    {'head': head, 'tail': tail, 'confidence': confidence, 'sentence': sentence})
+            report = loader.load_relationships(rows_by_type)
+            print(f"✅ 写入 {report['count']} 个关系 ({report['per_second']:.0f} rels/sec)")
+        
+        if changes['retracted']:
+            retracted_by_type = {}
+            for head, rel_type, tail in changes['retracted']:
+                retracted_by_type.setdefault(rel_type, []).append({'head': head, 'tail': tail})
+            self.delete_relationships(loader, retracted_by_type)
+            # 删除因撤回而不再有任何关系的实体
+            names = sorted({name for head, _, tail in changes['retracted'] for name in (head, tail)})
+            for start in range(0, len(names), loader.batch_size):
+                loader.write_batch("""
+                UNWIND $rows AS name
+                MATCH (n:Entity {name: name})
+                WHERE NOT (n)--()
+                DELETE n
+                """, names[start:start + loader.batch_size])
+            print(f"🧹 已删除 {len(changes['retracted'])} 个被撤回的关系")
+        
+        # 清单更新为数据库中的实际状态：未提高的已有关系保留原置信度
+        for triple in changes['retracted']:
+            del manifest.triples[triple]
+        for triple in upserts:
+            manifest.triples[triple] = incoming[triple][0]
+        
+        self.update_centrality()
         
+        if changes['retracted']:
+            # 有撤回时无法按增量更新度分布，重新统计；版本号在原版本上 +1
+            previous = GraphStatistics.read(self.graph)
+            stats = self.scan_statistics()
+            stats.write(self.graph, int(previous.version or 0) + 1 if previous else None)
+        else:
+            # 只有新增和置信度提高：置信度提高不改变计数，只按新建的节点和关系增量更新
+            stats = self.update_statistics(new_nodes, changes['added'])
+        
+        self.sentence_index.save(self.sentence_index_path, stats.version)
+        manifest.graph_version = stats.version
+        manifest.save(self.manifest_path)
+        print(f"✅ 增量构建完成，图谱版本 {stats.version}")
+        return changes
+    
+    def export_admin_import(self, output_dir, data_source='csv', json_file_path=None, csv_file_path=None):
+        """
+        不连接数据库，把清洗去重后的三元组写成 neo4j-admin 离线导入文件，
+        同时生成溯源句检索索引；导入后运行 finalize_import 补建索引、中心性和统计
+        
+        Args:
+            output_dir (str): 导入文件的输出目录
+            其余参数同 build_knowledge_graph
+        
+        Returns:
+            dict: nodes、relationships 文件路径
+        """
+        df = self.load_source(data_source, json_file_path, csv_file_path)
+        print(f"📊📊 已加载 {len(df)} 条知识记录")
+        df_dedup = self.deduplicate_relationships(df)
+        
+        nodes = {name: self.get_entity_type(name)
+                 for name in set(df_dedup['head_clean']) | set(df_dedup['tail_clean'])}
+        self.sentence_index = SentenceIndexBuilder()
+        relationships = []
+        for row in df_dedup.itertuples(index=False):
+            rel_type = self.relation_dict.get(row.relation, row.relation)
+            relationships.append((row.head_clean, rel_type, row.tail_clean, row.confidence, row.sentence))
+            self.sentence_index.add(row.sentence, row.head_clean, rel_type, row.tail_clean, row.confidence)
+        
+        paths = write_import_files(nodes, relationships, output_dir)
+        self.sentence_index.save(self.sentence_index_path)
+        GraphManifest({(h, r, t): float(c) for h, r, t, c, _ in relationships}).save(self.manifest_path)
+        print(f"✅ 导入文件已生成: {len(nodes)} 个节点 -> {paths['nodes']}, "
+              f"{len(relationships)} 个关系 -> {paths['relationships']}")
+        print(f"👉 停止数据库后执行: {import_command(paths)}")
+        print("👉 启动数据库后执行: python product.py --finalize-import")
+        return paths
+    
+    def finalize_import(self):
+        """离线导入完成后创建索引、计算中心性并写入统计信息和图谱版本"""
+        self.create_indexes()
+        self.update_centrality()
+        stats = self.scan_statistics()
+        stats.write(self.graph)
+        manifest = self.load_manifest()
+        manifest.graph_version = stats.version
+        manifest.save(self.manifest_path)
+        print(f"✅ 图谱统计已写入: {stats.node_count} 个节点, {stats.relationship_count} 个关系, 版本 {stats.version}")
+        return stats
+    
+    def update_centrality(self):
+        """计算实体中心性（度数、PageRank、介数）并写回节点属性，供查询按综合得分排序"""
+        try:
+            count = run_centrality_job(self.graph, label=self.label)
+            print(f"✅ 已计算 {count} 个实体的中心性")
+        except Exception as e:
+            print(f"计算中心性时出错: {e}")
+    
     def create_indexes(self):
         """创建索引优化查询性能"""
         try:
@@ -319,6 +745,11 @@ class Neo4jKnowledgeGraph:
             if "entity_type_index" not in index_names:
                 self.graph.run("CREATE INDEX entity_type_index FOR (e:Entity) ON (e.type)")
             
+            # 预备版本按名称 MERGE 同样需要唯一约束（切换时改标为 Entity 后由 entity_name_unique 约束）
+            if "entity_staging_name_unique" not in index_names:
+                self.graph.run("CREATE CONSTRAINT entity_staging_name_unique "
+                               "FOR (e:EntityStaging) REQUIRE e.name IS UNIQUE")
+            
             print("✅ 索引创建完成")
         except Exception as e:
             print(f"创建索引时出错: {e}")
@@ -326,23 +757,14 @@ class Neo4jKnowledgeGraph:
             try:
                 self.graph.run("CREATE CONSTRAINT entity_name_unique IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE")
                 self.graph.run("CREATE INDEX entity_type_index IF NOT EXISTS FOR (e:Entity) ON (e.type)")
+                self.graph.run("CREATE CONSTRAINT entity_staging_name_unique IF NOT EXISTS "
+                               "FOR (e:EntityStaging) REQUIRE e.name IS UNIQUE")
                 print("✅ 备选方案索引创建完成")
             except Exception as e2:
                 print(f"备选方案创建索引时出错: {e2}")
 
-    def build_knowledge_graph(self, data_source='csv', json_file_path=None, csv_file_path=None):
-        """
-        构建知识图谱
-        
-        Args:
-            data_source (str): 数据源类型，'csv' 或 'json'
-            json_file_path (str): JSON文件路径（当data_source='json'时必需）
-            csv_file_path (str): CSV文件路径（当data_source='csv'且指定文件时必需）
-        """
-        # 彻底清理数据库
-        self.clean_database()
-        
-        # 根据数据源类型加载数据
+    def load_source(self, data_source='csv', json_file_path=None, csv_file_path=None):
+        """根据数据源类型加载数据（参数同 build_knowledge_graph）"""
         if data_source == 'json':
             if not json_file_path:
                 raise ValueError("使用JSON数据源时必须提供json_file_path参数")
@@ -361,45 +783,321 @@ class Neo4jKnowledgeGraph:
                     df['tail_clean'] = df['tail']
             else:
                 df = self.load_data()
-            
-        print(f"📊📊 已加载 {len(df)} 条知识记录")
+        self.normalizer.save()
+        return df
+
+    def source_path(self, data_source='csv', json_file_path=None, csv_file_path=None):
+        """数据源对应的文件路径（参数同 build_knowledge_graph）"""
+        if data_source == 'json':
+            return json_file_path
+        return csv_file_path or os.path.join(self.data_path, "predictions.csv")
+
+    def verify_graph(self, nodes, triples):
+        """
+        比较预期与数据库中实际的节点数和各类型关系数
         
-        # 创建节点和关系
-        nodes = self.create_nodes(df)
-        self.create_relationships(df, nodes)
+        Returns:
+            list: 不一致项 (名称, 预期, 实际)，为空表示通过
+        """
+        expected = {'节点': len(nodes)}
+        for _, rel_type, _ in triples:
+            expected[rel_type] = expected.get(rel_type, 0) + 1
+        actual = {'节点': self.graph.run(f"MATCH (n:`{self.label}`) RETURN count(n) AS count").data()[0]['count']}
+        for row in self.graph.run(f"""
+        MATCH (:`{self.label}`)-[r]->(:`{self.label}`)
+        RETURN type(r) AS rel_type, count(r) AS count
+        """).data():
+            actual[row['rel_type']] = row['count']
         
-        # 创建索引
-        self.create_indexes()
+        mismatches = [(name, expected.get(name, 0), actual.get(name, 0))
+                      for name in sorted(set(expected) | set(actual)) if expected.get(name, 0) != actual.get(name, 0)]
+        for name, want, got in mismatches:
+            print(f"❌ {name}: 预期 {want}, 实际 {got}")
+        return mismatches
+
+    def version_files(self):
+        """随图谱版本切换的文件：溯源句检索索引和三元组清单"""
+        return [self.sentence_index_path + suffix for suffix in INDEX_SUFFIXES] + [self.manifest_path]
+
+    def promote_graph(self, staging_version=None):
+        """
+        把预备版本切换为活动版本（单个事务），上一版本连同其溯源句索引和清单保留供回滚，
+        然后写出新版本的溯源句索引和清单
         
-        # 验证图结构
+        Args:
+            staging_version: 续跑时检查点记录的预备版本号；活动版本已是该版本时说明上次中断在
+                切换事务提交之后，不再切换，只补写溯源句索引和清单
+        
+        Returns:
+            新的活动版本号
+        """
+        active = GraphStatistics.read(self.graph) if staging_version is not None else None
+        if active is not None and active.version == staging_version:
+            version = active.version
+            print(f"🔁 图谱已切换到版本 {version}（上次中断在切换之后），补写溯源句索引和清单")
+        else:
+            version = promote(self.graph)
+        # 清单最后写出：清单已是新版本时，磁盘上的文件已经属于新版本，不能再覆盖 .previous
+        if not os.path.exists(self.manifest_path) or GraphManifest.load(self.manifest_path).graph_version != version:
+            keep_previous_files(self.version_files())
+        self.sentence_index.save(self.sentence_index_path, version)
+        print(f"✅ 溯源句检索索引已保存: {len(self.sentence_index)} 个句子 -> {self.sentence_index_path}")
+        self.manifest.graph_version = version
+        self.manifest.save(self.manifest_path)
+        print(f"🔀 图谱已切换到版本 {version}（上一版本已保留，可用 --rollback 回滚）")
+        return version
+
+    def rollback_graph(self):
+        """回滚到上一版本：与当前版本交换（再次执行即恢复），溯源句索引和清单随之交换"""
+        version = rollback(self.graph)
+        swap_previous_files(self.version_files())
+        print(f"⏪ 图谱已回滚到版本 {version}")
+        return version
+
+    def show_versions(self):
+        """打印各命名空间（当前、预备、上一版本）的版本号和规模"""
+        versions = list_versions(self.graph)
+        if not versions:
+            print("⚠️ 图谱中没有版本信息")
+        for namespace, info in versions.items():
+            print(f"📊 {namespace:<8} 版本 {info['version']}: {info['nodes']} 个节点, {info['relationships']} 个关系")
+        return versions
+
+    def build_knowledge_graph(self, data_source='csv', json_file_path=None, csv_file_path=None, loader='bulk',
+                              resume=False, promote=True, report_path=None):
+        """
+        构建知识图谱
+        
+        构建过程写入检查点（输入哈希、阶段、已提交的批次区间），
+        resume=True 且输入未变化时跳过已完成的阶段和批次继续构建，最后校验节点数和关系数；
+        图谱写入预备版本，校验通过后才切换为活动版本，构建期间和失败时查询不受影响。
+        结束时（包括失败）写出构建报告：各阶段耗时和吞吐、RSS 峰值、写入批次延迟分位数
+        
+        Args:
+            data_source (str): 数据源类型，'csv' 或 'json'
+            json_file_path (str): JSON文件路径（当data_source='json'时必需）
+            csv_file_path (str): CSV文件路径（当data_source='csv'且指定文件时必需）
+            loader (str): 写入方式，'bulk' 为分批并行 UNWIND MERGE，'legacy' 为单事务逐个创建
+            resume (bool): 从上次中断的检查点继续（仅支持 bulk）
+            promote (bool): 校验通过后是否切换为活动版本（基准测试时不切换）
+            report_path (str): 构建报告路径，默认 self.report_path
+        
+        Returns:
+            dict: 构建报告
+        """
+        if resume and loader == 'legacy':
+            raise ValueError("续跑只支持 bulk 写入方式")
+        
+        report = BuildReport('build_knowledge_graph', {
+            'data_source': data_source, 'source': self.source_path(data_source, json_file_path, csv_file_path),
+            'loader': loader, 'batch_size': self.batch_size, 'writers': self.writers,
+            'confidence': self.confidence, 'resume': resume, 'promote': promote,
+        })
+        self.report = report.start()
+        error = None
         try:
-            result = self.graph.run("MATCH (n) RETURN count(n) AS node_count").data()
-            print(f"📈📈 知识图谱构建完成！包含 {result[0]['node_count']} 个节点")
-        except Exception as e:
-            print(f"验证图结构时出错: {e}")
+            self._run_build(data_source, json_file_path, csv_file_path, loader, resume, promote)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.report = None
+            report.finish(error)
+            report_path = report_path or self.report_path
+            data = report.save(report_path)
+            print(format_report(data))
+            print(f"📝 构建报告已保存: {report_path}")
+        return data
+
+    def _run_build(self, data_source, json_file_path, csv_file_path, loader, resume, promote):
+        """build_knowledge_graph 的各个阶段（参数同 build_knowledge_graph）"""
+        report = self.report
+        
+        # 根据数据源类型加载数据
+        with report.phase('load') as phase:
+            df = self.load_source(data_source, json_file_path, csv_file_path)
+            phase.rows = report.counts['input_rows'] = len(df)
+        print(f"📊📊 已加载 {len(df)} 条知识记录")
+        
+        with report.phase('checkpoint'):
+            input_hash = file_hash(self.source_path(data_source, json_file_path, csv_file_path))
+            params = {'data_source': data_source, 'loader': loader,
+                      'batch_size': self.batch_size, 'confidence': self.confidence}
+            checkpoint = BuildCheckpoint.load(self.checkpoint_path) if resume else None
+            if checkpoint is not None and checkpoint.phase != 'done' and checkpoint.matches(input_hash, params):
+                done = sum(len(batches) for batches in checkpoint.batches.values())
+                print(f"🔁 从检查点续跑: 阶段 {checkpoint.phase}，已提交 {done} 个批次")
+            else:
+                if resume:
+                    print("⚠️ 没有可续跑的检查点（不存在、已完成或输入/参数已变化），重新构建")
+                checkpoint = BuildCheckpoint(self.checkpoint_path, input_hash, params)
+                checkpoint.save()
+        self.checkpoint = checkpoint if loader == 'bulk' else None
+        
+        # 写入预备版本（续跑时保留已写入的数据），校验通过后切换；构建期间查询仍由当前版本应答
+        self.namespace = STAGING
+        try:
+            if checkpoint.pending('clean'):
+                with report.phase('clean'):
+                    cleared = clear_namespace(self.graph, STAGING)
+                print(f"🧹🧹 已清理上次未完成的预备版本: {cleared} 个节点")
+                checkpoint.advance('clean')
+            
+            # 先建唯一约束，批量 MERGE 才能走索引
+            if checkpoint.pending('indexes'):
+                with report.phase('indexes'):
+                    self.create_indexes()
+                checkpoint.advance('indexes')
+            
+            # 创建节点和关系（同时生成溯源句检索索引和三元组清单）；已提交的批次由检查点跳过
+            self.sentence_index = SentenceIndexBuilder()
+            self.manifest = GraphManifest()
+            with report.phase('nodes') as phase:
+                nodes = self.create_nodes(df) if loader == 'legacy' else self.create_nodes_bulk(df)
+                phase.rows = report.counts['nodes'] = len(nodes)
+            checkpoint.advance('nodes')
+            with report.phase('relationships') as phase:
+                if loader == 'legacy':
+                    triples = self.create_relationships(df, nodes)
+                else:
+                    triples = self.create_relationships_bulk(df, nodes)
+                phase.rows = report.counts['relationships'] = len(triples)
+            checkpoint.advance('relationships')
+            
+            if checkpoint.pending('finalize'):
+                # 离线计算中心性
+                with report.phase('centrality') as phase:
+                    self.update_centrality()
+                    phase.rows = len(nodes)
+                
+                # 写入统计信息和图谱版本（预备版本的 GraphMeta）
+                with report.phase('statistics'):
+                    checkpoint.staging_version = self.write_statistics(nodes, triples).version
+                checkpoint.advance('finalize')
+            
+            # 校验图结构（切换后预备版本已不存在，续跑时不再校验）
+            if checkpoint.pending('verify'):
+                with report.phase('verify'):
+                    mismatches = self.verify_graph(nodes, triples)
+                if mismatches:
+                    # 下次续跑时全部批次重新 MERGE（幂等），不需要清空预备版本
+                    checkpoint.reset_batches()
+                    raise RuntimeError(f"图谱校验失败（{len(mismatches)} 项不一致），可使用 --resume 重新写入")
+                checkpoint.advance('verify')
+        finally:
+            self.namespace = ACTIVE
+            self.checkpoint = None
+        
+        if promote and checkpoint.pending('promote'):
+            with report.phase('promote'):
+                report.counts['graph_version'] = self.promote_graph(checkpoint.staging_version)
+            checkpoint.advance('promote')
+        print(f"📈📈 知识图谱构建完成！包含 {len(nodes)} 个节点, {len(triples)} 个关系，校验通过")
+
+    def benchmark_build(self, rows, entities=None, loader='bulk', report_path=None):
+        """
+        用合成预测数据测量一次完整构建：写入预备版本但不切换，结束后清理预备版本，
+        实体标准化词典只在内存中、检查点写到临时目录，正在服务的图谱和持久化文件都不受影响
+        （不要与正式构建同时运行，两者共用预备版本）
+        
+        Args:
+            rows (int): 合成的关系提及数
+            entities (int): 实体数，默认约为 rows 的 1/20
+            loader (str): 写入方式
+            report_path (str): 报告路径，默认在构建报告旁加 _benchmark 后缀
+        
+        Returns:
+            dict: 构建报告
+        """
+        report_path = report_path or os.path.splitext(self.report_path)[0] + '_benchmark.json'
+        normalizer, checkpoint_path = self.normalizer, self.checkpoint_path
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_path = os.path.join(tmp_dir, 'synthetic_predictions.json')
+            relations = [code for code in self.relation_dict if code != 'none']
+            lines = write_synthetic_predictions(data_path, rows, relations, entities)
+            print(f"🧪 已生成合成预测: {rows} 个关系提及, {lines} 个句子 -> {data_path}")
+            self.normalizer = EntityNormalizer(None)
+            self.checkpoint_path = os.path.join(tmp_dir, 'build_checkpoint.json')
+            try:
+                return self.build_knowledge_graph(data_source='json', json_file_path=data_path, loader=loader,
+                                                  promote=False, report_path=report_path)
+            finally:
+                self.normalizer, self.checkpoint_path = normalizer, checkpoint_path
+                cleared = clear_namespace(self.graph, STAGING)
+                print(f"🧹 已清理基准测试写入的预备版本: {cleared} 个节点")
 
 if __name__ == "__main__":
-    import sys
+    parser = argparse.ArgumentParser(description="构建知识图谱")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--json', metavar='JSON_FILE_PATH', help='使用JSON数据源')
+    source.add_argument('--csv', metavar='CSV_FILE_PATH', help='使用指定的CSV数据源')
+    parser.add_argument('--loader', choices=['bulk', 'legacy'], default='bulk',
+                        help='写入方式：分批并行 UNWIND MERGE 或单事务逐个创建')
+    parser.add_argument('--batch-size', type=int, default=BulkLoader.BATCH_SIZE, help='每个事务写入的行数')
+    parser.add_argument('--writers', type=int, default=BulkLoader.WRITERS, help='并行写入关系的会话数')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--admin-import', metavar='OUTPUT_DIR',
+                      help='不写数据库，生成 neo4j-admin database import 所需的CSV文件')
+    mode.add_argument('--finalize-import', action='store_true',
+                      help='离线导入后创建索引、计算中心性和统计信息')
+    mode.add_argument('--incremental', action='store_true',
+                      help='与三元组清单比对，只写入变化的关系，不清空数据库')
+    mode.add_argument('--append', action='store_true',
+                      help='把 --json 或 --csv 指定的三元组追加到当前图谱，只新建不存在的节点和关系')
+    mode.add_argument('--rollback', action='store_true',
+                      help='切换回上一版本图谱（再次执行即恢复）')
+    mode.add_argument('--versions', action='store_true',
+                      help='查看当前、预备和上一版本图谱')
+    mode.add_argument('--benchmark', type=int, metavar='ROWS',
+                      help='用 ROWS 个合成关系提及测量一次构建（写入预备版本、不切换），输出构建报告')
+    mode.add_argument('--stream', action='store_true',
+                      help='按块流式导入 --json 或 --csv 指定的文件，内存占用不随文件大小增长')
+    parser.add_argument('--benchmark-entities', type=int, help='基准测试的实体数（默认约为行数的1/20）')
+    parser.add_argument('--report', metavar='REPORT_PATH', help='构建报告（JSON）路径')
+    parser.add_argument('--chunk-lines', type=int, default=CHUNK_LINES, help='流式导入时每块的行数')
+    parser.add_argument('--resume', action='store_true', help='从上次中断的检查点继续构建（跳过已提交的批次）')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='解析/标准化进程数；大于1时使用并行流水线构建（隐含 --stream）')
+    args = parser.parse_args()
     
-    kg_builder = Neo4jKnowledgeGraph()
+    kg_builder = Neo4jKnowledgeGraph(batch_size=args.batch_size, writers=args.writers,
+                                     connect=not args.admin_import, report_path=args.report)
     
-    # 检查命令行参数
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--json' and len(sys.argv) > 2:
-            # 使用JSON数据源
-            json_file_path = sys.argv[2]
-            print(f"🔄 使用JSON数据源: {json_file_path}")
-            kg_builder.build_knowledge_graph(data_source='json', json_file_path=json_file_path)
-        elif sys.argv[1] == '--csv' and len(sys.argv) > 2:
-            # 使用指定的CSV数据源
-            csv_file_path = sys.argv[2]
-            print(f"🔄 使用CSV数据源: {csv_file_path}")
-            kg_builder.build_knowledge_graph(data_source='csv', csv_file_path=csv_file_path)
-        else:
-            print("用法: python product.py [--json <json_file_path>] [--csv <csv_file_path>]")
-            print("示例: python product.py --json /path/to/iteration_version_1.json")
-            print("示例: python product.py --csv /path/to/predictions.csv")
+    if args.admin_import:
+        kg_builder.export_admin_import(args.admin_import,
+                                       data_source='json' if args.json else 'csv',
+                                       json_file_path=args.json, csv_file_path=args.csv)
+    elif args.finalize_import:
+        kg_builder.finalize_import()
+    elif args.append:
+        kg_builder.add_triples(kg_builder.load_source(data_source='json' if args.json else 'csv',
+                                                      json_file_path=args.json, csv_file_path=args.csv))
+    elif args.rollback:
+        kg_builder.rollback_graph()
+    elif args.versions:
+        kg_builder.show_versions()
+    elif args.benchmark:
+        kg_builder.benchmark_build(args.benchmark, args.benchmark_entities, loader=args.loader,
+                                   report_path=args.report)
+    elif args.stream or args.workers > 1:
+        file_path = args.json or args.csv or os.path.join(kg_builder.data_path, "predictions.csv")
+        kg_builder.stream_build_knowledge_graph(file_path, args.chunk_lines,
+                                                data_source='json' if args.json else 'csv',
+                                                workers=args.workers)
+    elif args.incremental:
+        kg_builder.sync_graph(data_source='json' if args.json else 'csv',
+                              json_file_path=args.json, csv_file_path=args.csv)
+    elif args.json:
+        # 使用JSON数据源
+        print(f"🔄 使用JSON数据源: {args.json}")
+        kg_builder.build_knowledge_graph(data_source='json', json_file_path=args.json, loader=args.loader,
+                                         resume=args.resume)
+    elif args.csv:
+        # 使用指定的CSV数据源
+        print(f"🔄 使用CSV数据源: {args.csv}")
+        kg_builder.build_knowledge_graph(data_source='csv', csv_file_path=args.csv, loader=args.loader,
+                                         resume=args.resume)
     else:
         # 默认使用CSV数据源
         print("🔄 使用默认CSV数据源")
-        kg_builder.build_knowledge_graph()
\ No newline at end of file
+        kg_builder.build_knowledge_graph(loader=args.loader, resume=args.resume)
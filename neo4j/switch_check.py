@@ -0,0 +1,134 @@
+"""蓝绿切换可用性检查
+
+在持续的查询负载下重建图谱（写入预备版本后切换），统计构建期间和切换前后的空答案：
+对构建前后都有关系的实体，任何一次空答案都说明查询看到了半成品图谱。
+需要可连接的 Neo4j，且当前已有一版图谱。
+
+用法:
+    python switch_check.py                          # 默认CSV数据源，4 个查询线程
+    python switch_check.py --json data.json --threads 8 --entities 50
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from product import Neo4jKnowledgeGraph
+from modules.config_manager import get_config_manager
+from modules.knowledge_graph_query import KnowledgeGraphQuery
+
+
+class QueryLoad:
+    """多个线程循环查询一组实体，记录每次查询的耗时、是否为空和当时的图谱版本"""
+
+    def __init__(self, kg_query, entities, threads):
+        self.kg_query = kg_query
+        self.entities = entities
+        self.threads = threads
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.empty = []  # (实体, 图谱版本, 时间)
+
+    def _worker(self, offset):
+        i = offset
+        while not self.stop.is_set():
+            entity = self.entities[i % len(self.entities)]
+            i += 1
+            start = time.perf_counter()
+            relations = self.kg_query.find_entity_relations(entity, limit=5)
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.latencies.append(elapsed)
+                if not relations:
+                    self.empty.append((entity, self.kg_query.graph_version, time.time()))
+
+    def __enter__(self):
+        self.workers = [threading.Thread(target=self._worker, args=(i,), daemon=True) for i in range(self.threads)]
+        for worker in self.workers:
+            worker.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        for worker in self.workers:
+            worker.join()
+
+
+def entities_with_relations(kg_query, limit):
+    rows = kg_query.run_query('switch_check_entities', """
+    MATCH (n:Entity)-[r]-(:Entity)
+    WHERE COALESCE(r.confidence, 1.0) >= $threshold
+    RETURN n.name AS name, count(r) AS degree
+    ORDER BY degree DESC, name
+    LIMIT $limit
+    """, threshold=kg_query.DEFAULT_CONFIDENCE_THRESHOLD, limit=limit)
+    return [row['name'] for row in rows]
+
+
+def related_entities(kg_query, names):
+    """names 中当前版本仍有关系的实体"""
+    rows = kg_query.run_query('switch_check_related', """
+    UNWIND $names AS name
+    MATCH (n:Entity {name: name})-[r]-(:Entity)
+    WHERE COALESCE(r.confidence, 1.0) >= $threshold
+    RETURN DISTINCT name
+    """, names=names, threshold=kg_query.DEFAULT_CONFIDENCE_THRESHOLD)
+    return {row['name'] for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="蓝绿切换可用性检查")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--json', metavar='JSON_FILE_PATH', help='使用JSON数据源')
+    source.add_argument('--csv', metavar='CSV_FILE_PATH', help='使用指定的CSV数据源')
+    parser.add_argument('--threads', type=int, default=4, help='查询线程数')
+    parser.add_argument('--entities', type=int, default=20, help='轮流查询的实体数（取度数最高的）')
+    parser.add_argument('--settle', type=float, default=10.0, help='切换后继续施加负载的秒数')
+    args = parser.parse_args()
+
+    db_config = get_config_manager().get_database_config()
+    kg_query = KnowledgeGraphQuery(db_config['uri'], db_config['user_name'], db_config['password'])
+    # 不走缓存，每次查询都落到数据库
+    kg_query.cache_ttl = 0
+    kg_query.engine.cache_ttl = 0
+
+    entities = entities_with_relations(kg_query, args.entities)
+    if not entities:
+        print("❌ 当前图谱为空，先构建一版图谱再检查切换")
+        sys.exit(2)
+    version_before = kg_query.graph_version
+    print(f"🔄 {args.threads} 个线程查询 {len(entities)} 个实体，当前图谱版本 {version_before}")
+
+    builder = Neo4jKnowledgeGraph(uri=db_config['uri'], user=db_config['user_name'], password=db_config['password'])
+    with QueryLoad(kg_query, entities, args.threads) as load:
+        build_start = time.time()
+        if args.json:
+            builder.build_knowledge_graph(data_source='json', json_file_path=args.json)
+        else:
+            builder.build_knowledge_graph(data_source='csv', csv_file_path=args.csv)
+        build_end = time.time()
+        time.sleep(args.settle)
+
+    # 新版本中已不存在的实体查到空答案是正常的
+    kept = related_entities(kg_query, entities)
+    failures = [entry for entry in load.empty if entry[0] in kept]
+    latencies = np.array(load.latencies) * 1000
+    print(f"📊 构建耗时 {build_end - build_start:.1f}s，版本 {version_before} -> {kg_query.graph_version}")
+    print(f"📊 查询 {len(latencies)} 次，p50 {np.percentile(latencies, 50):.1f}ms，"
+          f"p99 {np.percentile(latencies, 99):.1f}ms")
+    if failures:
+        for entity, version, at in failures[:10]:
+            print(f"❌ 空答案: {entity}（版本 {version}，构建开始后 {at - build_start:.1f}s）")
+        print(f"❌ 共 {len(failures)} 次空答案")
+        sys.exit(1)
+    print(f"✅ 构建和切换期间没有空答案（{len(load.empty) - len(failures)} 次空答案来自新版本中已删除的实体）")
+
+
+if __name__ == "__main__":
+    main()
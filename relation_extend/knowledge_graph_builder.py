@@ -1,7 +1,11 @@
 import os
+import sys
 import json
 import pandas as pd
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.entity_normalizer import EntityNormalizer
+
 class KnowledgeGraphBuilder:
     def __init__(self, args) -> None:
         """知识图谱构建器"""
@@ -13,8 +17,15 @@ class KnowledgeGraphBuilder:
         self.version = 0
         self.kg_paths = []
         
+        # 与图谱构建共用的实体标准化词典，用于判断实体对是否已存在
+        self.normalizer = EntityNormalizer()
+        
         os.makedirs(self.data_dir, exist_ok=True)
     
+    def _pair_key(self, text):
+        """实体对比对用的名称：标准化后的名称，标准化结果为空时退回原文本"""
+        return self.normalizer.normalize(text) or text
+    
     def load_predictions_from_csv(self):
         """从predictions.csv文件加载预测结果并转换为知识图谱格式"""
         df = pd.read_csv(self.predictions_csv)
@@ -135,10 +146,12 @@ class KnowledgeGraphBuilder:
             new_relations = []
             existing_pairs = set()
             
-            # 记录已存在的实体对
+            # 记录已存在的实体对（按标准化后的名称，写法不同的同一实体不重复预测）
+            pair_key = self._pair_key
             for rel in existing_relations:
-                existing_pairs.add((rel['em1Text'], rel['em2Text']))
-                existing_pairs.add((rel['em2Text'], rel['em1Text']))
+                e1, e2 = pair_key(rel['em1Text']), pair_key(rel['em2Text'])
+                existing_pairs.add((e1, e2))
+                existing_pairs.add((e2, e1))
             
             # 尝试发现新的关系
             for i, entity1 in enumerate(sentence_entities):
@@ -146,9 +159,10 @@ class KnowledgeGraphBuilder:
                     if i != j:
                         e1_text = entity1['text']
                         e2_text = entity2['text']
+                        e1_key, e2_key = pair_key(e1_text), pair_key(e2_text)
                         
                         # 跳过已存在的实体对
-                        if (e1_text, e2_text) in existing_pairs:
+                        if (e1_key, e2_key) in existing_pairs:
                             continue
                         
                         # 预测关系
@@ -173,7 +187,7 @@ class KnowledgeGraphBuilder:
                                 "is_new": True  # 标记为新发现的关系
                             }
                             new_relations.append(new_relation)
-                            existing_pairs.add((e1_text, e2_text))
+                            existing_pairs.add((e1_key, e2_key))
             
             # 合并原有关系和新关系
             all_relations = existing_relations + new_relations
@@ -195,6 +209,7 @@ class KnowledgeGraphBuilder:
             
             extended_data.append(extended_item)
         
+        self.normalizer.save()
         total_new_relations = sum(item.get('new_relations_count', 0) for item in extended_data)
         print(ct.green(f"扩展完成，新增 {total_new_relations} 个关系"))
         